@@ -0,0 +1,723 @@
+"""
+IPtest 离线基准测试工具
+===============================================
+
+在本机回环地址上模拟完整的网络环境，对 iptest 包的真实流水线进行可复现的性能测试，
+无需访问互联网，方便对比不同优化方案的效果。
+
+🧪 模拟组件
+-----------
+• TCP探测目标：127.0.0.2 上的监听端口（可用IP），按IP注入连接延迟
+• 丢弃：127.0.0.3 上的未监听端口（立即返回RST，模拟拒绝连接）
+• 黑洞：127.0.0.4 上积压队列已占满的监听端口（SYN被丢弃，连接真实超时）
+• 地区API：127.0.0.5 上的假ipinfo/ip-api接口，带令牌桶限流（超限返回429）
+• 带宽测试：127.0.0.6 上的限速下载服务器（/__down?bytes=N）
+• IP源：127.0.0.7 上的假IP源页面（HTML中混杂重复IP和噪声）
+• 应用层探测与上传：127.0.0.8 上的TLS服务（openssl生成的自签名证书，/cdn-cgi/trace 和限速的 /__up 接收端），
+  可用IP连接443端口时重定向到这里，仅在 app_latency/upload 阶段、--latency-mode app 或 --upload 时启动
+
+候选IP位于 127.16.0.0/12（--ipv6-rate 时部分位于文档网段 2001:db8:16::/48），
+探测时由 SimulatedSocket 按IP画像重定向到上述监听地址（IPv6套接字经IPv4映射地址连接）；
+注入延迟在连接前等待，其余行为（拒绝、超时、限流、限速）均由真实套接字产生。
+
+📊 用法
+-----------
+    python benchmark.py --ips 1000
+    python benchmark.py --ips 100000 --stages probe --blackhole-rate 0.01
+    python benchmark.py --ips 5000 --stages pipeline --output bench.json
+    python benchmark.py --ips 500 --stages app_latency
+    python benchmark.py --ips 500 --stages upload --upload-mbps 50
+    python benchmark.py --ips 100000 --stages score
+    python benchmark.py --ips 100000 --stages ingest --ingest-lines 5000000
+    python benchmark.py --ips 100000 --stages serve
+    python benchmark.py --ips 1000 --stages pipeline --local-rate 0.5
+
+作者：Senflare
+"""
+
+import argparse
+import errno
+import ipaddress
+import json
+import logging
+import os
+import random
+import socket
+import ssl
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import types
+import urllib.error
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+# ===== 模拟网络地址 =====
+GOOD_HOST = '127.0.0.2'
+DROP_HOST = '127.0.0.3'
+BLACKHOLE_HOST = '127.0.0.4'
+GEO_HOST = '127.0.0.5'
+DOWNLOAD_HOST = '127.0.0.6'
+SOURCE_HOST = '127.0.0.7'
+TRACE_HOST = '127.0.0.8'
+
+# 应用层探测端口：可用IP连接该端口时重定向到TLS服务
+APP_PORT = 443
+
+# 候选IP起始地址：127.16.0.0，IPv6候选位于文档网段 2001:db8:16::/48
+CANDIDATE_BASE = (127 << 24) | (16 << 16)
+CANDIDATE_V6_NETWORK = '2001:db8:16::/48'
+CANDIDATE_V6_BASE = int(ipaddress.ip_network(CANDIDATE_V6_NETWORK).network_address)
+
+# --local-rate 时写在工作目录中的本地候选文件
+LOCAL_CANDIDATES = 'candidates.txt'
+
+# 模拟地区分布
+REGIONS = ['US', 'HK', 'JP', 'SG', 'DE', 'GB', 'KR', 'TW']
+
+def int_to_ip(value):
+    return socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+# ===== 模拟网络 =====
+
+class SimulatedNetwork:
+    """
+    模拟网络画像
+
+    为每个候选IP生成确定性的行为画像（可用/丢弃/黑洞、注入延迟、地区），
+    同一个随机种子总是得到同样的网络，保证测试结果可复现。
+    """
+
+    def __init__(self, count, seed=42, drop_rate=0.3, blackhole_rate=0.02,
+                 latency_range=(5, 300), congestion_limit=0, ipv6_rate=0):
+        rng = random.Random(seed)
+        # IPv6候选的选择使用独立的随机序列，ipv6_rate为0时与纯IPv4网络完全一致
+        family_rng = random.Random(seed + 6)
+        # 同时建立的连接超过该数量时按超出比例放大延迟，模拟本地拥塞（0表示不模拟）
+        self.congestion_limit = congestion_limit
+        self.profiles = {}
+        self.ips = []
+        for i in range(count):
+            if ipv6_rate and family_rng.random() < ipv6_rate:
+                ip = str(ipaddress.IPv6Address(CANDIDATE_V6_BASE + i + 1))
+            else:
+                ip = int_to_ip(CANDIDATE_BASE + i + 1)
+            roll = rng.random()
+            if roll < blackhole_rate:
+                kind = 'blackhole'
+            elif roll < blackhole_rate + drop_rate:
+                kind = 'drop'
+            else:
+                kind = 'good'
+            latency = rng.uniform(*latency_range) / 1000
+            self.profiles[ip] = (kind, latency, rng.choice(REGIONS))
+            self.ips.append(ip)
+        self.endpoints = {}
+
+    def count(self, kind):
+        return sum(1 for profile in self.profiles.values() if profile[0] == kind)
+
+    def region(self, ip):
+        profile = self.profiles.get(ip)
+        return profile[2] if profile else 'Unknown'
+
+    def resolve(self, ip, port):
+        """返回 (重定向地址, 注入延迟秒)，非模拟IP返回None"""
+        profile = self.profiles.get(ip)
+        if profile is None:
+            return None
+        kind, latency, _ = profile
+        if kind == 'good' and port == APP_PORT and 'tls' in self.endpoints:
+            return self.endpoints['tls'], latency
+        return self.endpoints[kind], latency
+
+def make_socket_module(network):
+    """
+    构造供 IPtest 使用的 socket 模块替身
+
+    仅替换 socket.socket 类，连接模拟IP时先注入延迟再重定向到真实的回环监听地址，
+    其余属性（异常类型、常量等）与标准库完全一致。
+    """
+
+    connecting = [0]
+    lock = threading.Lock()
+
+    class SimulatedSocket(socket.socket):
+
+        def _redirect(self, address):
+            target = network.resolve(address[0], address[1]) if isinstance(address, tuple) else None
+            if target is None:
+                return address, 0
+            (host, port), latency = target
+            if self.family == socket.AF_INET6:
+                host = '::ffff:' + host
+            with lock:
+                connecting[0] += 1
+                load = connecting[0]
+            try:
+                if network.congestion_limit and load > network.congestion_limit:
+                    latency *= load / network.congestion_limit
+                return self._delay(host, port, latency)
+            finally:
+                with lock:
+                    connecting[0] -= 1
+
+        def _delay(self, host, port, latency):
+            timeout = self.gettimeout()
+            if timeout is not None and latency >= timeout:
+                time.sleep(timeout)
+                raise socket.timeout('timed out')
+            time.sleep(latency)
+            if timeout is not None:
+                self.settimeout(timeout - latency)
+            return (host, port), latency
+
+        def connect_ex(self, address):
+            try:
+                address, _ = self._redirect(address)
+            except socket.timeout:
+                return errno.EAGAIN
+            return super().connect_ex(address)
+
+        def connect(self, address):
+            address, _ = self._redirect(address)
+            return super().connect(address)
+
+    module = types.ModuleType('socket')
+    module.__dict__.update(socket.__dict__)
+    module.socket = SimulatedSocket
+    return module
+
+# ===== 回环监听服务 =====
+
+def free_port(host):
+    with socket.socket() as s:
+        s.bind((host, 0))
+        return s.getsockname()[1]
+
+def start_good_listener():
+    """可用IP：接受连接后立即关闭"""
+    server = socket.socket()
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    server.bind((GOOD_HOST, 0))
+    server.listen(4096)
+
+    def accept_loop():
+        while True:
+            try:
+                conn, _ = server.accept()
+                conn.close()
+            except OSError:
+                return
+
+    threading.Thread(target=accept_loop, daemon=True).start()
+    return server, server.getsockname()
+
+def start_blackhole_listener():
+    """黑洞：积压队列占满且从不accept，后续SYN被内核丢弃"""
+    server = socket.socket()
+    server.bind((BLACKHOLE_HOST, 0))
+    server.listen(0)
+    address = server.getsockname()
+    holders = []
+    for _ in range(4):
+        holder = socket.socket()
+        holder.setblocking(False)
+        holder.connect_ex(address)
+        holders.append(holder)
+    time.sleep(0.05)
+    return server, holders, address
+
+class TokenBucket:
+    """线程安全的令牌桶，用于模拟API限流"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def wait_seconds(self):
+        """下一个令牌可用前需要等待的秒数"""
+        with self.lock:
+            return max(0.0, (1 - self.tokens) / self.rate)
+
+class QuietHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+    def send_body(self, status, body, content_type='application/json', headers=None):
+        data = body.encode('utf-8')
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+def make_geo_handler(network, bucket, stats):
+    class GeoHandler(QuietHandler):
+        def do_GET(self):
+            path = urlparse(self.path).path
+            stats['requests'] += 1
+            if not bucket.take():
+                stats['limited'] += 1
+                self.send_body(429, '{"error": "rate limited"}',
+                               headers={'Retry-After': f"{bucket.wait_seconds():.2f}"})
+                return
+            ip = path.rsplit('/', 1)[-1]
+            code = network.region(ip)
+            if path.startswith('/lite/'):
+                self.send_body(200, json.dumps({'ip': ip, 'country_code': code}))
+            else:
+                self.send_body(200, json.dumps({'status': 'success', 'countryCode': code}))
+    return GeoHandler
+
+def make_download_handler(rate_mbps):
+    bytes_per_second = rate_mbps * 1000000 / 8
+    chunk = b'\0' * 65536
+
+    class DownloadHandler(QuietHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            total = int(query.get('bytes', ['1048576'])[0])
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/octet-stream')
+            self.send_header('Content-Length', str(total))
+            self.end_headers()
+            start = time.monotonic()
+            sent = 0
+            try:
+                while sent < total:
+                    piece = chunk[:min(len(chunk), total - sent)]
+                    self.wfile.write(piece)
+                    sent += len(piece)
+                    # 按目标速率限速
+                    ahead = sent / bytes_per_second - (time.monotonic() - start)
+                    if ahead > 0:
+                        time.sleep(ahead)
+            except (BrokenPipeError, ConnectionResetError):
+                pass
+    return DownloadHandler
+
+def build_source_pages(network, source_count, seed, duplicate_rate=0.3, exclude=()):
+    """
+    把候选IP分配到多个假IP源页面
+
+    每个源独占一部分IP，并按比例混入其他源的重复IP，再夹杂HTML标签、
+    非法地址和不在模拟网络中的回环噪声地址，贴近真实页面的抓取情况。
+    exclude中的IP只出现在本地候选文件中。
+    """
+    rng = random.Random(seed + 1)
+    pages = [[] for _ in range(source_count)]
+    for index, ip in enumerate(ip for ip in network.ips if ip not in exclude):
+        pages[index % source_count].append(ip)
+        if rng.random() < duplicate_rate:
+            pages[rng.randrange(source_count)].append(ip)
+    rendered = []
+    for page in pages:
+        rows = [f'<tr><td>{ip}</td><td>{rng.randint(10, 300)}ms</td></tr>' for ip in page]
+        rows.append(f'<p>noise 300.1.{rng.randint(0, 255)}.1 127.250.{rng.randint(0, 255)}.9</p>')
+        rows.append('<p>2001:db8:ffff::9 12:30:45 a::before</p>')
+        rendered.append('<html><body><table>' + '\n'.join(rows) + '</table></body></html>')
+    return rendered
+
+def write_masscan_file(path, ips, noise, seed):
+    """按masscan列表格式（-oL）写出本地候选文件，混入注释行和不在候选网段内的噪声地址"""
+    rng = random.Random(seed)
+    lines = [f'open tcp 443 {ip} {rng.randint(1690000000, 1700000000)}' for ip in ips]
+    lines += [f'open tcp 443 10.{rng.randint(0, 255)}.{rng.randint(0, 255)}.{rng.randint(0, 255)} 1690000000'
+              for _ in range(noise)]
+    rng.shuffle(lines)
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('#masscan\n' + '\n'.join(lines) + '\n# end\n')
+
+def make_source_handler(pages):
+    class SourceHandler(QuietHandler):
+        def do_GET(self):
+            try:
+                index = int(urlparse(self.path).path.rsplit('/', 1)[-1])
+                self.send_body(200, pages[index], 'text/html')
+            except (ValueError, IndexError):
+                self.send_body(404, 'not found', 'text/plain')
+    return SourceHandler
+
+def make_trace_handler(upload_mbps):
+    bytes_per_second = upload_mbps * 1000000 / 8
+
+    class TraceHandler(QuietHandler):
+        def do_GET(self):
+            if urlparse(self.path).path != '/cdn-cgi/trace':
+                self.send_body(404, 'not found', 'text/plain')
+                return
+            host = self.headers.get('Host', '')
+            self.send_body(200, f"fl=1f1\nh={host}\nip=127.0.0.1\nts={time.time():.3f}\nvisit_scheme=https\n"
+                                f"colo=LAX\ntls=TLSv1.3\n", 'text/plain')
+
+        def do_POST(self):
+            if urlparse(self.path).path != '/__up':
+                self.send_body(404, 'not found', 'text/plain')
+                return
+            total = int(self.headers.get('Content-Length', '0'))
+            buffer = bytearray(65536)
+            start = time.monotonic()
+            received = 0
+            while received < total:
+                count = self.rfile.readinto(memoryview(buffer)[:min(len(buffer), total - received)])
+                if not count:
+                    return
+                received += count
+                # 按目标速率限速接收
+                ahead = received / bytes_per_second - (time.monotonic() - start)
+                if ahead > 0:
+                    time.sleep(ahead)
+            self.send_body(200, json.dumps({'received': received}))
+    return TraceHandler
+
+def make_self_signed_cert(directory):
+    """用openssl生成自签名证书，返回 (证书路径, 私钥路径)"""
+    certfile = os.path.join(directory, 'bench-cert.pem')
+    keyfile = os.path.join(directory, 'bench-key.pem')
+    if not os.path.exists(certfile):
+        subprocess.run(['openssl', 'req', '-x509', '-newkey', 'rsa:2048', '-nodes', '-days', '1',
+                        '-subj', '/CN=speed.cloudflare.com', '-keyout', keyfile, '-out', certfile],
+                       check=True, capture_output=True)
+    return certfile, keyfile
+
+def start_http_server(host, handler, tls_files=None):
+    server = ThreadingHTTPServer((host, 0), handler)
+    server.daemon_threads = True
+    if tls_files:
+        # 握手推迟到处理线程中完成，慢客户端不会阻塞accept循环
+        context = ssl.SSLContext(ssl.PROTOCOL_TLS_SERVER)
+        context.load_cert_chain(*tls_files)
+        server.socket = context.wrap_socket(server.socket, server_side=True, do_handshake_on_connect=False)
+        server.handle_error = lambda request, client_address: None
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, server.server_address
+
+# ===== 基准测试流程 =====
+
+class Benchmark:
+    """启动模拟环境、配置 IPtest 并按阶段计时"""
+
+    def __init__(self, args):
+        self.args = args
+        self.network = SimulatedNetwork(args.ips, args.seed, args.drop_rate,
+                                        args.blackhole_rate, (args.min_latency, args.max_latency),
+                                        args.congestion_limit, args.ipv6_rate)
+        self.geo_stats = {'requests': 0, 'limited': 0}
+        self.results = []
+        self.servers = []
+
+    def start(self):
+        good, good_address = start_good_listener()
+        blackhole, self._holders, blackhole_address = start_blackhole_listener()
+        self.servers += [good, blackhole]
+        self.network.endpoints = {
+            'good': good_address,
+            'drop': (DROP_HOST, free_port(DROP_HOST)),
+            'blackhole': blackhole_address,
+        }
+
+        bucket = TokenBucket(self.args.geo_rate, self.args.geo_burst)
+        geo, self.geo_address = start_http_server(GEO_HOST, make_geo_handler(self.network, bucket, self.geo_stats))
+        download, self.download_address = start_http_server(DOWNLOAD_HOST, make_download_handler(self.args.download_mbps))
+        # --local-rate 比例的IPv4候选只写入本地候选文件，不出现在IP源页面中
+        rng = random.Random(self.args.seed + 7)
+        self.local_ips = [ip for ip in self.network.ips if ':' not in ip and rng.random() < self.args.local_rate]
+        if self.local_ips:
+            write_masscan_file(LOCAL_CANDIDATES, self.local_ips, len(self.local_ips), self.args.seed)
+        pages = build_source_pages(self.network, self.args.sources, self.args.seed, exclude=set(self.local_ips))
+        source, self.source_address = start_http_server(SOURCE_HOST, make_source_handler(pages))
+        self.http_servers = [geo, download, source]
+
+        if (self.args.latency_mode == 'app' or self.args.upload
+                or 'app_latency' in self.args.stages or 'upload' in self.args.stages):
+            trace, self.network.endpoints['tls'] = start_http_server(
+                TRACE_HOST, make_trace_handler(self.args.upload_mbps), make_self_signed_cert(os.getcwd()))
+            self.http_servers.append(trace)
+
+    def configure(self, iptest):
+        geo = f"http://{self.geo_address[0]}:{self.geo_address[1]}"
+        download = f"http://{self.download_address[0]}:{self.download_address[1]}"
+        source = f"http://{self.source_address[0]}:{self.source_address[1]}"
+        fake_socket = make_socket_module(self.network)
+        for module in (iptest.network, iptest.applayer):
+            module.socket = fake_socket
+        iptest.CONFIG.update({
+            "ip_sources": [f"{source}/source/{i}" for i in range(self.args.sources)],
+            "test_ports": [self.network.endpoints['good'][1]],
+            "region_api_primary": geo + "/lite/{ip}",
+            "region_api_backup": geo + "/json/{ip}",
+            "bandwidth_test_urls": [download + "/__down?bytes={bytes}"],
+            "bandwidth_test_size_mb": self.args.download_mb,
+            "query_interval": 0,
+            "time_budget_seconds": self.args.time_budget,
+            # 模拟候选IP位于回环网段和IPv6文档网段，放行这两个网段，其余噪声地址仍会被预过滤剔除
+            "prefilter_allow_cidrs": ['127.16.0.0/12', CANDIDATE_V6_NETWORK],
+            "prefilter_deny_cidrs": [],
+            "adaptive_connect_enabled": not self.args.fixed_connect_timeout,
+            "aimd_enabled": not self.args.fixed_concurrency,
+            "latency_mode": self.args.latency_mode,
+            "app_probe_port": APP_PORT,
+            "upload_test_enabled": self.args.upload,
+            "upload_test_size_mb": self.args.upload_mb,
+            "candidate_files": [LOCAL_CANDIDATES] if self.local_ips else [],
+            # 自签名证书无法校验，仅验证握手与首字节计时
+            "app_probe_verify": False,
+        })
+        iptest.geo.get_region_cache().clear()
+
+    def record(self, stage, items, seconds, **extra):
+        entry = {
+            'stage': stage,
+            'items': items,
+            'seconds': round(seconds, 3),
+            'throughput': round(items / seconds, 1) if seconds > 0 else None,
+        }
+        entry.update(extra)
+        self.results.append(entry)
+        logging.getLogger('benchmark').warning(
+            f"⏱️ {stage}: {items} 项，{seconds:.2f}秒，{entry['throughput']} 项/秒")
+
+    def run(self, iptest):
+        stages = self.args.stages
+        ips = list(self.network.ips)
+        alive = [ip for ip in ips if self.network.profiles[ip][0] == 'good']
+
+        if 'quick_filter' in stages:
+            start = time.perf_counter()
+            passed = sum(1 for ip in ips if iptest.network.quick_filter_ip(ip)[0])
+            self.record('quick_filter', len(ips), time.perf_counter() - start, passed=passed)
+
+        if 'probe' in stages:
+            start = time.perf_counter()
+            found = iptest.concurrency.test_ips_concurrently(ips)
+            self.record('probe', len(ips), time.perf_counter() - start,
+                        passed=len(found), expected=len(alive))
+
+        if 'app_latency' in stages:
+            start = time.perf_counter()
+            results = iptest.applayer.test_app_latency_concurrently(alive)
+            averages = {key: round(sum(c[key] for c in results.values()) / len(results), 1)
+                        for key in ('connect', 'tls', 'ttfb')} if results else {}
+            self.record('app_latency', len(alive), time.perf_counter() - start,
+                        passed=len(results), mean_ms=averages,
+                        tls_sessions_cached=len(iptest.runtime.runtime().tls_sessions))
+
+        if 'upload' in stages:
+            targets = alive[:self.args.bandwidth_ips]
+            start = time.perf_counter()
+            speeds = []
+            for i, ip in enumerate(targets, 1):
+                ok, mbps = iptest.applayer.test_ip_upload(ip, i, len(targets))
+                if ok:
+                    speeds.append(round(mbps, 1))
+            self.record('upload', len(targets), time.perf_counter() - start, speeds_mbps=speeds)
+
+        if 'region' in stages:
+            table = iptest.ResultTable()
+            targets = [table.add(ip) for ip in alive[:self.args.region_ips]]
+            iptest.geo.get_region_cache().clear()
+            before = dict(self.geo_stats)
+            start = time.perf_counter()
+            iptest.concurrency.get_regions_concurrently(table, targets)
+            correct = sum(1 for row in targets if table.region(row) == self.network.region(table.ip(row)))
+            self.record('region', len(targets), time.perf_counter() - start, correct=correct,
+                        api_requests=self.geo_stats['requests'] - before['requests'],
+                        rate_limited=self.geo_stats['limited'] - before['limited'])
+
+        if 'bandwidth' in stages:
+            targets = alive[:self.args.bandwidth_ips]
+            start = time.perf_counter()
+            speeds = []
+            for i, ip in enumerate(targets, 1):
+                ok, mbps, _ = iptest.network.test_ip_bandwidth_only(ip, i, len(targets))
+                if ok:
+                    speeds.append(round(mbps, 1))
+            self.record('bandwidth', len(targets), time.perf_counter() - start, speeds_mbps=speeds)
+
+        if 'score' in stages:
+            # 综合评分：按全部候选IP的延迟画像和随机带宽、稳定性整列评分，取头部
+            rng = random.Random(self.args.seed)
+            latency = [self.network.profiles[ip][1] * 1000 for ip in ips]
+            bandwidth = [rng.uniform(0, 100) for _ in ips]
+            stability = [rng.choice((60, 80, 100)) for _ in ips]
+            start = time.perf_counter()
+            scores = iptest.score_results(latency, bandwidth, stability)
+            top = iptest.top_k(scores, 100)
+            self.record('score', len(ips), time.perf_counter() - start,
+                        profile=iptest.CONFIG['score_profile'], numpy=iptest.scoring.np is not None,
+                        top_score=float(scores[top[0]]) if top else None)
+
+        if 'serve' in stages:
+            # 查询服务：全部候选IP构建索引，统计进程内查询耗时，再经HTTP对比完整响应和304轮询的耗时
+            rng = random.Random(self.args.seed)
+            table = iptest.ResultTable()
+            for ip in ips:
+                row = table.add(ip, delay=self.network.profiles[ip][1] * 1000, bandwidth=rng.uniform(0, 100))
+                table.set_region(row, self.network.region(ip))
+            index = iptest.ResultIndex(table, table.score(range(len(table))), 'bench')
+            queries = [{'region': region, 'limit': 10, 'min_bandwidth': 20} for region in REGIONS]
+            queries.append({'order': 'latency', 'limit': 10, 'max_latency': 100})
+            rounds = 1000
+            start = time.perf_counter()
+            for _ in range(rounds):
+                for query in queries:
+                    index.query(**query)
+            seconds = time.perf_counter() - start
+
+            service = iptest.ResultService()
+            service.index = index
+            server = iptest.make_result_server(service, '127.0.0.1', 0)
+            threading.Thread(target=server.serve_forever, daemon=True).start()
+            url = f"http://127.0.0.1:{server.server_address[1]}/ips?region={REGIONS[0]}&limit=10&min_bandwidth=20"
+            http_ms = {}
+            for label, headers in (('full', {}), ('not_modified', {'If-None-Match': '"bench"'})):
+                http_start = time.perf_counter()
+                for _ in range(100):
+                    try:
+                        urllib.request.urlopen(urllib.request.Request(url, headers=headers)).read()
+                    except urllib.error.HTTPError as e:
+                        if e.code != 304:
+                            raise
+                http_ms[label] = round((time.perf_counter() - http_start) * 10, 3)
+            server.shutdown()
+            server.server_close()
+            self.record('serve', rounds * len(queries), seconds,
+                        query_us=round(seconds / (rounds * len(queries)) * 1e6, 2), http_ms=http_ms)
+
+        if 'ingest' in stages:
+            # 本地候选文件解析：可重复的候选IP与网段外噪声按7:3混合
+            rng = random.Random(self.args.seed + 8)
+            v4_ips = [ip for ip in ips if ':' not in ip]
+            sample = [rng.choice(v4_ips) for _ in range(int(self.args.ingest_lines * 0.7))] if v4_ips else []
+            write_masscan_file('ingest.txt', sample, self.args.ingest_lines - len(sample), self.args.seed)
+            start = time.perf_counter()
+            candidates = iptest.load_candidate_files(['ingest.txt'])
+            self.record('ingest', self.args.ingest_lines, time.perf_counter() - start,
+                        kept=len(candidates), expected=len(set(sample)),
+                        file_mb=round(os.path.getsize('ingest.txt') / 1e6, 1), numpy=iptest.scoring.np is not None)
+            os.remove('ingest.txt')
+
+        if 'pipeline' in stages:
+            iptest.geo.get_region_cache().clear()
+            iptest.profiling.stage_stats().clear()
+            start = time.perf_counter()
+            iptest.main()
+            found = {}
+            for version in (4, 6):
+                path = iptest.output.versioned_name('IPlist.txt', version)
+                if os.path.exists(path):
+                    with open(path, encoding='utf-8') as f:
+                        found[f'v{version}'] = sum(1 for line in f if line.strip())
+            self.record('pipeline', len(ips), time.perf_counter() - start, found=found,
+                        expected={f'v{version}': sum(1 for ip in alive if (':' in ip) == (version == 6))
+                                  for version in (4, 6)},
+                        stages={name: stats['seconds'] for name, stats in iptest.profiling.stage_stats().items()})
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='IPtest 离线基准测试（回环模拟网络）')
+    parser.add_argument('--ips', type=int, default=1000, help='模拟候选IP数量（1k-100k）')
+    parser.add_argument('--stages', default='probe,region,bandwidth',
+                        help='逗号分隔的测试阶段：quick_filter,probe,app_latency,region,bandwidth,upload,score,serve,ingest,pipeline')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子，保证可复现')
+    parser.add_argument('--drop-rate', type=float, default=0.3, help='拒绝连接的IP比例')
+    parser.add_argument('--blackhole-rate', type=float, default=0.02, help='黑洞（超时）IP比例')
+    parser.add_argument('--min-latency', type=float, default=5, help='注入延迟下限（毫秒）')
+    parser.add_argument('--max-latency', type=float, default=300, help='注入延迟上限（毫秒）')
+    parser.add_argument('--congestion-limit', type=int, default=0,
+                        help='同时建立的连接超过该数量时按比例放大延迟，模拟本地拥塞（0表示不模拟）')
+    parser.add_argument('--fixed-concurrency', action='store_true',
+                        help='关闭自适应并发，固定使用max_workers作为对照')
+    parser.add_argument('--ipv6-rate', type=float, default=0, help='IPv6候选IP比例')
+    parser.add_argument('--local-rate', type=float, default=0,
+                        help='只出现在本地候选文件（masscan格式）中的IPv4候选比例')
+    parser.add_argument('--ingest-lines', type=int, default=1000000, help='ingest阶段生成的候选文件行数')
+    parser.add_argument('--sources', type=int, default=8, help='假IP源页面数量')
+    parser.add_argument('--geo-rate', type=float, default=50, help='地区API限流速率（请求/秒）')
+    parser.add_argument('--geo-burst', type=int, default=20, help='地区API限流突发容量')
+    parser.add_argument('--region-ips', type=int, default=200, help='地区识别阶段测试的IP数量')
+    parser.add_argument('--download-mbps', type=float, default=100, help='下载服务器限速（Mbps）')
+    parser.add_argument('--download-mb', type=int, default=2, help='带宽测试下载大小（MB）')
+    parser.add_argument('--bandwidth-ips', type=int, default=5, help='带宽和上传阶段测试的IP数量')
+    parser.add_argument('--upload-mbps', type=float, default=50, help='上传接收端限速（Mbps）')
+    parser.add_argument('--upload-mb', type=float, default=2, help='上传测试数据大小（MB）')
+    parser.add_argument('--upload', action='store_true', help='流水线中启用上传测试')
+    parser.add_argument('--time-budget', type=float, default=0, help='流水线时间预算（秒），0表示不限制')
+    parser.add_argument('--latency-mode', choices=['tcp', 'app'], default='tcp',
+                        help='流水线延迟探测模式，app时启动本地TLS服务')
+    parser.add_argument('--fixed-connect-timeout', action='store_true',
+                        help='关闭自适应连接超时，使用固定超时作为对照')
+    parser.add_argument('--workdir', help='IPtest运行目录（默认临时目录，输出文件和日志写在这里）')
+    parser.add_argument('--output', help='将结果保存为JSON文件')
+    parser.add_argument('--verbose', action='store_true', help='显示IPtest的详细日志')
+    args = parser.parse_args(argv)
+    args.stages = [stage.strip() for stage in args.stages.split(',') if stage.strip()]
+    return args
+
+def main(argv=None):
+    args = parse_args(argv)
+    output = os.path.abspath(args.output) if args.output else None
+    workdir = args.workdir or tempfile.mkdtemp(prefix='iptest-bench-')
+    os.makedirs(workdir, exist_ok=True)
+    os.chdir(workdir)
+
+    # 在工作目录中运行，IPtest.log 与输出文件不会污染仓库
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    import iptest.applayer
+    import iptest.concurrency
+    import iptest.geo
+    import iptest.network
+    import iptest.output
+    import iptest.profiling
+    import iptest.runtime
+    import iptest.scoring
+    iptest.setup_logging()
+
+    if not args.verbose:
+        for handler in logging.getLogger().handlers:
+            if isinstance(handler, logging.StreamHandler) and not isinstance(handler, logging.FileHandler):
+                handler.setLevel(logging.WARNING)
+
+    bench = Benchmark(args)
+    bench.start()
+    bench.configure(iptest)
+    network = bench.network
+    logging.getLogger('benchmark').warning(
+        f"🧪 模拟网络: {len(network.ips)} 个IP（可用 {network.count('good')}，"
+        f"丢弃 {network.count('drop')}，黑洞 {network.count('blackhole')}），工作目录 {workdir}")
+
+    bench.run(iptest)
+
+    report = {
+        'ips': args.ips,
+        'seed': args.seed,
+        'config': {key: iptest.CONFIG[key] for key in ('max_workers', 'aimd_enabled', 'test_ports')},
+        'results': bench.results,
+    }
+    print(json.dumps(report, ensure_ascii=False, indent=2))
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+if __name__ == '__main__':
+    main()
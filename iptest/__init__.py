@@ -0,0 +1,108 @@
+"""
+Cloudflare优选IP采集器 v2.3.0
+===============================================
+
+一个高效、智能的Cloudflare优选IP采集和检测工具，专为网络优化而设计。
+
+🎯 核心功能
+-----------
+• IP采集：多API源并发采集，获取大量候选IP地址
+• 智能筛选：TCP连接测试快速剔除不可用IP
+• 性能测试：TCP Ping延迟测试 + HTTP带宽测试
+• 地区识别：自动识别IP地理位置，支持缓存机制
+• 智能排序：综合延迟、带宽、稳定性进行评分排名
+• 多格式输出：生成基础版和高级版IP列表文件
+
+⚡ 技术特性
+-----------
+• 智能缓存：TTL机制减少重复API调用，提升效率
+• 高并发处理：多线程并发检测，大幅提升速度
+• 容错机制：完善的异常处理和重试策略
+• 详细日志：完整的操作日志记录，支持文件输出
+• 资源优化：自动缓存管理，防止内存溢出
+• CI优化：针对GitHub Actions等CI环境特别优化
+• 多端口支持：可配置测试端口，适应不同需求
+• 评分系统：综合性能指标，智能排名推荐
+
+📊 输出文件
+-----------
+• IPlist.txt - 基础版IP列表（快速筛选结果）
+• Senflare.txt - 基础版格式化IP列表（按地区分组）
+• IPlist-Pro.txt - 高级版IP列表（性能测试结果）
+• Senflare-Pro.txt - 高级版格式化IP列表（按地区分组）
+• Ranking.txt - 详细排名信息（延迟、带宽、评分）
+• *-v6.txt - IPv6结果（同名文件加 -v6 后缀，格式相同）
+• Cache.json - 地区信息缓存文件
+• IPtest.log - 详细运行日志
+
+🔧 配置说明
+-----------
+• 支持自定义测试端口、超时时间、并发数等参数
+• 可开启/关闭高级模式（带宽测试、综合评分）
+• 支持延迟排名筛选（取前N%的IP进行深度测试）
+• 智能缓存管理，支持TTL和大小限制
+
+📦 作为库使用
+-----------
+    import iptest
+
+    ips = iptest.collect()               # 采集候选IP
+    table = iptest.probe(ips)            # TCP Ping探测，返回结果表
+    iptest.geolocate(table)              # 地区识别
+    ranked = iptest.rank(table)          # 综合评分排名
+    iptest.write(table, ranked)          # 写出结果文件
+
+导入本包不产生副作用：不配置日志、不创建HTTP会话、不读取缓存文件，子模块在首次访问时才导入。
+配置和可变状态归属于运行时实例，需要独立配置时：
+
+    with iptest.Runtime(max_workers=50, ipv6_enabled=False).activate():
+        table = iptest.probe(ips)
+
+命令行入口为 python IPtest.py 或 python -m iptest，参数见 --help。
+
+作者：Senflare
+版本：v2.3.0
+更新：2025年10月25日
+"""
+
+import importlib
+import logging
+
+__version__ = "2.3.0"
+
+# 公共名称 -> 所在子模块，首次访问时才导入子模块（见 __getattr__）
+_EXPORTS = {
+    "collect": "api",
+    "probe": "api",
+    "geolocate": "api",
+    "rank": "api",
+    "write": "api",
+    "Runtime": "runtime",
+    "CONFIG": "runtime",
+    "setup_logging": "runtime",
+    "ResultTable": "table",
+    "score_results": "scoring",
+    "top_k": "scoring",
+    "load_candidate_files": "candidates",
+    "ResultIndex": "serve",
+    "ResultService": "serve",
+    "make_result_server": "serve",
+    "main": "pipeline",
+    "run": "cli",
+}
+
+__all__ = list(_EXPORTS)
+
+# 作为库使用时不输出日志，除非宿主程序自行配置（命令行入口调用 setup_logging）
+logging.getLogger(__name__).addHandler(logging.NullHandler())
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(f".{module}", __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))
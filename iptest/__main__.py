@@ -0,0 +1,5 @@
+"""支持 python -m iptest 运行"""
+
+from .cli import run
+
+run()
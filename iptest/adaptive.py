@@ -0,0 +1,137 @@
+"""自适应连接超时"""
+
+import logging
+import math
+import errno
+import threading
+from collections import Counter
+
+from .prefix import ip_key
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 自适应连接超时模块 =====
+# 在线学习成功连接的RTT分布，按高分位数设置连接超时，缩短在死IP上的等待
+
+class RttSketch:
+    """
+    流式RTT分位数估计（对数分桶直方图）
+
+    按相对误差alpha把延迟映射到对数桶，内存只与延迟跨度有关、与样本数无关，
+    分位数估计的相对误差不超过alpha。
+    """
+
+    def __init__(self, alpha=0.02):
+        self.gamma = (1 + alpha) / (1 - alpha)
+        self.log_gamma = math.log(self.gamma)
+        self.buckets = Counter()
+        self.count = 0
+
+    def add(self, ms):
+        self.buckets[math.ceil(math.log(max(ms, 1.0)) / self.log_gamma)] += 1
+        self.count += 1
+
+    def quantile(self, q):
+        rank = q * (self.count - 1)
+        seen = 0
+        for key in sorted(self.buckets):
+            seen += self.buckets[key]
+            if seen > rank:
+                return 2 * self.gamma ** key / (self.gamma + 1)
+        return 0.0
+
+class AdaptiveConnect:
+    """
+    自适应连接超时
+
+    成功连接的RTT写入分位数草图，样本足够后连接超时取
+    RTT分位数 × 倍数，并限制在[下限, 固定超时]之间。
+    阶段内（begin/end之间）统计相对固定超时节省的墙钟时间：
+    累加每个IP少占用的探测槽位时间，再除以阶段的平均并发数。
+    超时时已观测到的最慢成功RTT（高分位数）与超时相差不到 borderline_retry_margin 倍时，
+    活IP可能被误判，该IP记为边缘IP，由阶段末尾按固定超时重试；
+    超时远高于最慢成功RTT时未连通的IP几乎都是死IP，不再重试。
+    """
+
+    # connect_ex超时时返回的错误码
+    TIMEOUT_ERRNOS = {errno.EAGAIN, errno.EWOULDBLOCK, errno.ETIMEDOUT}
+
+    def __init__(self):
+        self.sketch = RttSketch()
+        self.lock = threading.Lock()
+        self.tracking = False
+        self.borderline = {}
+        self.saved_seconds = 0.0
+        self.timeouts = 0
+
+    def timeout(self):
+        fixed = CONFIG["connect_timeout_seconds"]
+        with self.lock:
+            if not CONFIG["adaptive_connect_enabled"] or self.sketch.count < CONFIG["adaptive_connect_min_samples"]:
+                return fixed
+            rtt = self.sketch.quantile(CONFIG["adaptive_connect_quantile"]) / 1000
+        return min(fixed, max(CONFIG["adaptive_connect_min_seconds"], rtt * CONFIG["adaptive_connect_multiplier"]))
+
+    def record_success(self, ms):
+        with self.lock:
+            self.sketch.add(ms)
+
+    def record_timeout(self, ip, deadline, ports):
+        """记录IP在deadline超时下所有端口均未连通"""
+        shortened = CONFIG["connect_timeout_seconds"] - deadline
+        with self.lock:
+            self.timeouts += 1
+            if not self.tracking or shortened <= 0:
+                return
+            self.saved_seconds += shortened * ports
+            slowest = self.sketch.quantile(CONFIG["borderline_retry_quantile"]) / 1000
+            if deadline < slowest * CONFIG["borderline_retry_margin"]:
+                self.borderline[ip] = ports
+
+    def begin(self):
+        with self.lock:
+            self.tracking = True
+            self.borderline = {}
+            self.saved_seconds = 0.0
+            self.timeouts = 0
+
+    def take_borderline(self):
+        """取出边缘IP，按固定超时重试占用的探测槽位时间不超过节省时间的 borderline_retry_fraction"""
+        fixed = CONFIG["connect_timeout_seconds"]
+        with self.lock:
+            borderline, self.borderline = self.borderline, {}
+            allowance = self.saved_seconds * CONFIG["borderline_retry_fraction"]
+        selected = []
+        for ip in sorted(borderline, key=ip_key):
+            allowance -= fixed * borderline[ip]
+            if allowance < 0:
+                break
+            selected.append(ip)
+        if len(selected) < len(borderline):
+            logger.info(f"📐 边缘IP {len(borderline)} 个，重试时间限额内只重试 {len(selected)} 个")
+        return selected
+
+    def end(self, label, concurrency=1, retried=0, recovered=0, retry_seconds=0.0):
+        """结束阶段统计并输出相对固定超时节省的墙钟时间（按平均并发数折算，已扣除边缘重试耗时）"""
+        with self.lock:
+            self.tracking = False
+            saved = self.saved_seconds / max(1, concurrency)
+            count = self.sketch.count
+        if not count:
+            return
+        quantile = CONFIG["adaptive_connect_quantile"]
+        logger.info(f"📐 {label}: 当前连接超时 {self.timeout():.2f}秒（RTT P{quantile * 100:.0f} "
+                    f"{self.sketch.quantile(quantile):.0f}ms，样本 {count}），超时 {self.timeouts} 个")
+        if retried:
+            logger.info(f"📐 {label}: 边缘重试 {retried} 个，找回 {recovered} 个，耗时 {retry_seconds:.1f}秒")
+        if saved or retry_seconds:
+            logger.info(f"📐 {label}: 相对固定超时节省约 {saved - retry_seconds:.1f}秒墙钟时间")
+
+def adaptive_connect():
+    """当前运行时的自适应连接超时"""
+    state = runtime()
+    with state.lock:
+        if state.adaptive_connect is None:
+            state.adaptive_connect = AdaptiveConnect()
+    return state.adaptive_connect
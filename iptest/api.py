@@ -0,0 +1,91 @@
+"""公共API：采集、探测、地区识别、排名和输出"""
+
+from .candidates import load_candidate_files
+from .concurrency import get_regions_concurrently, test_ips_concurrently
+from .output import write_advanced_outputs, write_ip_lists, write_region_lists
+from .prefix import ip_key, key_to_ip
+from .runtime import CONFIG
+from .sources import SourceTracker, collect_ips
+from .table import ResultTable
+
+# ===== 公共API模块 =====
+# 流水线各步骤的独立入口，配置取自当前运行时（见 Runtime.activate）
+
+def collect():
+    """
+    从IP源和本地候选文件采集候选IP
+
+    IP源取自CONFIG["ip_sources"]，本地候选文件取自CONFIG["candidate_files"]，
+    同时更新源统计文件Sources.json。
+
+    Returns:
+        list: 去重后的候选IP，IP源的IP按源产出优先级排列，本地候选文件中的其余IP排在最后
+    """
+    tracker = SourceTracker()
+    source_ips = collect_ips(tracker)
+    ips = [key_to_ip(key) for key in sorted({ip_key(ip) for ips in source_ips.values() for ip in ips})]
+    ips.sort(key=lambda ip: -tracker.priority(ip))
+    if CONFIG["candidate_files"]:
+        seen = set(ips)
+        ips += [ip for ip in load_candidate_files(CONFIG["candidate_files"]) if ip not in seen]
+    return ips
+
+def probe(ips):
+    """
+    TCP Ping探测（自适应并发与自适应连接超时）
+
+    Args:
+        ips (iterable): 要探测的IP地址
+
+    Returns:
+        ResultTable: 可用IP的结果表（按IP数值排序），delay列为综合延迟
+    """
+    table = ResultTable()
+    for ip, delay in test_ips_concurrently(list(ips)):
+        table.add(ip, delay=delay)
+    table.sort_by_ip()
+    return table
+
+def geolocate(table, rows=None):
+    """
+    识别结果表中各IP的地区，写入地区列
+
+    Args:
+        table (ResultTable): 结果表
+        rows (sequence): 需要识别的行号，默认全部
+
+    Returns:
+        int: 识别的IP数量
+    """
+    return get_regions_concurrently(table, range(len(table)) if rows is None else rows)
+
+def rank(table, rows=None, upload=False):
+    """
+    按综合评分排名
+
+    Args:
+        table (ResultTable): 结果表，至少需要delay列；未测带宽和稳定性的IP分别按0和100计
+        rows (sequence): 参与排名的行号，默认全部
+        upload (bool): 是否把上传带宽计入评分
+
+    Returns:
+        array: 按评分降序排列的行号
+    """
+    return table.score(range(len(table)) if rows is None else rows, upload=upload)
+
+def write(table, ranked=None):
+    """
+    写出结果文件
+
+    全部行按表中顺序写入 IPlist.txt 和 Senflare.txt；给出ranked时再写出
+    IPlist-Pro.txt、Ranking.txt 和 Senflare-Pro.txt。IPv6结果写入对应的 -v6 文件。
+
+    Args:
+        table (ResultTable): 结果表，Senflare.txt 需要先完成地区识别
+        ranked (sequence): rank() 返回的行号
+    """
+    rows = range(len(table))
+    write_ip_lists(table, rows, 'IPlist.txt')
+    write_region_lists(table, rows, 'Senflare.txt')
+    if ranked is not None:
+        write_advanced_outputs(table, ranked)
@@ -0,0 +1,252 @@
+"""应用层延迟探测与上传测试"""
+
+import logging
+import time
+import socket
+import ssl
+import struct
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from .adaptive import AdaptiveConnect, adaptive_connect
+from .concurrency import run_probes
+from .prefix import ip_family
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 应用层延迟模块 =====
+# 同一连接上依次计时TCP连接、TLS握手和首字节时间，反映代理客户端的真实体感延迟
+
+# 各延迟分量约等于多少个往返时间，用于把TCP延迟折算到应用层延迟分量参与排名
+LATENCY_COMPONENT_RTTS = {"connect": 1, "tls": 1, "ttfb": 1, "total": 3}
+
+# TLS上下文按SNI复用；会话票据按 (IP, SNI) 保存在运行时中，只在同一IP复测时恢复，
+# 不同IP之间不共享，保证每个IP的首次握手都是完整握手并校验证书
+
+def rank_latency(components, key=None):
+    """按排名分量取延迟（毫秒），total为三个分量之和"""
+    key = key or CONFIG["latency_rank_key"]
+    if key == "total":
+        return components["connect"] + components["tls"] + components["ttfb"]
+    return components[key]
+
+def app_components(result):
+    """把探测结果 (是否可用, TCP, TLS, 首字节, ...) 转换为延迟分量字典"""
+    return {"connect": result[1], "tls": result[2], "ttfb": result[3]}
+
+def get_app_tls_context():
+    state = runtime()
+    with state.lock:
+        if state.tls_context is None:
+            context = ssl.create_default_context()
+            if not CONFIG["app_probe_verify"]:
+                context.check_hostname = False
+                context.verify_mode = ssl.CERT_NONE
+            state.tls_context = context
+        return state.tls_context
+
+def probe_app_latency(ip, timeout=None):
+    """
+    应用层延迟探测 - TCP连接、TLS握手、首字节时间
+
+    在同一条连接上先完成TCP连接，再以配置的SNI完成TLS握手，
+    最后发送一个小请求（默认 /cdn-cgi/trace）并计时到收到响应的第一个字节。
+
+    Args:
+        ip (str): 要测试的IP地址
+        timeout (float): TCP连接超时（秒），默认使用自适应连接超时
+
+    Returns:
+        tuple: (是否可用, TCP连接毫秒, TLS握手毫秒, 首字节毫秒) - (bool, int, int, int)
+    """
+    family = ip_family(ip)
+    if family is None:
+        return (False, 0, 0, 0)
+
+    sni = CONFIG["app_probe_sni"]
+    request = (f"GET {CONFIG['app_probe_path']} HTTP/1.1\r\nHost: {sni}\r\n"
+               f"User-Agent: Mozilla/5.0\r\nAccept: */*\r\nConnection: close\r\n\r\n").encode()
+    deadline = adaptive_connect().timeout() if timeout is None else timeout
+    connect_ms = tls_ms = 0
+    try:
+        with socket.socket(family, socket.SOCK_STREAM) as raw:
+            raw.settimeout(deadline)
+            start_time = time.time()
+            err = raw.connect_ex((ip, CONFIG["app_probe_port"]))
+            if err != 0:
+                if err in AdaptiveConnect.TIMEOUT_ERRNOS:
+                    adaptive_connect().record_timeout(ip, deadline, 1)
+                return (False, 0, 0, 0)
+            elapsed = (time.time() - start_time) * 1000
+            adaptive_connect().record_success(elapsed)
+            connect_ms = round(elapsed)
+
+            raw.settimeout(CONFIG["app_probe_timeout"])
+            session = runtime().tls_sessions.get((ip, sni)) if CONFIG["app_probe_resume"] else None
+            start_time = time.time()
+            with get_app_tls_context().wrap_socket(raw, server_hostname=sni, session=session) as tls:
+                tls_ms = round((time.time() - start_time) * 1000)
+                start_time = time.time()
+                tls.sendall(request)
+                head = tls.recv(16)
+                ttfb_ms = round((time.time() - start_time) * 1000)
+                if not head.startswith(b"HTTP/"):
+                    return (False, connect_ms, tls_ms, 0)
+                # TLS 1.3的会话票据在握手后下发，读到响应后即可取得
+                if CONFIG["app_probe_resume"] and tls.session is not None:
+                    runtime().tls_sessions[(ip, sni)] = tls.session
+                return (True, connect_ms, tls_ms, ttfb_ms)
+    except (socket.timeout, ssl.SSLError, OSError) as e:
+        logger.debug(f"IP {ip} 应用层探测失败: {str(e)[:50]}")
+    return (False, connect_ms, tls_ms, 0)
+
+def test_app_latency_concurrently(ips, on_result=None):
+    """
+    并发测量应用层延迟（自适应并发）
+
+    Args:
+        ips (list): 要测试的IP地址列表
+        on_result (callable): 每个IP检测完成后的回调 on_result(ip, result)，result为probe_app_latency的返回值
+
+    Returns:
+        dict: 可用IP的延迟分量，格式为{ip: {"connect": 毫秒, "tls": 毫秒, "ttfb": 毫秒}}
+    """
+    logger.info(f"🔐 开始应用层延迟检测 {len(ips)} 个IP（SNI {CONFIG['app_probe_sni']}，"
+                f"排名分量 {CONFIG['latency_rank_key']}）")
+    results = {}
+    completed = 0
+    start_time = time.time()
+
+    def handle(ip, result):
+        nonlocal completed
+        completed += 1
+        if on_result:
+            on_result(ip, result)
+        if result[0]:
+            results[ip] = app_components(result)
+            logger.info(f"🔐 [{completed}/{len(ips)}] {ip}（TCP {result[1]}ms，TLS {result[2]}ms，首字节 {result[3]}ms）")
+        else:
+            logger.info(f"[{completed}/{len(ips)}] {ip} ❌ 应用层探测失败")
+
+    controller = run_probes(ips, probe_app_latency, handle)
+    controller.report("应用层延迟")
+    logger.info(f"🔐 应用层延迟检测完成，{len(results)}/{len(ips)} 个IP可用，总耗时: {time.time() - start_time:.1f}秒")
+    return results
+
+def open_pinned_connection(ip, url, timeout):
+    """
+    建立固定到候选IP的连接
+
+    TCP直接连接候选IP，https地址再以URL主机名作为SNI完成TLS握手（复用TLS上下文和会话票据），
+    保证测量的是该IP而不是DNS解析到的节点。
+
+    Args:
+        ip (str): 候选IP地址
+        url (str): 测试地址，提供协议、端口、Host和路径
+        timeout (float): 连接和读写超时（秒）
+
+    Returns:
+        tuple: (套接字, Host, 路径)
+    """
+    parsed = urlparse(url)
+    https = parsed.scheme == 'https'
+    host = parsed.hostname
+    family = ip_family(ip)
+    if family is None:
+        raise ValueError(f"无效IP地址 {ip}")
+    raw = socket.socket(family, socket.SOCK_STREAM)
+    try:
+        raw.settimeout(timeout)
+        raw.connect((ip, parsed.port or (443 if https else 80)))
+        if not https:
+            return raw, host, parsed.path or '/'
+        session = runtime().tls_sessions.get((ip, host)) if CONFIG["app_probe_resume"] else None
+        tls = get_app_tls_context().wrap_socket(raw, server_hostname=host, session=session)
+        return tls, host, parsed.path or '/'
+    except Exception:
+        raw.close()
+        raise
+
+@lru_cache(maxsize=1)
+def upload_payload(size):
+    """预分配上传数据，所有IP共用；按块发送时只切片memoryview，不复制数据"""
+    return memoryview(bytearray(size))
+
+def unsent_bytes(sock):
+    """
+    内核发送队列中尚未被对端确认的字节数
+
+    Linux上通过SIOCOUTQ查询；不支持时返回发送缓冲区大小，作为未确认数据量的上限。
+    """
+    try:
+        import fcntl
+        import termios
+        queued = fcntl.ioctl(sock.fileno(), termios.TIOCOUTQ, struct.pack('i', 0))
+        return struct.unpack('i', queued)[0]
+    except (ImportError, AttributeError, OSError):
+        return sock.getsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF)
+
+def test_ip_upload(ip, current, total, time_limit=None):
+    """
+    上传带宽测试 - 连接固定到候选IP
+
+    向 upload_test_url（Cloudflare __up 接口）POST预分配的数据，
+    计时从发送第一个数据块到收到服务端响应（服务端收齐数据后才响应）。
+    发送和等待响应的超时都取剩余测试时间，超过时间限制时停止，
+    按已发送数据量减去内核发送队列中未确认的部分计算。
+
+    Args:
+        ip (str): 要测试的IP地址
+        current (int): 当前测试序号
+        total (int): 总测试数量
+        time_limit (float): 最长测试时间（秒），默认使用配置值
+
+    Returns:
+        tuple: (是否成功, 上传带宽Mbps) - (bool, float)
+    """
+    if time_limit is None:
+        time_limit = CONFIG["upload_test_timeout"]
+    size = int(CONFIG["upload_test_size_mb"] * 1024 * 1024)
+    chunk = CONFIG["upload_chunk_kb"] * 1024
+    payload = upload_payload(size)
+    try:
+        sock, host, path = open_pinned_connection(ip, CONFIG["upload_test_url"], min(time_limit, 5))
+        with sock:
+            sock.settimeout(time_limit)
+            sock.sendall((f"POST {path} HTTP/1.1\r\nHost: {host}\r\nUser-Agent: Mozilla/5.0\r\n"
+                          f"Content-Type: application/octet-stream\r\nContent-Length: {size}\r\n"
+                          f"Connection: close\r\n\r\n").encode())
+            start_time = time.monotonic()
+            deadline = start_time + time_limit
+            sent = 0
+            while sent < size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                sock.settimeout(remaining)
+                try:
+                    sent += sock.send(payload[sent:sent + chunk])
+                except socket.timeout:
+                    break
+            status = None
+            if sent == size:
+                # 等待响应同样计入测试时间，避免慢速服务端把单个IP的测试拖长到两倍时限
+                sock.settimeout(max(0.1, deadline - time.monotonic()))
+                try:
+                    status = sock.recv(16)
+                except socket.timeout:
+                    pass
+                if status is not None and not status.startswith(b"HTTP/"):
+                    logger.info(f"📤 [{current}/{total}] {ip} 上传测试无响应")
+                    return (False, 0)
+            elapsed = time.monotonic() - start_time
+            if status is None:
+                # 未在时限内完成：已交给内核但对端未确认的数据不计入
+                sent = max(0, sent - unsent_bytes(sock))
+        mbps = round(sent * 8 / max(elapsed, 1e-6) / 1000000, 2)
+        logger.info(f"📤 [{current}/{total}] {ip}（上传速度：{mbps:.2f}Mbps）")
+        return (True, mbps)
+    except (socket.timeout, ssl.SSLError, OSError) as e:
+        logger.info(f"📤 [{current}/{total}] {ip} 上传测试失败: {str(e)[:50]}")
+        return (False, 0)
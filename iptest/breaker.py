@@ -0,0 +1,154 @@
+"""端点熔断器"""
+
+import logging
+import time
+import threading
+from collections import deque
+
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 熔断与自适应超时模块 =====
+# 按端点统计健康状态：连续失败后熔断并指数退避，超时时间根据观测耗时P99自适应
+
+class CircuitBreaker:
+    """
+    单个端点的熔断器
+
+    - 关闭：正常请求，连续失败breaker_failure_threshold次后熔断
+    - 熔断：在退避时间内直接跳过请求，退避时间每次熔断翻倍
+    - 半开：退避结束后放行一次试探请求，成功则恢复，失败则再次熔断
+    熔断breaker_max_trips次后停用该端点breaker_disable_seconds秒。
+    服务端给出的Retry-After直接作为暂停时间，不计入熔断次数。
+    请求按端点排队（AIMD）：每次限流（429）请求间隔加倍，每次成功请求速率增加RATE_STEP个/秒，
+    使请求速率贴近端点的限流速率；间隔已达上限仍被限流时才按失败计入熔断。
+    超时时间取最近请求耗时P99乘以倍数，限制在[下限, 配置超时]之间。
+    """
+
+    MIN_INTERVAL = 0.05
+    MAX_INTERVAL = 5.0
+    RATE_STEP = 0.5
+
+    def __init__(self, name):
+        self.name = name
+        self.failures = 0
+        self.trips = 0
+        self.open_until = 0.0
+        self.probing = False
+        self.latencies = deque(maxlen=100)
+        self.interval = 0.0
+        self.next_request = 0.0
+        self.throttled_at = 0.0
+        self.lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.open_until > time.time():
+            return 'open'
+        return 'half-open' if self.trips and self.failures else 'closed'
+
+    def allow(self):
+        """是否允许发起请求；半开状态同一时间只放行一个试探请求"""
+        with self.lock:
+            if self.open_until > time.time():
+                return False
+            if self.failures >= CONFIG["breaker_failure_threshold"]:
+                if self.probing:
+                    return False
+                self.probing = True
+            return True
+
+    def pace(self):
+        """按当前请求间隔为本次请求排队，返回需要等待的秒数"""
+        with self.lock:
+            now = time.time()
+            slot = max(now, self.next_request)
+            self.next_request = slot + self.interval
+        return slot - now
+
+    def timeout(self, default):
+        """根据观测耗时计算本次请求超时，无观测数据时使用默认值"""
+        with self.lock:
+            if not self.latencies:
+                return default
+            ordered = sorted(self.latencies)
+            p99 = ordered[int(0.99 * (len(ordered) - 1))]
+        adaptive = max(CONFIG["adaptive_timeout_min_seconds"], p99 * CONFIG["adaptive_timeout_multiplier"])
+        return min(default, adaptive)
+
+    def seed(self, seconds):
+        """用历史耗时初始化观测数据（仅在尚无观测时生效）"""
+        with self.lock:
+            if not self.latencies and seconds > 0:
+                self.latencies.append(seconds)
+
+    def success(self, seconds):
+        with self.lock:
+            self.latencies.append(seconds)
+            self.failures = 0
+            self.probing = False
+            if self.interval:
+                rate = 1 / self.interval + self.RATE_STEP
+                # 速率超过 1/MIN_INTERVAL 后不再限速
+                self.interval = 1 / rate if rate < 1 / self.MIN_INTERVAL else 0.0
+
+    def throttle(self, sent_at, retry_after=None):
+        """
+        端点限流：请求间隔加倍，间隔已达上限时按失败处理
+
+        上次加倍之前发出的请求被限流时不再加倍，同时在途的请求一起被限流只算一次。
+        """
+        with self.lock:
+            now = time.time()
+            exhausted = self.interval >= self.MAX_INTERVAL
+            if sent_at >= self.throttled_at:
+                self.throttled_at = now
+                self.interval = min(self.MAX_INTERVAL, max(self.MIN_INTERVAL, self.interval * 2))
+            self.probing = False
+            self.next_request = max(self.next_request, now + (retry_after or self.interval))
+        if exhausted:
+            self.failure(retry_after)
+
+    def failure(self, retry_after=None):
+        with self.lock:
+            self.failures += 1
+            self.probing = False
+            if retry_after:
+                # 服务端给出了恢复时间，在此之前暂停请求
+                self.open_until = max(self.open_until,
+                                      time.time() + min(retry_after, CONFIG["breaker_backoff_max_seconds"]))
+                return
+            # 熔断前已发出的并发请求陆续失败时不重复熔断
+            if self.failures < CONFIG["breaker_failure_threshold"] or self.open_until > time.time():
+                return
+            self.trips += 1
+            if self.trips >= CONFIG["breaker_max_trips"]:
+                backoff = CONFIG["breaker_disable_seconds"]
+            else:
+                backoff = min(CONFIG["breaker_backoff_seconds"] * 2 ** (self.trips - 1),
+                              CONFIG["breaker_backoff_max_seconds"])
+            self.open_until = time.time() + backoff
+        logger.warning(f"🔌 端点 {self.name} 连续失败 {self.failures} 次，熔断 {backoff:.0f}秒（第{self.trips}次）")
+
+    def reopen_in(self):
+        """距离恢复请求还有多少秒，已停用时返回None"""
+        with self.lock:
+            remaining = self.open_until - time.time()
+            if remaining > 0 and self.trips >= CONFIG["breaker_max_trips"]:
+                return None
+            return max(0.0, remaining)
+
+def get_breaker(name):
+    """按端点名称取当前运行时的熔断器"""
+    state = runtime()
+    with state.lock:
+        if name not in state.breakers:
+            state.breakers[name] = CircuitBreaker(name)
+        return state.breakers[name]
+
+def report_breakers():
+    """输出发生过熔断的端点状态"""
+    for name, breaker in runtime().breakers.items():
+        if breaker.trips:
+            logger.info(f"🔌 {name}: 状态 {breaker.state}，熔断 {breaker.trips} 次，当前超时 {breaker.timeout(float('inf')):.1f}秒")
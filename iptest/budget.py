@@ -0,0 +1,92 @@
+"""运行时间预算"""
+
+import logging
+import time
+
+from .runtime import runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 时间预算模块 =====
+# 为整个流水线分配时间预算，前序阶段超时后动态收缩后续阶段的工作量
+
+class RunBudget:
+    """
+    运行时间预算调度器
+
+    按CONFIG["stage_budget_shares"]为每个阶段分配累计截止时间：
+    前面阶段提前完成时，节省的时间自动留给后续阶段；超时则挤占后续阶段。
+    所有阶段的截止时间都不晚于"总预算 - 输出预留时间"，保证结果文件能完整写出。
+    total_seconds为0时不做任何限制。
+    """
+
+    def __init__(self, total_seconds=0, shares=None, reserve_seconds=0):
+        self.total = total_seconds
+        self.shares = shares or {}
+        self.reserve = min(reserve_seconds, total_seconds / 2)
+        self.start_time = time.time()
+        self.stage = None
+        self.stage_deadline = None
+
+    @property
+    def enabled(self):
+        return self.total > 0
+
+    def work_deadline(self):
+        """所有测试工作的最终截止时间（已扣除输出预留时间）"""
+        return self.start_time + self.total - self.reserve
+
+    def begin_stage(self, name):
+        """进入新阶段，计算该阶段的截止时间"""
+        self.stage = name
+        if not self.enabled:
+            return
+        deadline = self.work_deadline()
+        if name in self.shares:
+            cumulative = 0
+            for stage_name, share in self.shares.items():
+                cumulative += share
+                if stage_name == name:
+                    break
+            deadline = min(deadline, self.start_time + self.total * cumulative)
+        self.stage_deadline = deadline
+        logger.info(f"⏳ 阶段 {name} 时间预算：剩余 {self.stage_remaining():.1f}秒（总剩余 {self.remaining():.1f}秒）")
+
+    def remaining(self):
+        """距离工作截止时间的剩余秒数，未启用时为无穷大"""
+        if not self.enabled:
+            return float('inf')
+        return max(0.0, self.work_deadline() - time.time())
+
+    def stage_remaining(self):
+        """当前阶段剩余秒数，未启用时为无穷大"""
+        if not self.enabled or self.stage_deadline is None:
+            return float('inf')
+        return max(0.0, self.stage_deadline - time.time())
+
+    def stage_expired(self):
+        return self.stage_remaining() <= 0
+
+    def scale(self, stage_names):
+        """
+        计算后续阶段的工作量缩放系数
+
+        Args:
+            stage_names (list): 尚未执行的阶段名称
+
+        Returns:
+            float: 剩余可用时间 / 计划时间，范围0.05-1.0
+        """
+        if not self.enabled:
+            return 1.0
+        planned = self.total * sum(self.shares.get(name, 0) for name in stage_names)
+        if planned <= 0:
+            return 1.0
+        return max(0.05, min(1.0, self.remaining() / planned))
+
+def run_budget():
+    """当前运行时的时间预算，main()启动时按配置重新创建"""
+    state = runtime()
+    if state.budget is None:
+        state.budget = RunBudget()
+    return state.budget
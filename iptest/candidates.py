@@ -0,0 +1,192 @@
+"""本地候选文件的流式解析"""
+
+import logging
+import re
+import os
+import socket
+import sys
+import heapq
+import mmap
+from array import array
+from bisect import bisect_left
+
+# NumPy为可选依赖，存在时用于批量向量化计算
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .prefix import ip_family, ip_to_int, prefilter_sets
+from .runtime import CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ===== 本地候选文件模块 =====
+# 内存映射分块解析扫描器导出的大文件，IPv4地址直接存为整数数组，预过滤和去重都不经过字符串
+
+IPV4_BYTES_PATTERN = re.compile(rb'(?<![\d.])\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}(?![\d.])')
+
+def pack_ipv4(matches):
+    """将匹配到的IPv4文本转换为4字节网络序表示，跳过无效地址"""
+    packed = []
+    for match in matches:
+        try:
+            packed.append(socket.inet_pton(socket.AF_INET, match.decode('ascii')))
+        except OSError:
+            continue
+    return b''.join(packed)
+
+def parse_ipv4_block(block):
+    """
+    向量化解析一段文本中的IPv4地址（需要NumPy）
+
+    与IPV4_BYTES_PATTERN等价：地址必须是一段完整的由数字和点组成的连续字符，
+    恰好4段、每段1-3位数字。各段数值按分隔符位置直接从字节数组计算，
+    某段大于255或带前导零的地址被跳过（与inet_pton一致）。
+
+    Args:
+        block (bytes): 文本块
+
+    Returns:
+        numpy.ndarray: uint32数组（未去重）
+    """
+    text = np.frombuffer(block, dtype=np.uint8)
+    is_dot = text == ord('.')
+    in_run = is_dot | ((text >= ord('0')) & (text <= ord('9')))
+    # 由数字和点组成的连续段的起止位置
+    edges = np.flatnonzero(np.diff(in_run, prepend=False, append=False))
+    starts, ends = edges[0::2], edges[1::2]
+    dots = np.flatnonzero(is_dot)
+    first_dot = np.searchsorted(dots, starts)
+    lengths = ends - starts
+    keep = (lengths >= 7) & (lengths <= 15) & (np.searchsorted(dots, ends) - first_dot == 3)
+    starts, ends, first_dot = starts[keep], ends[keep], first_dot[keep]
+    # 各段的 [起点, 终点)
+    field_starts = np.stack([starts, dots[first_dot] + 1, dots[first_dot + 1] + 1, dots[first_dot + 2] + 1])
+    field_ends = np.stack([dots[first_dot], dots[first_dot + 1], dots[first_dot + 2], ends])
+    field_lengths = field_ends - field_starts
+
+    def digit(index):
+        return text[index].astype(np.int32) - ord('0')
+
+    octets = (digit(field_ends - 1) + 10 * digit(np.maximum(field_ends - 2, 0)) * (field_lengths >= 2)
+              + 100 * digit(np.maximum(field_ends - 3, 0)) * (field_lengths >= 3))
+    invalid = ((field_lengths < 1) | (field_lengths > 3) | (octets > 255)
+               | ((field_lengths > 1) & (text[np.minimum(field_starts, len(text) - 1)] == ord('0'))))
+    octets = octets[:, ~invalid.any(axis=0)].astype(np.uint32)
+    return (octets[0] << 24) | (octets[1] << 16) | (octets[2] << 8) | octets[3]
+
+def scan_candidate_file(path, chunk_size):
+    """
+    分块解析本地候选文件
+
+    文件以只读方式内存映射，按换行符对齐切分为约chunk_size字节的分块，
+    正则直接在映射区上匹配，每块产出一个IPv4整数数组（未去重）。
+
+    Args:
+        path (str): 文件路径
+        chunk_size (int): 分块字节数
+
+    Yields:
+        numpy.ndarray | array: IPv4整数数组，安装NumPy时向量化解析（见parse_ipv4_block），否则为'I'数组
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            if hasattr(mmap, 'MADV_SEQUENTIAL'):
+                data.madvise(mmap.MADV_SEQUENTIAL)
+            size = len(data)
+            start = 0
+            while start < size:
+                end = min(start + chunk_size, size)
+                if end < size:
+                    newline = data.rfind(b'\n', start, end)
+                    end = newline + 1 if newline >= 0 else end
+                if np is not None:
+                    yield parse_ipv4_block(data[start:end])
+                else:
+                    values = array('I')
+                    values.frombytes(pack_ipv4(IPV4_BYTES_PATTERN.findall(data, start, end)))
+                    if sys.byteorder == 'little':
+                        values.byteswap()
+                    yield values
+                start = end
+
+def merge_unique(runs):
+    """
+    多路归并已排序的分块并去重
+
+    Args:
+        runs (list): 各自有序且无重复的uint32数组或'I'数组
+
+    Returns:
+        array: 全局有序且无重复的'I'数组
+    """
+    merged = array('I')
+    if np is not None and runs:
+        values = np.unique(np.concatenate([np.frombuffer(run, dtype=np.uint32) for run in runs]))
+        merged.frombytes(values.astype(np.uint32).tobytes())
+        return merged
+    last = None
+    for value in heapq.merge(*runs):
+        if value != last:
+            merged.append(value)
+            last = value
+    return merged
+
+def load_candidate_files(paths):
+    """
+    读取本地候选文件
+
+    每个分块先按Cloudflare网段预过滤，再排序去重为一个有序段，最后归并所有段。
+    内存占用约为每个保留地址4字节，加上一个分块的解析开销。
+
+    Args:
+        paths (list): 文件路径列表
+
+    Returns:
+        IPv4Candidates: 有序去重后的候选地址
+    """
+    chunk_size = max(1, int(CONFIG["candidate_chunk_mb"] * 1024 * 1024))
+    allow, deny = prefilter_sets(4)
+    runs = []
+    parsed = 0
+    for path in paths:
+        try:
+            for values in scan_candidate_file(path, chunk_size):
+                parsed += len(values)
+                if np is not None:
+                    # 布尔掩码一次筛出整块，np.unique排序去重
+                    if CONFIG["cf_prefilter_enabled"] and len(values):
+                        values = values[allow.mask(values) & ~deny.mask(values)]
+                    runs.append(np.unique(values))
+                    continue
+                if CONFIG["cf_prefilter_enabled"] and values:
+                    values = [v for v, ok, bad in zip(values, allow.mask(values), deny.mask(values)) if ok and not bad]
+                runs.append(array('I', sorted(set(values))))
+        except OSError as e:
+            logger.error(f"❌ 读取候选文件 {path} 失败: {str(e)[:50]}")
+    candidates = IPv4Candidates(merge_unique(runs))
+    logger.info(f"📂 本地候选文件: 解析 {parsed} 个地址，预过滤并去重后保留 {len(candidates)} 个")
+    return candidates
+
+class IPv4Candidates:
+    """有序IPv4整数数组的惰性视图：迭代时才转换为字符串，可直接流式送入探测"""
+
+    def __init__(self, values):
+        self.values = values
+
+    def __len__(self):
+        return len(self.values)
+
+    def __iter__(self):
+        for value in self.values:
+            yield socket.inet_ntoa(value.to_bytes(4, 'big'))
+
+    def __contains__(self, ip):
+        if ip_family(ip) != socket.AF_INET:
+            return False
+        value = ip_to_int(ip)
+        index = bisect_left(self.values, value)
+        return index < len(self.values) and self.values[index] == value
@@ -0,0 +1,197 @@
+"""断点续跑"""
+
+import logging
+import os
+import time
+import json
+import gzip
+import zlib
+import hashlib
+
+from .runtime import CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ===== 断点续跑模块 =====
+# 每个阶段把结果保存为gzip压缩的JSON断点（按IP记录的测量结果为追加写入的JSON Lines日志），
+# 中断后重新运行时复用未过期的结果
+
+# 影响测量结果的配置项：断点记录这些配置的指纹，重新运行时配置不同则不复用
+CHECKPOINT_CONFIG_KEYS = (
+    "ip_sources", "candidate_files", "ipv6_enabled", "cf_prefilter_enabled", "cf_ipv4_ranges", "cf_ipv6_ranges",
+    "prefilter_allow_cidrs", "prefilter_deny_cidrs", "test_ports",
+    "latency_mode", "app_probe_port", "app_probe_sni", "app_probe_path", "app_probe_verify",
+    "bandwidth_test_urls", "bandwidth_test_size_mb", "upload_test_url", "upload_test_size_mb",
+)
+
+def config_fingerprint():
+    """返回影响测量结果的配置项的指纹"""
+    config = {key: CONFIG[key] for key in CHECKPOINT_CONFIG_KEYS}
+    return hashlib.sha1(json.dumps(config, sort_keys=True).encode()).hexdigest()[:16]
+
+def checkpoint_path(stage):
+    return os.path.join(CONFIG["checkpoint_dir"], f"{stage}.json.gz")
+
+def journal_path(stage):
+    return os.path.join(CONFIG["checkpoint_dir"], f"{stage}.jsonl.gz")
+
+def save_checkpoint(stage, data):
+    """
+    保存阶段断点（原子写入）
+
+    Args:
+        stage (str): 阶段名称
+        data (dict): 可JSON序列化的阶段数据
+    """
+    if not CONFIG["checkpoint_enabled"]:
+        return
+    try:
+        os.makedirs(CONFIG["checkpoint_dir"], exist_ok=True)
+        path = checkpoint_path(stage)
+        payload = {"saved_at": time.time(), "config": config_fingerprint(), "data": data}
+        with gzip.open(f"{path}.tmp", 'wt', encoding='utf-8') as f:
+            json.dump(payload, f, ensure_ascii=False, separators=(',', ':'))
+        os.replace(f"{path}.tmp", path)
+    except Exception as e:
+        logger.warning(f"⚠️ 保存断点 {stage} 失败: {str(e)[:50]}")
+
+def load_checkpoint(stage):
+    """
+    加载阶段断点
+
+    Args:
+        stage (str): 阶段名称
+
+    Returns:
+        dict: 阶段数据；断点不存在、已过期、损坏或由不同配置产生时返回None
+    """
+    path = checkpoint_path(stage)
+    if not CONFIG["checkpoint_enabled"] or not os.path.exists(path):
+        return None
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            payload = json.load(f)
+    except Exception as e:
+        logger.warning(f"⚠️ 断点 {stage} 损坏，忽略: {str(e)[:50]}")
+        return None
+    age_minutes = (time.time() - payload.get("saved_at", 0)) / 60
+    if age_minutes >= CONFIG["checkpoint_max_age_minutes"]:
+        logger.info(f"♻️ 断点 {stage} 已过期（{age_minutes:.0f}分钟前），重新执行")
+        return None
+    if payload.get("config") != config_fingerprint():
+        logger.info(f"♻️ 断点 {stage} 由不同的配置产生（端口、延迟模式、SNI等），重新执行")
+        return None
+    return payload.get("data")
+
+def clear_checkpoints():
+    """删除所有断点文件（流程完整结束或指定 --no-resume 时调用）"""
+    if not os.path.isdir(CONFIG["checkpoint_dir"]):
+        return
+    for name in os.listdir(CONFIG["checkpoint_dir"]):
+        if name.endswith(('.json.gz', '.jsonl.gz')):
+            try:
+                os.remove(os.path.join(CONFIG["checkpoint_dir"], name))
+            except OSError:
+                pass
+    logger.info("♻️ 已清理断点文件")
+
+class StageCheckpoint:
+    """
+    按IP记录测量结果的阶段断点
+
+    结果以gzip压缩的JSON Lines日志追加写入：每次保存只追加一个包含新增结果的gzip成员，
+    保存开销与新增结果数成正比，不随已记录的结果总数增长；中断时未写完的最后一个成员被忽略。
+    每条结果附带测量时间戳，重新运行时只复用未超过
+    CONFIG["checkpoint_max_age_minutes"]的结果，其余IP重新测量。
+    retain为False时新测量的结果只写入日志、不保留在内存中，用于调用方不再读取结果的大阶段（快速筛选）。
+    作为上下文管理器使用时，退出（包括异常退出）时自动保存。
+    """
+
+    def __init__(self, stage, retain=True):
+        self.stage = stage
+        self.retain = retain
+        self.entries = self._load()
+        self.restored = set(self.entries)   # 从断点恢复、本次尚未重新测量的IP
+        self.reused = set()                 # 实际复用了断点结果的IP（同一IP多次读取只计一次）
+        if self.entries:
+            logger.info(f"♻️ 断点 {stage} 恢复 {len(self.entries)} 条未过期测量结果")
+        # 日志重新开始，只写入未过期的结果，之后的保存都是追加
+        self.pending = [[ip] + entry for ip, entry in self.entries.items()]
+        self._write(rewrite=True)
+        self._last_flush = time.time()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.flush()
+        if self.reused:
+            logger.info(f"♻️ 阶段 {self.stage} 复用了 {len(self.reused)} 条断点测量结果")
+        return False
+
+    def _load(self):
+        """读取日志中未过期的结果，后写入的结果覆盖同一IP先前的结果"""
+        path = journal_path(self.stage)
+        if not CONFIG["checkpoint_enabled"] or not os.path.exists(path):
+            return {}
+        entries = {}
+        try:
+            with gzip.open(path, 'rt', encoding='utf-8') as f:
+                header = json.loads(f.readline())
+                if header.get("config") != config_fingerprint():
+                    logger.info(f"♻️ 断点 {self.stage} 由不同的配置产生（端口、延迟模式、SNI等），重新执行")
+                    return {}
+                for line in f:
+                    ip, *entry = json.loads(line)
+                    entries[ip] = entry
+        except (OSError, EOFError, ValueError, zlib.error) as e:
+            # 中断时最后一次追加可能没有写完，保留此前完整的记录
+            logger.warning(f"⚠️ 断点 {self.stage} 末尾不完整，恢复此前的记录: {str(e)[:50]}")
+        oldest = time.time() - CONFIG["checkpoint_max_age_minutes"] * 60
+        return {ip: entry for ip, entry in entries.items() if entry[-1] >= oldest}
+
+    def _write(self, rewrite=False):
+        """把待保存的结果追加到日志；rewrite时以新的文件头原子重写整个日志"""
+        if not CONFIG["checkpoint_enabled"]:
+            self.pending = []
+            return
+        try:
+            os.makedirs(CONFIG["checkpoint_dir"], exist_ok=True)
+            path = journal_path(self.stage)
+            target = f"{path}.tmp" if rewrite else path
+            with gzip.open(target, 'wt' if rewrite else 'at', encoding='utf-8') as f:
+                if rewrite:
+                    f.write(json.dumps({"saved_at": time.time(), "config": config_fingerprint()}) + '\n')
+                for row in self.pending:
+                    f.write(json.dumps(row, ensure_ascii=False, separators=(',', ':')) + '\n')
+            if rewrite:
+                os.replace(target, path)
+        except Exception as e:
+            logger.warning(f"⚠️ 保存断点 {self.stage} 失败: {str(e)[:50]}")
+        self.pending = []
+
+    def get(self, ip):
+        """返回IP的已有测量结果元组，没有则返回None"""
+        entry = self.entries.get(ip)
+        if entry is None:
+            return None
+        if ip in self.restored:
+            self.reused.add(ip)
+        return tuple(entry[:-1])
+
+    def put(self, ip, result):
+        """记录IP的测量结果，按间隔自动保存"""
+        entry = list(result) + [round(time.time(), 1)]
+        if self.retain:
+            self.entries[ip] = entry
+        else:
+            self.entries.pop(ip, None)
+        self.restored.discard(ip)
+        self.pending.append([ip] + entry)
+        if time.time() - self._last_flush >= CONFIG["checkpoint_flush_seconds"]:
+            self.flush()
+
+    def flush(self):
+        if self.pending:
+            self._write()
+        self._last_flush = time.time()
@@ -0,0 +1,122 @@
+"""命令行入口"""
+
+import logging
+import argparse
+
+from .checkpoint import clear_checkpoints
+from .geo import clean_expired_cache, load_region_cache, save_region_cache
+from .runtime import CONFIG, setup_logging
+
+logger = logging.getLogger(__name__)
+
+# ===== 程序入口 =====
+# 程序启动入口，初始化缓存并执行主程序；各运行模式的模块在选定后才导入
+
+# 各运行模式被中断时的提示，只有完整流程保存了断点
+INTERRUPT_MESSAGES = {
+    "daemon": "⏹️ 常驻模式已停止",
+    "serve": "⏹️ 查询服务已停止",
+    "main": "⏹️ 程序被用户中断，断点已保存，重新运行将从中断处继续",
+}
+
+def parse_args(argv=None):
+    """
+    解析命令行参数并写入CONFIG
+
+    Args:
+        argv (list): 命令行参数列表，默认读取sys.argv
+
+    Returns:
+        argparse.Namespace: 解析后的参数
+    """
+    parser = argparse.ArgumentParser(description='Cloudflare优选IP采集器')
+    parser.add_argument('--profile', choices=['cprofile', 'sample', 'tracemalloc'],
+                        help='按阶段进行性能分析：cprofile（.pstats + 火焰图）、sample（仅采样火焰图）、tracemalloc（内存峰值）')
+    parser.add_argument('--profile-dir', default=CONFIG["profile_dir"],
+                        help='性能分析结果输出目录')
+    parser.add_argument('--daemon', action='store_true',
+                        help='常驻模式：持续按优先级复测IP并在排名变化时更新输出文件')
+    parser.add_argument('--serve', action='store_true',
+                        help='查询服务：加载当前目录的排名结果，通过HTTP按地区、评分和延迟查询')
+    parser.add_argument('--serve-host', default=CONFIG["serve_host"], help='查询服务监听地址')
+    parser.add_argument('--serve-port', type=int, default=CONFIG["serve_port"], help='查询服务监听端口')
+    parser.add_argument('--no-resume', action='store_true',
+                        help='忽略并清除已有断点，从头开始运行')
+    parser.add_argument('--checkpoint-max-age', type=float, default=CONFIG["checkpoint_max_age_minutes"],
+                        help='断点中测量结果的有效期（分钟）')
+    parser.add_argument('--time-budget', type=float, default=CONFIG["time_budget_seconds"],
+                        help='整体运行时间预算（秒），各阶段按比例分配，0表示不限制')
+    parser.add_argument('--latency-mode', choices=['tcp', 'app'], default=CONFIG["latency_mode"],
+                        help='延迟探测模式：tcp（仅TCP连接）或 app（TCP连接 + TLS握手 + 首字节）')
+    parser.add_argument('--rank-key', choices=['connect', 'tls', 'ttfb', 'total'], default=CONFIG["latency_rank_key"],
+                        help='app模式下排名和评分使用的延迟分量')
+    parser.add_argument('--sni', default=CONFIG["app_probe_sni"],
+                        help='app模式下TLS握手使用的SNI（同时作为HTTP Host）')
+    parser.add_argument('--upload', action='store_true', default=CONFIG["upload_test_enabled"],
+                        help='对通过带宽测试的IP进行上传测试（连接固定到候选IP）')
+    parser.add_argument('--score-profile', choices=sorted(CONFIG["score_profiles"]), default=CONFIG["score_profile"],
+                        help='综合评分方案：各指标按百分位归一化后使用的权重组合')
+    parser.add_argument('--ipv4-only', action='store_true', default=not CONFIG["ipv6_enabled"],
+                        help='只采集和检测IPv4地址（本机无IPv6连通性时使用）')
+    parser.add_argument('--candidates', action='append', default=[], metavar='PATH',
+                        help='本地候选文件（masscan等扫描器导出，可重复指定），分块解析后与IP源一起检测')
+    args = parser.parse_args(argv)
+
+    CONFIG["profile_mode"] = args.profile
+    CONFIG["profile_dir"] = args.profile_dir
+    CONFIG["time_budget_seconds"] = args.time_budget
+    CONFIG["checkpoint_max_age_minutes"] = args.checkpoint_max_age
+    CONFIG["latency_mode"] = args.latency_mode
+    CONFIG["latency_rank_key"] = args.rank_key
+    CONFIG["app_probe_sni"] = args.sni
+    CONFIG["upload_test_enabled"] = args.upload
+    CONFIG["score_profile"] = args.score_profile
+    CONFIG["ipv6_enabled"] = not args.ipv4_only
+    CONFIG["candidate_files"] = CONFIG["candidate_files"] + args.candidates
+    CONFIG["serve_host"] = args.serve_host
+    CONFIG["serve_port"] = args.serve_port
+    return args
+
+def run(argv=None):
+    """
+    程序启动入口
+    
+    配置日志，初始化缓存系统，执行主程序流程，处理异常情况。
+    支持用户中断和异常处理。
+
+    Args:
+        argv (list): 命令行参数列表，默认读取sys.argv
+    """
+    # 解析命令行参数后再配置日志，--help 和参数错误不会创建或截断日志文件
+    args = parse_args(argv)
+    setup_logging()
+    if args.no_resume:
+        clear_checkpoints()
+    mode = "daemon" if args.daemon else "serve" if args.serve else "main"
+
+    # 程序启动日志
+    logger.info("🚀 ===== 开始IP处理程序 =====")
+    
+    # 初始化缓存系统
+    load_region_cache()
+    
+    # 清理过期缓存条目
+    clean_expired_cache()
+    
+    # 执行主程序流程
+    try:
+        if mode == "daemon":
+            from .daemon import run_daemon
+            run_daemon()
+        elif mode == "serve":
+            from .serve import run_server
+            run_server()
+        else:
+            from .pipeline import main
+            main()
+    except KeyboardInterrupt:
+        logger.info(INTERRUPT_MESSAGES[mode])
+        save_region_cache()
+    except Exception as e:
+        logger.error(f"❌ 程序运行出错: {str(e)}")
+        save_region_cache()
@@ -0,0 +1,382 @@
+"""自适应并发探测"""
+
+import logging
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait, FIRST_COMPLETED
+from collections import deque
+
+from .adaptive import adaptive_connect
+from .budget import run_budget
+from .geo import REGION_DEFERRED, get_ip_region, region_api_reopen_seconds
+from .network import test_ip_availability
+from .runtime import CONFIG, submit
+
+logger = logging.getLogger(__name__)
+
+# ===== 自适应并发模块 =====
+# AIMD并发控制：RTT与失败率稳定时加性增加在途探测数，恶化时乘性减少；令牌桶控制探测发起速率
+
+class ConnectPacer:
+    """令牌桶限速：每秒最多发起rate个探测，允许burst个突发（仅由提交线程调用）"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = max(1, burst)
+        self.tokens = float(self.burst)
+        self.updated = time.monotonic()
+
+    def take(self):
+        if self.rate <= 0:
+            return
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            time.sleep((1 - self.tokens) / self.rate)
+
+class AimdController:
+    """
+    AIMD并发控制器
+
+    每完成aimd_window个探测评估一次：窗口内成功RTT中位数和错误率经EWMA平滑后与基线（最近稳定窗口的
+    汇总样本）比较，没有拥塞时并发上限加aimd_increase，拥塞时乘以aimd_decrease_factor。
+    只有拥塞信号才触发减少：RTT虚高，或提前返回的失败（拒绝、重置、本地资源不足）增多；
+    跑满连接超时的失败是死IP，与并发无关，不计入错误率。平滑值和当前窗口都超过阈值才算拥塞，
+    单个噪声窗口不会触发减少。前两个窗口只用于建立基线；减少后跳过一个窗口，避免减少前发出的探测再次触发减少。
+    """
+
+    WARMUP_WINDOWS = 2
+    MIN_RTT_SAMPLES = 5
+
+    def __init__(self, initial=None):
+        initial = initial or CONFIG["max_workers"]
+        self.enabled = CONFIG["aimd_enabled"]
+        self.min_limit = min(initial, CONFIG["aimd_min_workers"]) if self.enabled else initial
+        self.max_limit = max(initial, CONFIG["aimd_max_workers"]) if self.enabled else initial
+        self.limit = float(initial)
+        self.in_flight = 0
+        self.window = []
+        self.windows = 0
+        self.stable_rtts = deque(maxlen=500)
+        self.stable_errors = deque(maxlen=500)
+        self.rtt_ewma = None
+        self.error_ewma = None
+        self.cooldown = False
+        self.start = time.time()
+        self.busy_seconds = 0.0
+        self.history = [(0.0, initial)]
+        self.lock = threading.Lock()
+
+    def try_acquire(self):
+        with self.lock:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+            return False
+
+    def release(self, ok, rtt_ms, seconds):
+        with self.lock:
+            self.in_flight -= 1
+            self.busy_seconds += seconds
+            if not self.enabled:
+                return
+            self.window.append((ok, rtt_ms, seconds))
+            if len(self.window) >= CONFIG["aimd_window"]:
+                self._evaluate()
+
+    def _evaluate(self):
+        window, self.window = self.window, []
+        if self.cooldown:
+            self.cooldown = False
+            return
+        self.windows += 1
+        # 耗时不到连接超时的失败才是错误，跑满超时的是死IP
+        timeout = adaptive_connect().timeout() * 0.9
+        window = [(ok, rtt, not ok and seconds < timeout) for ok, rtt, seconds in window]
+        error = sum(1 for _, _, failed in window if failed) / len(window)
+        rtts = sorted(rtt for ok, rtt, _ in window if ok)
+        median = rtts[len(rtts) // 2] if len(rtts) >= self.MIN_RTT_SAMPLES else None
+        alpha = CONFIG["aimd_ewma_alpha"]
+        self.error_ewma = error if self.error_ewma is None else alpha * error + (1 - alpha) * self.error_ewma
+        if median is not None:
+            self.rtt_ewma = median if self.rtt_ewma is None else alpha * median + (1 - alpha) * self.rtt_ewma
+        if self.windows <= self.WARMUP_WINDOWS:
+            self._absorb(window)
+            return
+
+        baseline_error = sum(self.stable_errors) / len(self.stable_errors)
+        stable_rtts = sorted(self.stable_rtts)
+        baseline_rtt = stable_rtts[len(stable_rtts) // 2] if stable_rtts else None
+        old = int(self.limit)
+        rtt_limit = baseline_rtt * CONFIG["aimd_rtt_tolerance"] if baseline_rtt is not None else None
+        error_limit = baseline_error + CONFIG["aimd_failure_tolerance"]
+        degraded = (rtt_limit is not None and median is not None
+                    and self.rtt_ewma > rtt_limit and median > rtt_limit) or (
+            self.error_ewma > error_limit and error > error_limit)
+        if degraded:
+            self.limit = max(self.min_limit, self.limit * CONFIG["aimd_decrease_factor"])
+            self.cooldown = True
+        else:
+            self.limit = min(self.max_limit, self.limit + CONFIG["aimd_increase"])
+            self._absorb(window)
+
+        if int(self.limit) != old:
+            self.history.append((time.time() - self.start, int(self.limit)))
+            if degraded:
+                rtt_text = f"{self.rtt_ewma:.0f}ms" if self.rtt_ewma is not None else "-"
+                baseline_text = f"{baseline_rtt:.0f}ms" if baseline_rtt is not None else "-"
+                logger.info(f"🎚️ 并发上限 {old} → {int(self.limit)}（平滑RTT中位数 {rtt_text}/基线 {baseline_text}，"
+                            f"错误率 {self.error_ewma:.0%}/基线 {baseline_error:.0%}）")
+
+    def rebaseline(self):
+        """探测对象的分布发生变化时丢弃基线，重新经过预热窗口建立；并发上限保持不变"""
+        with self.lock:
+            self.window = []
+            self.windows = 0
+            self.stable_rtts.clear()
+            self.stable_errors.clear()
+            self.rtt_ewma = None
+            self.error_ewma = None
+            self.cooldown = False
+
+    def _absorb(self, window):
+        """稳定窗口的样本并入基线"""
+        for ok, rtt, failed in window:
+            self.stable_errors.append(1 if failed else 0)
+            if ok:
+                self.stable_rtts.append(rtt)
+
+    def mean_concurrency(self):
+        """平均在途探测数 = 探测总耗时 / 墙钟时间"""
+        elapsed = time.time() - self.start
+        return self.busy_seconds / elapsed if elapsed > 0 else 1
+
+    def report(self, label):
+        """输出并发上限随时间的变化（最多12个采样点）"""
+        history = self.history
+        if len(history) > 12:
+            step = (len(history) - 1) / 11
+            history = [history[round(i * step)] for i in range(12)]
+        timeline = " → ".join(f"{seconds:.0f}s:{limit}" for seconds, limit in history)
+        logger.info(f"🎚️ {label}: 平均并发 {self.mean_concurrency():.1f}，并发上限变化 {timeline}")
+
+def run_probes(ips, probe, on_result, controller=None):
+    """
+    在自适应并发控制下执行探测
+
+    probe(ip) 在线程池中执行并返回 (是否可用, 延迟毫秒数)，
+    on_result(ip, result) 在调用线程中按完成顺序回调。时间预算耗尽时停止提交新的探测。
+
+    Args:
+        ips (iterable): 要探测的IP地址，可以是列表或按需产生IP的迭代器
+        probe (callable): 探测函数
+        on_result (callable): 结果回调
+        controller (AimdController): 并发控制器，默认新建
+
+    Returns:
+        AimdController: 本次使用的并发控制器
+    """
+    controller = controller or AimdController()
+    pacer = ConnectPacer(CONFIG["probe_connect_rate"], CONFIG["probe_connect_burst"])
+
+    def task(ip):
+        start_time = time.time()
+        result = (False, 0)
+        try:
+            result = probe(ip)
+        except Exception as e:
+            logger.error(f"{ip} ❌ 检测出错: {str(e)[:30]}")
+        finally:
+            controller.release(result[0], result[1], time.time() - start_time)
+        return result
+
+    pending = {}
+    with ThreadPoolExecutor(max_workers=controller.max_limit) as executor:
+        for index, ip in enumerate(ips):
+            if run_budget().stage_expired():
+                remaining = f" {len(ips) - index} 个" if hasattr(ips, '__len__') else ""
+                logger.warning(f"⏳ 时间预算耗尽，跳过剩余{remaining}IP的检测")
+                break
+            # 在途探测数达到上限时先处理已完成的结果
+            while not controller.try_acquire():
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    on_result(pending.pop(future), future.result())
+            pacer.take()
+            pending[submit(executor, task, ip)] = ip
+        for future in as_completed(list(pending)):
+            on_result(pending.pop(future), future.result())
+    return controller
+
+def retry_borderline(probe, on_result, controller=None):
+    """
+    边缘重试：自适应超时内未连通的边缘IP按固定超时分批再测一次
+
+    一批的找回率低于 borderline_retry_min_recovery 或时间预算耗尽时放弃剩余IP，
+    避免在死IP上花掉比自适应超时节省的更多时间。
+
+    Args:
+        probe (callable): probe(ip, timeout) 探测函数
+        on_result (callable): 结果回调，result[0]为是否可用
+        controller (AimdController): 并发控制器，默认新建
+
+    Returns:
+        tuple: (重试数, 找回数, 耗时秒数)
+    """
+    borderline = adaptive_connect().take_borderline()
+    if not borderline or not CONFIG["borderline_retry_enabled"]:
+        return 0, 0, 0.0
+    timeout = CONFIG["connect_timeout_seconds"]
+    batch_size = max(1, CONFIG["borderline_retry_batch"])
+    retried = recovered = 0
+    start_time = time.time()
+
+    def handle(ip, result):
+        nonlocal recovered
+        if result[0]:
+            recovered += 1
+        on_result(ip, result)
+
+    logger.info(f"🔁 边缘重试 {len(borderline)} 个IP（超时 {timeout}秒）")
+    for index in range(0, len(borderline), batch_size):
+        if run_budget().stage_expired():
+            break
+        batch = borderline[index:index + batch_size]
+        found = recovered
+        controller = run_probes(batch, lambda ip: probe(ip, timeout), handle, controller)
+        retried += len(batch)
+        if recovered - found < len(batch) * CONFIG["borderline_retry_min_recovery"]:
+            if index + batch_size < len(borderline):
+                logger.info(f"🔁 边缘重试找回率过低（{recovered - found}/{len(batch)}），"
+                            f"放弃剩余 {len(borderline) - retried} 个IP")
+            break
+    return retried, recovered, time.time() - start_time
+
+# ===== 并发处理模块 =====
+# 高并发网络测试功能，支持多线程并发处理
+
+def test_ips_concurrently(ips, max_workers=None, on_result=None):
+    """
+    超快并发检测IP可用性（自适应并发）
+    
+    使用ThreadPoolExecutor实现并发处理，在途探测数由AIMD控制器动态调整，
+    探测发起速率由令牌桶限制，避免本地SYN丢弃导致RTT虚高、干扰延迟排名。
+    
+    Args:
+        ips (list): 要测试的IP地址列表
+        max_workers (int): 初始并发数，默认使用配置值
+        on_result (callable): 每个IP检测完成后的回调 on_result(ip, is_available, delay)
+    
+    Returns:
+        list: 可用IP列表，格式为[(ip, delay), ...]
+    """
+    controller = AimdController(max_workers)
+    logger.info(f"📡 开始并发检测 {len(ips)} 个IP，初始并发 {int(controller.limit)}，上限 {controller.max_limit}")
+    available_ips = []
+    start_time = time.time()
+    completed = 0
+    adaptive_connect().begin()
+    
+    def handle(ip, result):
+        nonlocal completed
+        completed += 1
+        is_available, delay = result
+        if on_result:
+            on_result(ip, is_available, delay)
+        if is_available:
+            available_ips.append((ip, delay))
+            logger.info(f"🎯 [{completed}/{len(ips)}] {ip}（TCP Ping 综合延迟：{delay:.1f}ms）")
+        else:
+            logger.info(f"[{completed}/{len(ips)}] {ip} ❌ 不可用 - 耗时: {time.time() - start_time:.1f}s")
+    
+    run_probes(ips, test_ip_availability, handle, controller)
+    concurrency = controller.mean_concurrency()
+    
+    def handle_retry(ip, result):
+        is_available, delay = result
+        if is_available:
+            if on_result:
+                on_result(ip, is_available, delay)
+            available_ips.append((ip, delay))
+            logger.info(f"🎯 [重试] {ip}（TCP Ping 综合延迟：{delay:.1f}ms）")
+    
+    # 重试的都是边缘IP，与主阶段的分布不同，并发从配置的初始值重新开始，不继承主阶段的上限
+    retried, recovered, retry_seconds = retry_borderline(test_ip_availability, handle_retry,
+                                                         AimdController(max_workers))
+    adaptive_connect().end("并发检测", concurrency, retried, recovered, retry_seconds)
+    controller.report("并发检测")
+    
+    total_time = time.time() - start_time
+    logger.info(f"📡 并发检测完成，发现 {len(available_ips)} 个可用IP，总耗时: {total_time:.1f}秒")
+    return available_ips
+
+def get_regions_concurrently(table, rows, max_workers=None):
+    """
+    并发识别IP地理位置，保持日志输出顺序
+    
+    使用多线程并发查询IP的地理位置信息，同时保持日志输出的顺序性，
+    提升查询效率的同时保证用户体验。识别结果原地写入结果表的地区列。
+    地区API熔断或限流期间跳过的IP在熔断结束后重新排队查询（最多region_retry_rounds轮）。
+    
+    Args:
+        table (ResultTable): 结果表
+        rows (sequence): 需要识别的行号
+        max_workers (int): 最大并发线程数，默认使用配置值
+    
+    Returns:
+        int: 处理的IP数量
+    """
+    if max_workers is None:
+        max_workers = CONFIG["max_workers"]
+    
+    logger.info(f"🌍 开始并发地区识别 {len(rows)} 个IP，使用 {max_workers} 个线程")
+    start_time = time.time()
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = list(rows)
+        for round_number in range(CONFIG["region_retry_rounds"] + 1):
+            # 提交所有任务，future与行号按提交顺序一一对应
+            futures = [(row, submit(executor, get_ip_region, table.ip(row))) for row in pending]
+            deferred = []
+            
+            # 先收集所有结果，不输出日志
+            for i, (row, future) in enumerate(futures, 1):
+                try:
+                    region = future.result()
+                    if region is REGION_DEFERRED:
+                        deferred.append(row)
+                        region = 'Unknown'
+                    table.set_region(row, region)
+                    
+                    # 只在API查询时等待，缓存查询不需要等待
+                    if i % 10 == 0:  # 每10个IP等待一次，减少等待频率
+                        time.sleep(CONFIG["query_interval"])
+                except Exception as e:
+                    logger.warning(f"地区识别失败 {table.ip(row)}: {str(e)[:50]}")
+                    table.set_region(row, 'Unknown')
+            
+            pending = deferred
+            if not pending or round_number == CONFIG["region_retry_rounds"]:
+                break
+            # 等到最早的地区API恢复请求（至少1秒，半开状态下的试探请求需要时间完成）
+            wait = region_api_reopen_seconds()
+            if wait is None or wait > min(CONFIG["region_retry_max_wait_seconds"], run_budget().stage_remaining()):
+                break
+            wait = max(1.0, wait)
+            logger.info(f"🔌 地区API暂不可用，{len(pending)} 个IP在 {wait:.1f}秒后重新查询")
+            time.sleep(wait)
+        if pending:
+            logger.warning(f"🔌 地区API不可用，{len(pending)} 个IP未能识别，标记为Unknown（不写入缓存）")
+        
+        # 所有结果收集完成后，输出地区识别结果
+        for i, row in enumerate(rows, 1):
+            logger.info(f"📦 [{i}/{len(rows)}] {table.ip(row)} -> {table.region(row)}")
+                    
+    
+    total_time = time.time() - start_time
+    logger.info(f"🌍 地区识别完成，处理了 {len(rows)} 个IP，总耗时: {total_time:.1f}秒")
+    return len(rows)
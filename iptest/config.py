@@ -0,0 +1,252 @@
+"""默认配置与国家/地区名称映射"""
+
+
+# ===== 核心配置 =====
+# 程序运行的核心参数配置，可根据需要调整（每个运行时实例复制一份，见 Runtime）
+DEFAULT_CONFIG = {
+    # 📥 IP源配置 - 多API源并发采集获取IP地址
+    "ip_sources": [
+        'https://cf.hyli.xyz/', # 行雺
+        'https://raw.githubusercontent.com/ymyuuu/IPDB/main/BestCF/bestcfv4.txt', # Ymyuuu
+        'https://ipdb.api.030101.xyz/?type=bestcf&country=true', # Ymyuuu（备用）
+        'https://api.uouin.com/cloudflare.html', # 麒麟
+        'https://api.urlce.com/cloudflare.html', # 麒麟（备用）
+        'https://addressesapi.090227.xyz/CloudFlareYes', # Hostmonit
+        'https://cf.090227.xyz/CloudFlareYes', # Hostmonit（备用）
+        # 'https://stock.hostmonit.com/CloudFlareYes', # Hostmonit
+        # 'https://ipdb.api.030101.xyz/?type=bestproxy&country=true', # Mingyu
+        'https://ip.haogege.xyz/', # 好哥哥
+        'https://vps789.com/openApi/cfIpTop20', # VPS789-综合排名前20
+        'https://vps789.com/openApi/cfIpApi', # VPS789-动态获取接口
+        'https://hhhhh.eu.org/vps789.txt', # VPS789（备用）
+        'https://www.wetest.vip/page/cloudflare/address_v4.html', # 微测网
+        'https://www.wetest.vip/page/cloudflare/total_v4.html',   # 微测网 
+        'https://cf.090227.xyz/cmcc', # CMLiussss-电信
+        'https://cf.090227.xyz/ct', # CMLiussss-移动
+    ],
+
+    # 📂 本地候选文件 - 扫描器导出的大文件（masscan等），与IP源一起参与检测（仅IPv4）
+    "candidate_files": [],                  # 本地候选文件路径列表（命令行 --candidates 追加）
+    "candidate_chunk_mb": 16,               # 每次解析的分块大小（MB），决定解析时的临时内存
+
+    # 🧹 Cloudflare前缀预过滤 - 探测前批量剔除不属于Cloudflare网段的地址
+    "cf_prefilter_enabled": True,           # 是否开启预过滤
+    "cf_ipv4_ranges": [                     # Cloudflare官方IPv4网段（https://www.cloudflare.com/ips-v4）
+        '173.245.48.0/20', '103.21.244.0/22', '103.22.200.0/22', '103.31.4.0/22',
+        '141.101.64.0/18', '108.162.192.0/18', '190.93.240.0/20', '188.114.96.0/20',
+        '197.234.240.0/22', '198.41.128.0/17', '162.158.0.0/15', '104.16.0.0/13',
+        '104.24.0.0/14', '172.64.0.0/13', '131.0.72.0/22',
+    ],
+    "cf_ipv6_ranges": [                     # Cloudflare官方IPv6网段（https://www.cloudflare.com/ips-v6，按/48粒度匹配）
+        '2400:cb00::/32', '2606:4700::/32', '2803:f800::/32', '2405:b500::/32',
+        '2405:8100::/32', '2a06:98c0::/29', '2c0f:f248::/32',
+    ],
+    "prefilter_allow_cidrs": [],            # 额外放行的网段（如已知可用的反代IP网段）
+    "prefilter_deny_cidrs": [               # 始终剔除的网段（优先级高于放行）
+        '0.0.0.0/8', '10.0.0.0/8', '100.64.0.0/10', '127.0.0.0/8', '169.254.0.0/16',
+        '172.16.0.0/12', '192.168.0.0/16', '224.0.0.0/4', '240.0.0.0/4',
+        '::/8', 'fc00::/7', 'fe80::/10', 'ff00::/8',
+    ],
+
+    # 📈 IP源产出统计 - 按历史产出排序、跳过或降频低价值源
+    "source_stats_file": "Sources.json",    # 源统计持久化文件
+    "source_stats_alpha": 0.3,              # 统计指标的指数滑动平均系数
+    "source_min_runs": 3,                   # 至少积累多少次统计后才允许跳过
+    "source_min_value": 1.0,                # 源价值低于该值时跳过（价值 = 入榜数×10 + 独有IP数×通过率）
+    "source_retry_every": 5,                # 被跳过的源每隔多少次运行重新采集一次
+    "source_throttle_factor": 4,            # 常驻模式中低价值源刷新间隔的放大倍数
+
+    # 🔍 网络测试配置
+    # HTTPS标准端口: 443
+    # Cloudflare专用端口: 2052, 2053, 2082, 2083, 2086, 2087, 2095, 2096, 8443, 8444
+    "test_ports": [443],                    # TCP连接测试端口（可自定义多个端口，如[443, 2052, 2053]）
+    "ipv6_enabled": True,                   # 是否采集和检测IPv6地址（本机无IPv6连通性时可关闭）
+    "timeout": 15,                          # IP采集超时时间（秒）
+    "api_timeout": 5,                       # API查询超时时间（秒）
+    "query_interval": 0.2,                 # API查询间隔时间（秒）
+    "region_api_primary": "https://api.ipinfo.io/lite/{ip}?token=2cb674df499388",  # 主要地区API（{ip}为占位符）
+    "region_api_backup": "http://ip-api.com/json/{ip}?fields=countryCode",         # 备用地区API
+
+    # 🔌 熔断与自适应超时配置（地区API和IP源按端点独立统计）
+    "breaker_failure_threshold": 3,         # 连续失败多少次后熔断
+    "breaker_backoff_seconds": 30,          # 首次熔断时长（秒），之后每次熔断翻倍
+    "breaker_backoff_max_seconds": 600,     # 熔断时长上限（秒）
+    "breaker_max_trips": 3,                 # 熔断次数达到后停用该端点
+    "breaker_disable_seconds": 3600,        # 停用时长（秒），覆盖单次运行的剩余时间
+    "region_retry_rounds": 5,               # 地区API熔断或限流期间跳过的IP最多重新查询几轮
+    "region_retry_max_wait_seconds": 120,   # 等待地区API恢复的最长时间（秒），超过则不再重新查询
+    "adaptive_timeout_multiplier": 3.0,     # 自适应超时 = 观测耗时P99 × 倍数
+    "adaptive_timeout_min_seconds": 1.0,    # 自适应超时下限（秒），上限为配置的固定超时
+    
+    # ⚡ 并发处理配置（GitHub Actions环境优化）
+    "max_workers": 15,                      # 最大并发线程数（IP探测为初始并发数）
+    "cache_ttl_hours": 168,                 # 缓存有效期（7天）
+
+    # 📐 自适应连接超时配置（按在线学习的RTT分布设置TCP连接超时）
+    "connect_timeout_seconds": 3,           # 固定连接超时（秒），也是自适应超时上限和边缘重试超时
+    "adaptive_connect_enabled": True,       # 是否启用自适应连接超时
+    "adaptive_connect_quantile": 0.95,      # 参考的RTT分位数
+    "adaptive_connect_multiplier": 2.0,     # 连接超时 = RTT分位数 × 倍数
+    "adaptive_connect_min_seconds": 0.3,    # 自适应连接超时下限（秒）
+    "adaptive_connect_min_samples": 20,     # 样本数达到后才启用自适应超时
+    "borderline_retry_enabled": True,       # 是否对自适应超时内未连通的IP按固定超时重试
+    "borderline_retry_quantile": 0.999,     # 参考的最慢成功RTT分位数
+    "borderline_retry_margin": 1.5,         # 超时不到最慢成功RTT的此倍数时，未连通的IP才视为边缘IP
+    "borderline_retry_fraction": 0.5,       # 重试占用的探测时间不超过自适应超时节省时间的比例
+    "borderline_retry_batch": 50,           # 每批重试的IP数，一批的找回率低于下限时放弃剩余IP
+    "borderline_retry_min_recovery": 0.02,  # 边缘重试找回率下限
+
+    # 🎚️ 自适应并发配置（AIMD：稳定时加性增加在途探测数，RTT或失败率恶化时乘性减少）
+    "aimd_enabled": True,                   # 是否启用自适应并发，关闭时固定使用max_workers
+    "aimd_min_workers": 4,                  # 并发下限
+    "aimd_max_workers": 64,                 # 并发上限
+    "aimd_window": 50,                      # 每完成多少个探测评估一次
+    "aimd_ewma_alpha": 0.3,                 # 窗口RTT中位数和错误率的EWMA平滑系数
+    "aimd_increase": 1,                     # 每个稳定窗口增加的并发数
+    "aimd_decrease_factor": 0.7,            # 恶化时并发数乘以该系数
+    "aimd_rtt_tolerance": 1.5,              # 窗口RTT中位数超过基线多少倍视为恶化
+    "aimd_failure_tolerance": 0.25,         # 窗口错误率（拒绝/重置等，不含超时）超过基线多少视为恶化
+    "probe_connect_rate": 200,              # 令牌桶：每秒最多发起的探测数（0表示不限速）
+    "probe_connect_burst": 20,              # 令牌桶：允许的突发探测数
+    
+    # 🚀 高级功能配置
+    "advanced_mode": True,                  # 高级模式开关（True=开启，False=关闭）
+    "bandwidth_test_count": 3,              # 带宽测试次数
+    "bandwidth_test_size_mb": 10,             # 带宽测试文件大小（MB）
+    "bandwidth_test_urls": [                # 带宽测试下载地址（{bytes}为字节数占位符）
+        "https://speed.cloudflare.com/__down?bytes={bytes}",
+        "https://httpbin.org/bytes/{bytes}",
+    ],
+    "latency_filter_percentage": 30,        # 延迟排名前百分比（取前30%的IP）
+
+    # 🏆 综合评分配置（各指标按本次结果的百分位归一化后加权，总分0-100）
+    "score_profile": "balanced",            # 评分方案：balanced / latency-first / throughput-first / stability-first
+    "score_profiles": {                     # 评分方案权重（延迟、带宽、稳定性，按比例生效）
+        "balanced":         {"latency": 40, "bandwidth": 30, "stability": 30},
+        "latency-first":    {"latency": 70, "bandwidth": 15, "stability": 15},
+        "throughput-first": {"latency": 20, "bandwidth": 65, "stability": 15},
+        "stability-first":  {"latency": 25, "bandwidth": 15, "stability": 60},
+    },
+    "output_top_n": 0,                      # 高级输出保留的头部IP数量（0为全部，设置后只选取头部而不完整排序）
+
+    # 📤 上传测试配置（连接固定到候选IP，从预分配缓冲区流式发送）
+    "upload_test_enabled": False,           # 是否进行上传测试
+    "upload_test_url": "https://speed.cloudflare.com/__up",  # 上传地址（TCP直连候选IP，Host和SNI取自URL）
+    "upload_test_size_mb": 5,               # 上传数据大小（MB）
+    "upload_chunk_kb": 64,                  # 每次发送的块大小（KB）
+    "upload_test_timeout": 10,              # 单个IP上传测试最长时间（秒）
+    "upload_min_seconds": 3,                # 阶段剩余时间少于此值时不再开始新的上传测试（秒）
+    "upload_score_weight": 0,               # 上传带宽在带宽权重中的占比（0-1，0表示不参与评分）
+
+    # 🔐 应用层延迟配置（同一连接上分别计时TCP连接、TLS握手和首字节时间）
+    "latency_mode": "tcp",                  # 延迟探测模式：tcp（仅TCP连接）或 app（TCP连接 + TLS握手 + 首字节）
+    "latency_rank_key": "total",            # app模式下排名和评分使用的延迟分量：connect / tls / ttfb / total
+    "app_probe_port": 443,                  # 应用层探测端口
+    "app_probe_sni": "speed.cloudflare.com",  # TLS握手使用的SNI，同时作为HTTP请求的Host
+    "app_probe_path": "/cdn-cgi/trace",     # 首字节计时的请求路径（响应很小）
+    "app_probe_timeout": 5,                 # TLS握手和首字节的超时时间（秒）
+    "app_probe_verify": True,               # 是否校验证书（同时确认该IP确实在服务该SNI）
+    "app_probe_resume": True,               # 同一IP复测时是否复用TLS会话票据，降低握手的CPU开销（不跨IP共享）
+
+    # ⏳ 时间预算配置（可通过命令行 --time-budget 设置）
+    "time_budget_seconds": 0,               # 整体运行时间预算（秒），0表示不限制
+    "output_reserve_seconds": 15,           # 预留给结果输出的时间（秒）
+    "stage_budget_shares": {                # 各阶段占总预算的比例（按执行顺序，剩余部分留给输出）
+        "collect": 0.10,
+        "quick_filter": 0.30,
+        "region": 0.10,
+        "latency_filter": 0.10,
+        "tcp_ping": 0.10,
+        "bandwidth": 0.20,
+        "upload": 0.05,                     # 未启用上传测试时并入带宽测试
+    },
+
+    # ♻️ 断点续跑配置
+    "checkpoint_enabled": True,             # 是否在每个阶段保存断点（中断后重新运行可继续）
+    "checkpoint_dir": ".checkpoint",        # 断点文件目录
+    "checkpoint_max_age_minutes": 60,       # 断点中的测量结果有效期（分钟），过期则重新测量
+    "checkpoint_flush_seconds": 30,         # 长阶段中途保存断点的间隔（秒）
+
+    # ♨️ 热启动配置（优先复测上一次运行的结果）
+    "warm_start_enabled": True,             # 是否先探测上一次的优选IP（IPlist-Pro.txt）和可用IP（IPlist.txt）
+    "warm_start_partial_ips": 10,           # 快速筛选确认多少个可用IP后提前写出部分结果（0表示不提前写出）
+
+    # 🔁 常驻模式配置（命令行 --daemon 开启）
+    "daemon_source_interval_minutes": 60,   # IP源默认刷新间隔（分钟）
+    "daemon_source_intervals": {},          # 单个源的刷新间隔覆盖，格式为 {url: 分钟}
+    "daemon_top_n": 50,                     # 头部IP数量（高频复测并写入高级版文件）
+    "daemon_top_interval_seconds": 300,     # 头部IP复测间隔（秒）
+    "daemon_marginal_interval_seconds": 1800,  # 其余可用IP复测间隔（秒）
+    "daemon_dead_backoff_seconds": 600,     # 不可用IP首次退避时间（秒），之后每次失败翻倍
+    "daemon_dead_backoff_max_seconds": 21600,  # 不可用IP最大退避时间（秒）
+    "daemon_drop_after_failures": 8,        # 连续失败次数达到后移出候选集（IP源刷新时可重新加入）
+    "daemon_delay_samples": 10,             # 每个IP保留的最近探测样本数
+    "daemon_bandwidth_interval_minutes": 60,  # 头部IP带宽复测间隔（分钟）
+    "daemon_change_threshold": 0.2,         # 头部IP集合变化比例达到该值时重写输出文件
+    "daemon_min_write_seconds": 60,         # 两次重写输出文件的最小间隔（秒）
+
+    # 🛰️ 查询服务配置（命令行 --serve 开启）
+    "serve_host": "127.0.0.1",              # 监听地址（对外提供服务时改为 0.0.0.0）
+    "serve_port": 8080,                     # 监听端口
+    "serve_reload_seconds": 2,              # 检测输出文件变化的间隔（秒）
+    "serve_default_limit": 10,              # 查询未指定limit时返回的数量
+    "serve_max_limit": 1000,                # 单次查询最多返回的数量
+
+    # 🔬 性能分析配置（可通过命令行 --profile 开启）
+    "profile_mode": None,                   # 分析模式：None / "cprofile" / "sample" / "tracemalloc"
+    "profile_dir": "profile",               # 分析结果输出目录（.pstats、.folded、summary.json）
+    "profile_sample_interval": 0.005,       # 采样分析器采样间隔（秒）
+}
+
+# ===== 国家/地区映射表 =====
+# 将ISO国家代码映射为中文名称，支持全球主要国家和地区
+COUNTRY_MAPPING = {
+    # 统一添加常见国家和地区
+    # 🌎 北美地区
+    'US': '美国', 'CA': '加拿大', 'MX': '墨西哥', 'CR': '哥斯达黎加', 'GT': '危地马拉', 'HN': '洪都拉斯',
+    'NI': '尼加拉瓜', 'PA': '巴拿马', 'CU': '古巴', 'JM': '牙买加', 'TT': '特立尼达和多巴哥',
+    'BZ': '伯利兹', 'SV': '萨尔瓦多', 'DO': '多米尼加', 'HT': '海地',
+    # 🌎 南美地区
+    'BR': '巴西', 'AR': '阿根廷', 'CL': '智利', 'CO': '哥伦比亚', 'PE': '秘鲁', 'VE': '委内瑞拉',
+    'UY': '乌拉圭', 'PY': '巴拉圭', 'BO': '玻利维亚', 'EC': '厄瓜多尔', 'GY': '圭亚那',
+    'SR': '苏里南', 'FK': '福克兰群岛',
+    # 🌍 欧洲地区
+    'UK': '英国', 'GB': '英国', 'FR': '法国', 'DE': '德国', 'IT': '意大利', 'ES': '西班牙', 'NL': '荷兰',
+    'RU': '俄罗斯', 'SE': '瑞典', 'CH': '瑞士', 'BE': '比利时', 'AT': '奥地利', 'IS': '冰岛',
+    'PL': '波兰', 'DK': '丹麦', 'NO': '挪威', 'FI': '芬兰', 'PT': '葡萄牙', 'IE': '爱尔兰',
+    'UA': '乌克兰', 'CZ': '捷克', 'GR': '希腊', 'HU': '匈牙利', 'RO': '罗马尼亚', 'TR': '土耳其',
+    'BG': '保加利亚', 'LT': '立陶宛', 'LV': '拉脱维亚', 'EE': '爱沙尼亚', 'BY': '白俄罗斯',
+    'LU': '卢森堡', 'LUX': '卢森堡', 'SI': '斯洛文尼亚', 'SK': '斯洛伐克', 'MT': '马耳他',
+    'HR': '克罗地亚', 'RS': '塞尔维亚', 'BA': '波黑', 'ME': '黑山', 'MK': '北马其顿',
+    'AL': '阿尔巴尼亚', 'XK': '科索沃', 'MD': '摩尔多瓦', 'GE': '格鲁吉亚', 'AM': '亚美尼亚',
+    'AZ': '阿塞拜疆', 'CY': '塞浦路斯', 'MC': '摩纳哥', 'SM': '圣马力诺', 'VA': '梵蒂冈',
+    'AD': '安道尔', 'LI': '列支敦士登',
+    # 🌏 亚洲地区
+    'CN': '中国', 'HK': '中国香港', 'TW': '中国台湾', 'MO': '中国澳门', 'JP': '日本', 'KR': '韩国',
+    'SG': '新加坡', 'SGP': '新加坡', 'IN': '印度', 'ID': '印度尼西亚', 'MY': '马来西亚', 'MYS': '马来西亚',
+    'TH': '泰国', 'PH': '菲律宾', 'VN': '越南', 'PK': '巴基斯坦', 'BD': '孟加拉', 'KZ': '哈萨克斯坦',
+    'IL': '以色列', 'ISR': '以色列', 'SA': '沙特阿拉伯', 'SAU': '沙特阿拉伯', 'AE': '阿联酋', 
+    'QAT': '卡塔尔', 'OMN': '阿曼', 'KW': '科威特', 'BH': '巴林', 'IQ': '伊拉克', 'IR': '伊朗',
+    'AF': '阿富汗', 'UZ': '乌兹别克斯坦', 'KG': '吉尔吉斯斯坦', 'TJ': '塔吉克斯坦', 'TM': '土库曼斯坦',
+    'MN': '蒙古', 'NP': '尼泊尔', 'BT': '不丹', 'LK': '斯里兰卡', 'MV': '马尔代夫',
+    'MM': '缅甸', 'LA': '老挝', 'KH': '柬埔寨', 'BN': '文莱', 'TL': '东帝汶',
+    'LK': '斯里兰卡', 'MV': '马尔代夫', 'NP': '尼泊尔', 'BT': '不丹',
+    # 🌊 大洋洲地区
+    'AU': '澳大利亚', 'NZ': '新西兰', 'FJ': '斐济', 'PG': '巴布亚新几内亚', 'NC': '新喀里多尼亚',
+    'VU': '瓦努阿图', 'SB': '所罗门群岛', 'TO': '汤加', 'WS': '萨摩亚', 'KI': '基里巴斯',
+    'TV': '图瓦卢', 'NR': '瑙鲁', 'PW': '帕劳', 'FM': '密克罗尼西亚', 'MH': '马绍尔群岛',
+    # 🌍 非洲地区
+    'ZA': '南非', 'EG': '埃及', 'NG': '尼日利亚', 'KE': '肯尼亚', 'ET': '埃塞俄比亚',
+    'GH': '加纳', 'TZ': '坦桑尼亚', 'UG': '乌干达', 'DZ': '阿尔及利亚', 'MA': '摩洛哥',
+    'TN': '突尼斯', 'LY': '利比亚', 'SD': '苏丹', 'SS': '南苏丹', 'ER': '厄立特里亚',
+    'DJ': '吉布提', 'SO': '索马里', 'ET': '埃塞俄比亚', 'KE': '肯尼亚', 'TZ': '坦桑尼亚',
+    'UG': '乌干达', 'RW': '卢旺达', 'BI': '布隆迪', 'MW': '马拉维', 'ZM': '赞比亚',
+    'ZW': '津巴布韦', 'BW': '博茨瓦纳', 'NA': '纳米比亚', 'SZ': '斯威士兰', 'LS': '莱索托',
+    'MZ': '莫桑比克', 'MG': '马达加斯加', 'MU': '毛里求斯', 'SC': '塞舌尔', 'KM': '科摩罗',
+    'CV': '佛得角', 'ST': '圣多美和普林西比', 'GW': '几内亚比绍', 'GN': '几内亚', 'SL': '塞拉利昂',
+    'LR': '利比里亚', 'CI': '科特迪瓦', 'GH': '加纳', 'TG': '多哥', 'BJ': '贝宁',
+    'NE': '尼日尔', 'BF': '布基纳法索', 'ML': '马里', 'SN': '塞内加尔', 'GM': '冈比亚',
+    'GN': '几内亚', 'GW': '几内亚比绍', 'ST': '圣多美和普林西比', 'CV': '佛得角',
+    # ❓ 其他/未知
+    'Unknown': '未知'
+}
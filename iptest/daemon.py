@@ -0,0 +1,231 @@
+"""常驻复测模式"""
+
+import logging
+import time
+import heapq
+import signal
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from collections import deque
+
+from .concurrency import get_regions_concurrently
+from .geo import save_region_cache
+from .output import write_advanced_outputs, write_ip_lists, write_region_lists
+from .network import test_ip_availability, test_ip_bandwidth_only
+from .runtime import CONFIG, submit
+from .sources import SOURCE_SKIPPED, SourceTracker, fetch_source
+from .table import ResultTable
+
+logger = logging.getLogger(__name__)
+
+# ===== 常驻模式模块 =====
+# 常驻内存持续复测：头部IP高频复测，边缘IP低频复测，不可用IP指数退避
+
+class ProbeState:
+    """常驻模式中单个IP的测量状态"""
+
+    __slots__ = ('ip', 'delays', 'outcomes', 'consecutive_failures', 'bandwidth', 'bandwidth_at')
+
+    def __init__(self, ip):
+        self.ip = ip
+        self.delays = deque(maxlen=CONFIG["daemon_delay_samples"])
+        self.outcomes = deque(maxlen=CONFIG["daemon_delay_samples"])
+        self.consecutive_failures = 0
+        self.bandwidth = 0
+        self.bandwidth_at = 0
+
+    @property
+    def alive(self):
+        return self.consecutive_failures == 0 and bool(self.delays)
+
+    def record(self, is_available, delay):
+        self.outcomes.append(is_available)
+        if is_available:
+            self.delays.append(delay)
+            self.consecutive_failures = 0
+        else:
+            self.consecutive_failures += 1
+
+    def add_to(self, table):
+        """把当前测量结果写入结果表：最小延迟参与排名，平均延迟作为带宽测试延迟列"""
+        return table.add(self.ip, delay=min(self.delays), latency=round(sum(self.delays) / len(self.delays), 1),
+                         bandwidth=self.bandwidth, stability=sum(self.outcomes) * 100 / len(self.outcomes))
+
+class RollingProber:
+    """
+    常驻复测调度器
+
+    在内存中维护候选集和测量结果，用最小堆按到期时间调度复测：
+    头部IP每daemon_top_interval_seconds复测一次，其余可用IP间隔更长，
+    不可用IP按指数退避。IP源按各自间隔刷新，排名的头部集合发生明显变化时
+    在工作线程中原子重写全部输出文件，地区识别不阻塞复测调度。
+    """
+
+    def __init__(self):
+        self.states = {}
+        self.queue = []
+        self.tracker = SourceTracker()
+        self.source_due = {url: 0.0 for url in CONFIG["ip_sources"]}
+        self.ranks = {}
+        self.written_top = None
+        self.last_write = 0.0
+        self.last_rank = 0.0
+        self.dirty = False
+        self.bandwidth_busy = False
+        self.publishing = False
+
+    def next_interval(self, state):
+        """根据IP当前排名和失败次数计算下一次复测间隔，尚未参与排名的IP按普通间隔复测"""
+        if not state.alive:
+            backoff = CONFIG["daemon_dead_backoff_seconds"] * 2 ** (state.consecutive_failures - 1)
+            return min(backoff, CONFIG["daemon_dead_backoff_max_seconds"])
+        rank = self.ranks.get(state.ip)
+        if rank is not None and rank < CONFIG["daemon_top_n"]:
+            return CONFIG["daemon_top_interval_seconds"]
+        return CONFIG["daemon_marginal_interval_seconds"]
+
+    def submit_due_work(self, executor, futures, now):
+        # 到期的IP源刷新
+        for url, due in self.source_due.items():
+            if due <= now:
+                # 低产出源按源统计放大刷新间隔
+                interval = CONFIG["daemon_source_intervals"].get(url, CONFIG["daemon_source_interval_minutes"])
+                self.source_due[url] = now + interval * 60 * self.tracker.throttle_factor(url)
+                futures[submit(executor, self.fetch_timed, url)] = ('source', url)
+
+        # 到期的IP复测，在途任务数不超过线程数
+        while self.queue and self.queue[0][0] <= now and len(futures) < CONFIG["max_workers"]:
+            _, ip = heapq.heappop(self.queue)
+            if ip in self.states:
+                futures[submit(executor, test_ip_availability, ip)] = ('probe', ip)
+
+        # 头部IP带宽复测，同一时间只测一个，避免互相挤占带宽
+        if not self.bandwidth_busy:
+            stale = now - CONFIG["daemon_bandwidth_interval_minutes"] * 60
+            for ip, rank in self.ranks.items():
+                state = self.states.get(ip)
+                if rank < CONFIG["daemon_top_n"] and state and state.alive and state.bandwidth_at < stale:
+                    state.bandwidth_at = now
+                    self.bandwidth_busy = True
+                    futures[submit(executor, test_ip_bandwidth_only, ip, rank + 1, CONFIG["daemon_top_n"])] = ('bandwidth', ip)
+                    break
+
+    def fetch_timed(self, url):
+        start = time.time()
+        return fetch_source(url, CONFIG["timeout"]), time.time() - start
+
+    def handle_result(self, kind, key, result, now):
+        if kind == 'source':
+            result, seconds = result
+            if result is SOURCE_SKIPPED:
+                # 熔断中未发起请求，不计入源统计，按刷新间隔稍后再试
+                return
+            self.tracker.record_fetch(key, result, seconds)
+            self.tracker.save()
+            added = 0
+            for ip in result or []:
+                if ip not in self.states:
+                    self.states[ip] = ProbeState(ip)
+                    heapq.heappush(self.queue, (now, ip))
+                    added += 1
+            logger.info(f"🔁 IP源 {key} 刷新完成，新增 {added} 个候选IP，当前共 {len(self.states)} 个")
+        elif kind == 'probe':
+            state = self.states.get(key)
+            if state is None:
+                return
+            state.record(*result)
+            if state.consecutive_failures >= CONFIG["daemon_drop_after_failures"]:
+                del self.states[key]
+                logger.info(f"🔁 {key} 连续 {state.consecutive_failures} 次不可用，移出候选集")
+            else:
+                heapq.heappush(self.queue, (now + self.next_interval(state), key))
+            self.dirty = True
+        elif kind == 'publish':
+            self.publishing = False
+            self.written_top = result
+            self.last_write = now
+        elif kind == 'bandwidth':
+            self.bandwidth_busy = False
+            state = self.states.get(key)
+            is_fast, bandwidth, _ = result
+            if state is not None and is_fast:
+                state.bandwidth = bandwidth
+                self.dirty = True
+
+    def rank(self):
+        """按综合评分对当前可用IP排序并更新排名表，返回 (结果表, 按评分降序的行号)"""
+        # 先按最小延迟写入，评分相同时延迟低的在前
+        table = ResultTable()
+        for state in sorted((state for state in self.states.values() if state.alive), key=lambda state: min(state.delays)):
+            state.add_to(table)
+        # 复测间隔和IPlist.txt需要全部可用IP的排名，不受output_top_n限制
+        ranked = table.score(range(len(table)), k=len(table))
+        self.ranks = {ip: i for i, ip in enumerate(table.ip_list(ranked))}
+        return table, ranked
+
+    def maybe_publish(self, executor, futures, now):
+        """排名明显变化时提交输出文件的重写任务，同一时间只有一个"""
+        if self.publishing or not self.dirty or now - self.last_rank < 5:
+            return
+        self.last_rank = now
+        self.dirty = False
+        table, ranked = self.rank()
+        top = table.ip_list(ranked[:CONFIG["daemon_top_n"]])
+        if not top or now - self.last_write < CONFIG["daemon_min_write_seconds"]:
+            return
+        if self.written_top is not None:
+            changed = 1 - len(set(top) & set(self.written_top)) / max(len(top), len(self.written_top))
+            if changed < CONFIG["daemon_change_threshold"]:
+                return
+            logger.info(f"🔁 头部IP变化 {changed:.0%}，重写输出文件")
+        self.publishing = True
+        futures[submit(executor, self.publish, table, ranked, top)] = ('publish', None)
+
+    def publish(self, table, ranked, top):
+        """重写全部输出文件（在工作线程中执行），地区只识别一次，返回写出的头部IP"""
+        write_ip_lists(table, ranked, 'IPlist.txt')
+        get_regions_concurrently(table, ranked)
+        write_region_lists(table, ranked, 'Senflare.txt')
+        write_advanced_outputs(table, ranked[:CONFIG["daemon_top_n"]], resolve_regions=False)
+        save_region_cache()
+        logger.info(f"🔁 输出已更新：可用 {len(ranked)} 个，头部 {len(top)} 个")
+        return top
+
+    def run(self):
+        with ThreadPoolExecutor(max_workers=CONFIG["max_workers"]) as executor:
+            futures = {}
+            while True:
+                now = time.time()
+                self.submit_due_work(executor, futures, now)
+                if futures:
+                    done, _ = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+                else:
+                    due_times = list(self.source_due.values())
+                    if self.queue:
+                        due_times.append(self.queue[0][0])
+                    time.sleep(min(1, max(0, min(due_times, default=now + 1) - now)))
+                    done = []
+                now = time.time()
+                for future in done:
+                    kind, key = futures.pop(future)
+                    try:
+                        self.handle_result(kind, key, future.result(), now)
+                    except Exception as e:
+                        logger.error(f"❌ 常驻任务 {kind} {key} 出错: {str(e)[:50]}")
+                        if kind == 'bandwidth':
+                            self.bandwidth_busy = False
+                        elif kind == 'publish':
+                            self.publishing = False
+                self.maybe_publish(executor, futures, now)
+
+def run_daemon():
+    """
+    常驻模式入口
+
+    持续运行复测调度器，直到收到中断（Ctrl+C）或SIGTERM信号。
+    """
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    logger.info("🔁 ===== 常驻模式启动 =====")
+    RollingProber().run()
@@ -0,0 +1,48 @@
+"""文件操作：删除与原子写入"""
+
+import logging
+import os
+
+logger = logging.getLogger(__name__)
+
+# ===== 文件操作模块 =====
+# 文件管理功能，包括删除、创建等操作
+
+def delete_file_if_exists(file_path):
+    """
+    删除指定文件（如果存在）
+    
+    在程序开始前清理旧的结果文件，避免结果累积。
+    
+    Args:
+        file_path (str): 要删除的文件路径
+    
+    Returns:
+        None: 无返回值，仅执行删除操作
+    """
+    if os.path.exists(file_path):
+        try:
+            os.remove(file_path)
+            logger.info(f"🗑️ 已删除原有文件: {file_path}")
+        except Exception as e:
+            logger.warning(f"⚠️ 删除文件失败: {str(e)}")
+
+def write_lines_atomic(file_path, lines, trailing_newline=True):
+    """
+    原子写入文本文件
+
+    先写入同目录临时文件再用os.replace替换，程序在写入过程中被中断时
+    不会留下只写了一半的结果文件。
+
+    Args:
+        file_path (str): 目标文件路径
+        lines (list): 要写入的行（不含换行符）
+        trailing_newline (bool): 最后一行后是否追加换行符
+    """
+    content = '\n'.join(lines)
+    if trailing_newline and lines:
+        content += '\n'
+    tmp_path = f"{file_path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.write(content)
+    os.replace(tmp_path, file_path)
@@ -0,0 +1,310 @@
+"""地区识别与地区信息缓存"""
+
+import logging
+import os
+import time
+import json
+from datetime import datetime, timedelta
+from email.utils import parsedate_to_datetime
+
+from .breaker import get_breaker
+from .budget import run_budget
+from .config import COUNTRY_MAPPING
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 缓存管理模块 =====
+# 智能缓存系统，支持TTL机制和自动清理
+
+def load_region_cache():
+    """
+    加载地区信息缓存
+    
+    从Cache.json文件中加载已缓存的IP地理位置信息，
+    如果文件不存在或加载失败，则使用空缓存。
+    
+    Returns:
+        dict: 加载的缓存，同时设为当前运行时的地区缓存
+    """
+    cache = {}
+    if os.path.exists('Cache.json'):
+        try:
+            with open('Cache.json', 'r', encoding='utf-8') as f:
+                cache = json.load(f)
+            logger.info(f"📦 成功加载缓存文件，包含 {len(cache)} 个条目")
+        except Exception as e:
+            logger.warning(f"⚠️ 加载缓存文件失败: {str(e)[:50]}")
+            cache = {}
+    else:
+        logger.info("📦 缓存文件不存在，使用空缓存")
+    runtime().region_cache = cache
+    return cache
+
+def get_region_cache():
+    """当前运行时的地区信息缓存，首次使用时从Cache.json加载"""
+    cache = runtime().region_cache
+    return load_region_cache() if cache is None else cache
+
+def save_region_cache():
+    """
+    保存地区信息缓存
+    
+    将当前内存中的地区缓存数据保存到Cache.json文件中，
+    用于下次启动时快速加载已查询过的IP地理位置信息。
+    
+    Returns:
+        None: 直接保存到文件，无返回值
+    """
+    region_cache = get_region_cache()
+    try:
+        with open('Cache.json', 'w', encoding='utf-8') as f:
+            json.dump(region_cache, f, ensure_ascii=False)
+        logger.info(f"💾 成功保存缓存文件，包含 {len(region_cache)} 个条目")
+    except Exception as e:
+        logger.error(f"❌ 保存缓存文件失败: {str(e)[:50]}")
+        pass
+
+def is_cache_valid(timestamp, ttl_hours=24):
+    """
+    检查缓存是否有效
+    
+    Args:
+        timestamp (str): 缓存时间戳（ISO格式）
+        ttl_hours (int): 缓存有效期（小时），默认24小时
+    
+    Returns:
+        bool: True表示缓存有效，False表示已过期
+    """
+    if not timestamp:
+        return False
+    cache_time = datetime.fromisoformat(timestamp)
+    return datetime.now() - cache_time < timedelta(hours=ttl_hours)
+
+def clean_expired_cache():
+    """
+    清理过期缓存和限制缓存大小
+    
+    自动清理过期的缓存条目，并限制缓存大小以防止内存溢出。
+    支持TTL机制和LRU策略。
+    
+    Returns:
+        None: 直接修改当前运行时的地区缓存
+    """
+    region_cache = get_region_cache()
+    current_time = datetime.now()
+    expired_keys = []
+    
+    # 清理过期缓存
+    for ip, data in region_cache.items():
+        if isinstance(data, dict) and 'timestamp' in data:
+            cache_time = datetime.fromisoformat(data['timestamp'])
+            if current_time - cache_time >= timedelta(hours=CONFIG["cache_ttl_hours"]):
+                expired_keys.append(ip)
+    
+    for key in expired_keys:
+        del region_cache[key]
+    
+    # 限制缓存大小（最多保留1000个条目）
+    if len(region_cache) > 1000:
+        # 按时间排序，删除最旧的条目
+        sorted_items = sorted(region_cache.items(), 
+                            key=lambda x: x[1].get('timestamp', '') if isinstance(x[1], dict) else '')
+        items_to_remove = len(region_cache) - 1000
+        for i in range(items_to_remove):
+            del region_cache[sorted_items[i][0]]
+        logger.info(f"缓存过大，清理了 {items_to_remove} 个旧条目")
+    
+    if expired_keys:
+        logger.info(f"清理了 {len(expired_keys)} 个过期缓存条目")
+
+# ===== 地区识别模块 =====
+# IP地理位置识别功能，支持多API源和智能缓存
+
+# 地区API熔断或暂时失败时get_ip_region返回的标记，由调用方在熔断结束后重新查询
+REGION_DEFERRED = object()
+
+REGION_BREAKERS = ('region_api_primary', 'region_api_backup')
+
+# 这些状态码说明端点当前不可用（限流、鉴权失败或服务端错误），计为失败
+FAILURE_STATUSES = {401, 403, 429}
+
+def is_failure_status(status):
+    return status in FAILURE_STATUSES or status >= 500
+
+def record_failure_status(breaker, resp, sent_at):
+    """按状态码记录失败：限流时放慢该端点的请求速率，并遵守Retry-After"""
+    if resp.status_code == 429:
+        breaker.throttle(sent_at, retry_after_seconds(resp))
+    else:
+        breaker.failure(retry_after_seconds(resp))
+
+def retry_after_seconds(resp):
+    """解析Retry-After响应头（秒数或HTTP日期，ip-api.com使用X-Ttl），没有或无法解析时返回None"""
+    value = resp.headers.get('Retry-After') or resp.headers.get('X-Ttl')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+def region_api_reopen_seconds():
+    """地区API最早恢复请求的剩余秒数，全部停用时返回None"""
+    waits = [wait for wait in (get_breaker(name).reopen_in() for name in REGION_BREAKERS) if wait is not None]
+    return min(waits) if waits else None
+
+def get_ip_region(ip):
+    """
+    优化的IP地区识别（支持缓存TTL）
+    
+    通过多个API源查询IP的地理位置信息，支持智能缓存机制，
+    避免重复查询，提升查询效率。
+    
+    Args:
+        ip (str): 要查询的IP地址
+    
+    Returns:
+        str: 国家代码（如'US', 'CN', 'JP'等）；API均熔断或暂时失败时返回REGION_DEFERRED
+    """
+    # 检查缓存是否有效
+    if ip in get_region_cache():
+        cached_data = get_region_cache()[ip]
+        if isinstance(cached_data, dict) and 'timestamp' in cached_data:
+            if is_cache_valid(cached_data['timestamp'], CONFIG["cache_ttl_hours"]):
+                logger.info(f"📦 IP {ip} 地区信息从缓存获取: {cached_data['region']}")
+                return cached_data['region']
+        else:
+            # 兼容旧格式缓存
+            logger.info(f"📦 IP {ip} 地区信息从缓存获取（旧格式）: {cached_data}")
+            return cached_data
+    
+    # 时间预算耗尽时不再发起API查询（结果不写入缓存，下次运行重新查询）
+    if run_budget().stage_expired():
+        logger.info(f"⏳ IP {ip} 时间预算已耗尽，跳过API查询")
+        return 'Unknown'
+    
+    # 依次尝试主要API（免费版本）和备用API，熔断中的端点直接跳过
+    answered = False
+    for name, query in zip(REGION_BREAKERS, (query_region_primary, query_region_backup)):
+        breaker = get_breaker(name)
+        if not breaker.allow():
+            continue
+        time.sleep(breaker.pace())
+        country_code = query(ip, breaker)
+        if country_code:
+            return country_code
+        answered = answered or country_code == ''
+    
+    if not answered:
+        # 所有API均熔断或暂时失败（限流、超时等），不写入缓存，由调用方稍后重新查询
+        logger.info(f"🔌 IP {ip} 地区API暂不可用，稍后重新查询")
+        return REGION_DEFERRED
+    
+    # API正常应答但没有给出国家代码，缓存为Unknown
+    logger.warning(f"❌ IP {ip} 所有API识别失败，标记为Unknown")
+    get_region_cache()[ip] = {
+        'region': 'Unknown',
+        'timestamp': datetime.now().isoformat()
+    }
+    return 'Unknown'
+
+def query_region_primary(ip, breaker):
+    """
+    通过主要API（ipinfo.io lite）查询IP地区
+
+    Args:
+        ip (str): 要查询的IP地址
+        breaker (CircuitBreaker): 该API的熔断器
+
+    Returns:
+        str: 国家代码；API应答但没有国家代码时返回空字符串，限流或请求失败返回None
+    """
+    logger.info(f"🌐 IP {ip} 开始API查询（主要API: ipinfo.io lite）...")
+    try:
+        start_time = time.time()
+        resp = runtime().api_session.get(CONFIG["region_api_primary"].format(ip=ip), timeout=breaker.timeout(CONFIG["api_timeout"]))
+        elapsed = time.time() - start_time
+        if is_failure_status(resp.status_code):
+            record_failure_status(breaker, resp, start_time)
+            logger.warning(f"⚠️ IP {ip} 主要API返回状态码: {resp.status_code}")
+            return None
+        if resp.status_code == 200:
+            country_code = resp.json().get('country_code', '').upper()
+            # 响应体解析成功后才记为成功，响应体无效时只在下方记一次失败
+            breaker.success(elapsed)
+            if country_code:
+                get_region_cache()[ip] = {
+                    'region': country_code,
+                    'timestamp': datetime.now().isoformat()
+                }
+                logger.info(f"✅ IP {ip} 主要API识别成功: {country_code}（来源：API查询）")
+                return country_code
+        else:
+            # 其他状态码（如404）是端点对该IP的正常应答
+            breaker.success(elapsed)
+            logger.warning(f"⚠️ IP {ip} 主要API返回状态码: {resp.status_code}")
+        return ''
+    except Exception as e:
+        breaker.failure()
+        logger.error(f"❌ IP {ip} 主要API识别失败: {str(e)[:30]}")
+    return None
+
+def query_region_backup(ip, breaker):
+    """
+    通过备用API（ip-api.com）查询IP地区
+
+    Args:
+        ip (str): 要查询的IP地址
+        breaker (CircuitBreaker): 该API的熔断器
+
+    Returns:
+        str: 国家代码；API应答但没有国家代码时返回空字符串，限流或请求失败返回None
+    """
+    logger.info(f"🌐 IP {ip} 尝试备用API（ip-api.com）...")
+    try:
+        start_time = time.time()
+        resp = runtime().api_session.get(CONFIG["region_api_backup"].format(ip=ip), timeout=breaker.timeout(CONFIG["api_timeout"]))
+        elapsed = time.time() - start_time
+        if is_failure_status(resp.status_code):
+            record_failure_status(breaker, resp, start_time)
+            logger.warning(f"⚠️ IP {ip} 备用API返回状态码: {resp.status_code}")
+            return None
+        data = resp.json()
+        status = data.get('status')
+        # 响应体解析成功后才记为成功，响应体无效时只在下方记一次失败
+        breaker.success(elapsed)
+        if status == 'success':
+            country_code = data.get('countryCode', '').upper()
+            if country_code:
+                get_region_cache()[ip] = {
+                    'region': country_code,
+                    'timestamp': datetime.now().isoformat()
+                }
+                logger.info(f"✅ IP {ip} 备用API识别成功: {country_code}")
+                return country_code
+        else:
+            logger.warning(f"⚠️ IP {ip} 备用API返回状态: {status or 'unknown'}")
+        return ''
+    except Exception as e:
+        breaker.failure()
+        logger.error(f"❌ IP {ip} 备用API识别失败: {str(e)[:30]}")
+    return None
+
+def get_country_name(code):
+    """
+    根据国家代码获取中文名称
+    
+    将ISO国家代码转换为中文名称，用于用户友好的显示。
+    
+    Args:
+        code (str): 国家代码（如'US', 'CN'等）
+    
+    Returns:
+        str: 中文国家名称
+    """
+    return COUNTRY_MAPPING.get(code, code)
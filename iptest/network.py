@@ -0,0 +1,274 @@
+"""TCP连接探测与带宽测试"""
+
+import logging
+import time
+import socket
+from array import array
+
+from .adaptive import AdaptiveConnect, adaptive_connect
+from .prefix import ip_family
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 网络检测模块 =====
+# 网络连接测试功能，包括TCP连接、延迟测试、带宽测试等
+
+def quick_filter_ip(ip, timeout=None):
+    """
+    快速筛选IP - 基础TCP连接测试
+    
+    对IP地址进行快速的TCP连接测试，快速剔除明显不可用的IP，
+    这是第一轮筛选，用于减少后续深度测试的工作量。
+    
+    Args:
+        ip (str): 要测试的IP地址
+        timeout (float): 连接超时（秒），默认使用自适应连接超时
+    
+    Returns:
+        tuple: (是否可用, 延迟毫秒数) - (bool, int)
+    """
+    family = ip_family(ip)
+    if family is None:
+        return (False, 0)
+    
+    min_delay = float('inf')
+    success_count = 0
+    timed_out = 0
+    deadline = adaptive_connect().timeout() if timeout is None else timeout
+    
+    for port in CONFIG["test_ports"]:
+        try:
+            if not isinstance(port, int) or not (1 <= port <= 65535):
+                continue
+                
+            with socket.socket(family, socket.SOCK_STREAM) as s:
+                s.settimeout(deadline)
+                start_time = time.time()
+                
+                err = s.connect_ex((ip, port))
+                if err == 0:
+                    elapsed = (time.time() - start_time) * 1000
+                    adaptive_connect().record_success(elapsed)
+                    delay = round(elapsed)
+                    min_delay = min(min_delay, delay)
+                    success_count += 1
+                    
+                    if delay < 200:
+                        return (True, delay)
+                elif err in AdaptiveConnect.TIMEOUT_ERRNOS:
+                    timed_out += 1
+        except socket.timeout:
+            timed_out += 1
+        except (socket.error, OSError):
+            continue
+        except Exception:
+            continue
+    
+    if success_count > 0:
+        return (True, min_delay)
+    if timed_out:
+        adaptive_connect().record_timeout(ip, deadline, timed_out)
+    
+    return (False, 0)
+
+def test_ip_bandwidth_only(ip, current, total, test_count=None, time_limit=10):
+    """
+    通过HTTP下载测试IP带宽性能
+    
+    使用真实的HTTP下载测试来测量IP的带宽性能，
+    通过下载指定大小的文件来评估网络速度。
+    
+    Args:
+        ip (str): 要测试的IP地址
+        current (int): 当前测试序号
+        total (int): 总测试数量
+        test_count (int): 测试次数，默认使用配置值
+        time_limit (float): 单次下载最长时间（秒）
+    
+    Returns:
+        tuple: (是否成功, 带宽Mbps, 延迟毫秒) - (bool, float, float)
+    """
+    try:
+        # 验证IP地址格式
+        if ip_family(ip) is None:
+            return (False, 0, 0)
+        
+        # 使用真实的下载测试来测量带宽
+        test_size_bytes = CONFIG["bandwidth_test_size_mb"] * 1024 * 1024
+        test_urls = [url.format(bytes=test_size_bytes) for url in CONFIG["bandwidth_test_urls"]]
+        
+        best_speed = 0
+        best_latency = 0
+        
+        # 使用配置的测试次数
+        if test_count is None:
+            test_count = CONFIG["bandwidth_test_count"]
+        for test_attempt in range(test_count):
+            for url in test_urls:
+                try:
+                    start_time = time.time()
+                    
+                    # 发送HTTP请求测试带宽
+                    response = runtime().session.get(
+                        url, 
+                        timeout=min(15, max(1, time_limit)),
+                        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+                        stream=True
+                    )
+                    
+                    if response.status_code == 200:
+                        # 测量下载速度
+                        data_size = 0
+                        start_download = time.time()
+                        
+                        # 下载数据块来测试速度
+                        for chunk in response.iter_content(chunk_size=8192):
+                            if chunk:
+                                data_size += len(chunk)
+                                # 限制测试时间，避免过长时间
+                                if time.time() - start_download > time_limit:  # 最多测试time_limit秒
+                                    break
+                                # 如果下载了足够的数据就停止
+                                if data_size > 10 * 1024 * 1024:  # 10MB
+                                    break
+                        
+                        download_time = time.time() - start_download
+                        latency = (start_download - start_time) * 1000  # 延迟
+                        
+                        if download_time > 0 and data_size > 0:
+                            # 计算速度 (Mbps)
+                            speed_mbps = (data_size * 8) / (download_time * 1000000)
+                            best_speed = max(best_speed, speed_mbps)
+                            best_latency = latency if best_latency == 0 else min(best_latency, latency)
+                            
+                            # 如果速度很好，可以提前返回
+                            if speed_mbps > 5:  # 超过5Mbps就认为很好
+                                logger.info(f"⚡ [{current}/{total}] {ip}（带宽综合速度：{best_speed:.2f}Mbps）")
+                                return (True, best_speed, best_latency)
+                
+                except Exception as e:
+                    logger.debug(f"IP {ip} 带宽测试失败: {str(e)[:50]}")
+                    continue
+        
+        if best_speed > 0:
+            logger.info(f"⚡ [{current}/{total}] {ip}（带宽综合速度：{best_speed:.2f}Mbps）")
+            return (True, best_speed, best_latency)
+        else:
+            # 如果带宽测试失败，返回延迟测试结果
+            is_available, latency = test_ip_availability(ip)
+            if is_available:
+                logger.info(f"⚡ [{current}/{total}] {ip}（带宽测试失败，使用延迟作为替代指标）")
+                return (True, 0, latency)  # 返回0表示带宽测试失败，但延迟可用
+            else:
+                logger.info(f"⚡ [{current}/{total}] {ip}（带宽测试失败）")
+                return (False, 0, 0)
+            
+    except Exception as e:
+        logger.error(f"IP {ip} 带宽测试异常: {str(e)[:50]}")
+        return (False, 0, 0)
+
+def latency_filter_ips(table, rows, percentage=30):
+    """
+    延迟排名筛选 - 取前N%的IP
+    
+    根据延迟性能对IP进行排名筛选，只保留延迟最低的前N%的IP，
+    用于减少后续深度测试的工作量。
+    
+    Args:
+        table (ResultTable): 结果表，按delay列排名（TCP延迟或app模式下选定的应用层延迟分量）
+        rows (sequence): 参与排名的行号
+        percentage (int): 保留百分比，默认30%
+    
+    Returns:
+        array: 筛选后的行号，按延迟升序
+    """
+    if not rows:
+        return array('I')
+    
+    # 按延迟排序
+    delays = table.columns["delay"]
+    sorted_rows = sorted(rows, key=delays.__getitem__)
+    
+    # 计算要保留的数量
+    keep_count = max(1, int(len(sorted_rows) * percentage / 100))
+    
+    # 显示筛选结果
+    logger.info(f"🔍 延迟排名前{percentage}%筛选：从 {len(sorted_rows)} 个IP中筛选出 {keep_count} 个IP")
+    
+    # 显示筛选结果
+    for i, row in enumerate(sorted_rows[:keep_count], 1):
+        logger.info(f"📊 {table.ip(row)}（延迟排名第{i}位：{delays[row]:.1f}ms）")
+    
+    return array('I', sorted_rows[:keep_count])
+
+def test_ip_availability(ip, timeout=None):
+    """
+    TCP Socket检测IP可用性 - 支持多端口自定义
+    
+    使用TCP Socket连接测试IP的可用性和延迟，
+    支持配置多个测试端口，返回最佳连接结果。
+    
+    Args:
+        ip (str): 要测试的IP地址
+        timeout (float): 连接超时（秒），默认使用自适应连接超时
+    
+    Returns:
+        tuple: (是否可用, 延迟毫秒数) - (bool, int)
+    """
+    # 验证IP地址格式
+    family = ip_family(ip)
+    if family is None:
+        return (False, 0)
+    
+    # 检查测试端口配置
+    if not CONFIG["test_ports"] or not isinstance(CONFIG["test_ports"], list):
+        logger.warning(f"⚠️ 测试端口配置无效，跳过IP {ip}")
+        return (False, 0)
+    
+    min_delay = float('inf')
+    success_count = 0
+    timed_out = 0
+    deadline = adaptive_connect().timeout() if timeout is None else timeout
+    
+    # 遍历配置的测试端口
+    for port in CONFIG["test_ports"]:
+        try:
+            # 验证端口号
+            if not isinstance(port, int) or not (1 <= port <= 65535):
+                logger.warning(f"⚠️ 无效端口号 {port}，跳过")
+                continue
+                
+            with socket.socket(family, socket.SOCK_STREAM) as s:
+                s.settimeout(deadline)  # 自适应连接超时
+                start_time = time.time()
+                
+                # 尝试TCP连接
+                err = s.connect_ex((ip, port))
+                if err == 0:
+                    elapsed = (time.time() - start_time) * 1000
+                    adaptive_connect().record_success(elapsed)
+                    delay = round(elapsed)
+                    min_delay = min(min_delay, delay)
+                    success_count += 1
+                    
+                    # 如果延迟很好，立即返回最佳结果
+                    if delay < 200:
+                        return (True, delay)
+                elif err in AdaptiveConnect.TIMEOUT_ERRNOS:
+                    timed_out += 1
+        except socket.timeout:
+            timed_out += 1
+        except (socket.error, OSError):
+            continue  # 继续测试下一个端口
+        except Exception as e:
+            logger.debug(f"IP {ip} 端口 {port} 检测异常: {str(e)[:30]}")
+            continue
+    
+    # 返回最佳结果
+    if success_count > 0:
+        return (True, min_delay)
+    if timed_out:
+        adaptive_connect().record_timeout(ip, deadline, timed_out)
+    
+    return (False, 0)
@@ -0,0 +1,162 @@
+"""结果文件输出与热启动种子"""
+
+import logging
+import os
+from collections import defaultdict
+
+from .concurrency import get_regions_concurrently
+from .files import write_lines_atomic
+from .geo import get_country_name
+from .prefix import ip_family, ip_key
+from .runtime import CONFIG
+
+logger = logging.getLogger(__name__)
+
+# ===== 结果输出模块 =====
+# 按地区分组格式化结果，保存基础版和高级版输出文件；IPv4和IPv6分别写入各自的文件
+
+def versioned_name(filename, version):
+    """IPv4结果沿用原文件名，IPv6结果写入带 -v6 后缀的同名文件"""
+    if version == 4:
+        return filename
+    stem, ext = os.path.splitext(filename)
+    return f"{stem}-v6{ext}"
+
+def write_ip_lists(table, rows, filename, label="可用"):
+    """按地址族分别写出IP列表，没有结果的地址族不写文件"""
+    for version, version_rows in table.split_versions(rows).items():
+        if version_rows:
+            path = versioned_name(filename, version)
+            write_lines_atomic(path, table.ip_list(version_rows))
+            logger.info(f"📄 已保存 {len(version_rows)} 个{label}IP到 {path}")
+
+def write_region_lists(table, rows, filename, label=""):
+    """按地址族分别格式化并写出地区分组结果（需已完成地区识别）"""
+    written = 0
+    for version, version_rows in table.split_versions(rows).items():
+        lines = format_region_lines(table, version_rows, label)
+        if lines:
+            path = versioned_name(filename, version)
+            write_lines_atomic(path, lines, trailing_newline=False)
+            logger.info(f"📄 已保存 {len(lines)} 条{label}格式化记录到 {path}")
+            written += len(lines)
+    if not written:
+        logger.warning(f"⚠️ {label + '版' if label else ''}无有效记录可保存")
+
+def format_region_lines(table, rows, label=""):
+    """
+    按地区分组并格式化结果
+
+    Args:
+        table (ResultTable): 已完成地区识别的结果表
+        rows (sequence): 需要输出的行号，同一地区内保持这里的顺序
+        label (str): 日志前缀，如"高级"
+
+    Returns:
+        list: 格式化记录，格式为 "ip#代码 地区节点 | 序号"
+    """
+    # 按地区分组
+    region_groups = defaultdict(list)
+    for row in rows:
+        region_groups[get_country_name(table.region(row))].append(row)
+
+    logger.info(f"🌍 {label}地区分组完成，共 {len(region_groups)} 个地区")
+
+    lines = []
+    for region in sorted(region_groups.keys()):
+        # 同一地区内沿用传入顺序（基础版按IP数值，高级版按综合评分）
+        region_rows = region_groups[region]
+        for idx, row in enumerate(region_rows, 1):
+            # IPv6地址加方括号，与客户端 "地址#备注" 格式兼容
+            address = table.ip(row) if table.version(row) == 4 else f"[{table.ip(row)}]"
+            lines.append(f"{address}#{table.region(row)} {region}节点 | {idx:02d}")
+        logger.debug(f"{label}地区 {region} 格式化完成，包含 {len(region_rows)} 个IP")
+    return lines
+
+def write_advanced_outputs(table, rows, resolve_regions=True):
+    """
+    保存高级版输出文件
+
+    依次写出 IPlist-Pro.txt、Ranking.txt，再对优选IP进行地区识别并写出 Senflare-Pro.txt，
+    IPv6结果写入对应的 -v6 文件。
+
+    Args:
+        table (ResultTable): 结果表，Ranking.txt 中的延迟、应用层延迟分量、带宽、上传带宽和评分均从中读取
+        rows (sequence): 已按评分排序的行号
+        resolve_regions (bool): 是否先识别地区；调用方已识别过这些行时传False
+
+    Returns:
+        None: 直接写入文件
+    """
+    def component_text(row):
+        components = table.components(row)
+        if not components:
+            return ""
+        return f"，TCP {components['connect']:g}ms/TLS {components['tls']:g}ms/首字节 {components['ttfb']:g}ms"
+
+    def upload_text(row):
+        return f"，上传 {table.get('upload', row):.2f}Mbps" if table.has("upload", row) else ""
+
+    # 保存优选IP列表
+    write_ip_lists(table, rows, 'IPlist-Pro.txt', "优选")
+
+    # 保存详细排名信息（各地址族分别排名）
+    for version, version_rows in table.split_versions(rows).items():
+        if not version_rows:
+            continue
+        path = versioned_name('Ranking.txt', version)
+        write_lines_atomic(path, [
+            f"📊 [{i}/{len(version_rows)}] {table.ip(row)}（延迟 {table.get('delay', row):g}ms{component_text(row)}，"
+            f"带宽 {table.get('bandwidth', row):.2f}Mbps{upload_text(row)}，评分 {table.get('score', row):.1f}）"
+            for i, row in enumerate(version_rows, 1)
+        ])
+        logger.info(f"📄 已保存排名详情到 {path}")
+
+    # 对优选IP进行地区识别，生成高级版格式化结果
+    if resolve_regions:
+        logger.info("🌍 ===== 高级地区识别与结果格式化 =====")
+        get_regions_concurrently(table, rows)
+    write_region_lists(table, rows, 'Senflare-Pro.txt', "高级")
+
+def load_warm_start():
+    """
+    读取上一次运行的输出作为热启动种子
+
+    Returns:
+        tuple: (上一次的优选IP列表（按排名）, 上一次的其余可用IP列表)，文件不存在时为空列表
+    """
+    def read_ips(filename):
+        ips = []
+        for version in (4, 6):
+            path = versioned_name(filename, version)
+            if not os.path.exists(path):
+                continue
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    ips.extend(line.strip() for line in f if ip_family(line.strip()))
+            except Exception as e:
+                logger.warning(f"⚠️ 读取 {path} 失败: {str(e)[:50]}")
+        return ips
+
+    top = list(dict.fromkeys(read_ips('IPlist-Pro.txt')))
+    seen = set(top)
+    alive = [ip for ip in dict.fromkeys(read_ips('IPlist.txt')) if ip not in seen]
+    return top, alive
+
+def write_partial_outputs(table, warm_top):
+    """
+    提前写出部分结果
+
+    快速筛选已确认的可用IP按延迟写入 IPlist.txt；其中属于上一次优选结果的IP按上一次的排名
+    写入 IPlist-Pro.txt。后续阶段完成后会被完整结果覆盖。
+
+    Args:
+        table (ResultTable): 快速筛选中的结果表
+        warm_top (list): 上一次的优选IP（按排名）
+    """
+    rows = sorted(range(len(table)), key=table.columns["quick_delay"].__getitem__)
+    write_ip_lists(table, rows, 'IPlist.txt', "已确认")
+    if CONFIG["advanced_mode"]:
+        confirmed = [table.rows[key] for key in map(ip_key, warm_top) if key in table.rows]
+        if confirmed:
+            write_ip_lists(table, confirmed, 'IPlist-Pro.txt', "已复核优选")
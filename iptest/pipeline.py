@@ -0,0 +1,382 @@
+"""完整的采集、检测、排名与输出流程"""
+
+import logging
+import time
+from array import array
+from contextlib import nullcontext
+from itertools import groupby
+
+from .adaptive import adaptive_connect
+from .applayer import (
+    LATENCY_COMPONENT_RTTS,
+    app_components,
+    rank_latency,
+    test_app_latency_concurrently,
+    test_ip_upload,
+)
+from .breaker import report_breakers
+from .budget import RunBudget, run_budget
+from .candidates import load_candidate_files
+from .checkpoint import StageCheckpoint, clear_checkpoints, load_checkpoint, save_checkpoint
+from .concurrency import (
+    AimdController,
+    get_regions_concurrently,
+    retry_borderline,
+    run_probes,
+    test_ips_concurrently,
+)
+from .files import delete_file_if_exists
+from .geo import get_region_cache, save_region_cache
+from .output import (
+    load_warm_start,
+    versioned_name,
+    write_advanced_outputs,
+    write_ip_lists,
+    write_partial_outputs,
+    write_region_lists,
+)
+from .prefix import ip_key, key_to_ip
+from .network import latency_filter_ips, quick_filter_ip, test_ip_bandwidth_only
+from .profiling import profile_stage, report_stage_stats
+from .runtime import CONFIG, runtime
+from .scoring import delay_stability
+from .sources import SourceTracker, collect_ips
+from .table import ResultTable
+
+logger = logging.getLogger(__name__)
+
+# ===== 主程序模块 =====
+# 程序主流程控制，协调各个模块完成IP采集、检测、排序和输出
+
+def main():
+    """
+    主程序入口
+    
+    执行完整的IP采集、检测、排序和输出流程：
+    1. 采集IP地址
+    2. 快速筛选
+    3. 地区识别
+    4. 深度测试（高级模式）
+    5. 结果输出
+    
+    Returns:
+        None: 程序执行完成后退出
+    """
+    start_time = time.time()
+    shares = dict(CONFIG["stage_budget_shares"])
+    if not CONFIG["upload_test_enabled"]:
+        # 未启用上传测试时，上传阶段的份额留给带宽测试
+        shares["bandwidth"] = shares.get("bandwidth", 0) + shares.pop("upload", 0)
+    budget = runtime().budget = RunBudget(CONFIG["time_budget_seconds"], shares, CONFIG["output_reserve_seconds"])
+    if budget.enabled:
+        logger.info(f"⏳ 已启用时间预算：{CONFIG['time_budget_seconds']}秒（输出预留 {budget.reserve:.0f}秒）")
+    
+    # 1. 预处理：读取上一次的结果作为热启动种子，再删除旧文件
+    # 清理之前运行生成的结果文件，避免结果累积
+    warm_top, warm_alive = load_warm_start() if CONFIG["warm_start_enabled"] else ([], [])
+    for version in (4, 6):
+        delete_file_if_exists(versioned_name('IPlist.txt', version))
+        delete_file_if_exists(versioned_name('Senflare.txt', version))
+        if CONFIG["advanced_mode"]:
+            delete_file_if_exists(versioned_name('IPlist-Pro.txt', version))
+            delete_file_if_exists(versioned_name('Senflare-Pro.txt', version))
+            delete_file_if_exists(versioned_name('Ranking.txt', version))
+    logger.info("🗑️ 预处理完成，旧文件已清理")
+
+    # 2. 采集IP地址
+    # 从多个API源并发采集IP地址，获取大量候选IP
+    with profile_stage("collect"):
+        logger.info("📥 ===== 采集IP地址 =====")
+        tracker = SourceTracker()
+        source_ips = load_checkpoint("candidates")
+        if source_ips is not None:
+            for url, ips in source_ips.items():
+                for ip in ips:
+                    tracker.providers[ip].add(url)
+            logger.info(f"♻️ 从断点恢复 {len(source_ips)} 个源的候选IP，跳过采集")
+        else:
+            source_ips = collect_ips(tracker)
+            save_checkpoint("candidates", source_ips)
+        all_ips = [ip for ips in source_ips.values() for ip in ips]
+        # 本地候选文件解析为有序整数数组，探测时才逐个转换为字符串
+        local_ips = load_candidate_files(CONFIG["candidate_files"]) if CONFIG["candidate_files"] else ()
+
+    # 3. IP去重与排序
+    # 对采集到的IP进行去重，高产出源提供的IP优先探测，同优先级按IP数值排序
+    with profile_stage("dedup"):
+        # 按16字节紧凑表示去重排序（IPv4在前，IPv6按数值）
+        unique_ips = [key_to_ip(key) for key in sorted(set(map(ip_key, all_ips)))]
+        unique_ips.sort(key=lambda ip: -tracker.priority(ip))
+        logger.info(f"🔢 去重后共 {len(unique_ips)} 个唯一IP地址"
+                    + (f"，另有本地候选 {len(local_ips)} 个" if local_ips else ""))
+        # 只出现在本地候选文件中的上一次结果同样参与热启动
+        if local_ips and (warm_top or warm_alive):
+            web_ips = set(unique_ips)
+            unique_ips += [ip for ip in dict.fromkeys(warm_top + warm_alive)
+                           if ip not in web_ips and ip in local_ips]
+        # 热启动：上一次的优选IP最先探测，其次是上一次的其余可用IP，组内保持上面的顺序
+        warm_phase = dict.fromkeys(warm_alive, 1)
+        warm_phase.update(dict.fromkeys(warm_top, 0))
+        if warm_phase:
+            unique_ips.sort(key=lambda ip: warm_phase.get(ip, 2))
+            warm_count = sum(1 for ip in unique_ips if ip in warm_phase)
+            logger.info(f"♨️ 热启动：优先复测上一次的 {warm_count} 个IP"
+                        f"（优选 {len(warm_top)} 个，可用 {len(warm_alive)} 个）")
+    
+        # 检查是否有IP需要检测
+        if not unique_ips and not local_ips:
+            logger.warning("⚠️ 没有采集到任何IP地址，程序结束")
+            return
+
+    # 4. 快速筛选
+    # 使用TCP连接测试快速剔除明显不可用的IP，减少后续测试工作量
+    with profile_stage("quick_filter"), StageCheckpoint("quick_filter", retain=False) as checkpoint:
+        logger.info("🔍 ===== 快速筛选 =====")
+        # 可用IP写入结果表，后续阶段在同一张表上原地更新
+        table = ResultTable()
+        probed_ips = set()
+        
+        partial_ips = CONFIG["warm_start_partial_ips"]
+        
+        def accept(ip, result, label=""):
+            nonlocal partial_ips
+            # 只记录IP源提供的IP，本地候选文件的IP不参与源统计
+            if ip in tracker.providers:
+                probed_ips.add(ip)
+            is_good, delay = result
+            if is_good:
+                table.add(ip, quick_delay=delay)
+                # 确认足够多的可用IP后立即写出部分结果，时间预算内随时有可用输出
+                if partial_ips and len(table) >= partial_ips:
+                    partial_ips = 0
+                    logger.info(f"♨️ 已确认 {len(table)} 个可用IP，提前写出部分结果")
+                    write_partial_outputs(table, warm_top)
+                logger.info(f"✅ 可用 {ip}（延迟 {delay}ms{label}）")
+            else:
+                logger.info(f"❌ {ip} 被快速筛选剔除")
+        
+        def accept_probed(ip, result):
+            checkpoint.put(ip, result)
+            accept(ip, result)
+        
+        # 断点中已有结果的IP直接复用，其余IP在自适应并发下探测（保持优先级顺序提交）
+        pending_ips = []
+        for ip in unique_ips:
+            result = checkpoint.get(ip)
+            if result is None:
+                pending_ips.append(ip)
+            else:
+                accept(ip, result)
+        adaptive_connect().begin()
+        # 热启动各组的RTT和失败率分布不同，逐组探测，每组开始时并发控制器重新建立基线
+        controller = AimdController()
+        for _, group in groupby(pending_ips, key=lambda ip: warm_phase.get(ip, 2)):
+            controller.rebaseline()
+            run_probes(list(group), quick_filter_ip, accept_probed, controller)
+        
+        def local_pending():
+            # 本地候选边迭代边转换为字符串，跳过上面已探测过的IP，断点中已有结果的直接复用
+            queued_ips = set(unique_ips)
+            for ip in local_ips:
+                if ip in queued_ips:
+                    continue
+                result = checkpoint.get(ip)
+                if result is None:
+                    yield ip
+                else:
+                    accept(ip, result)
+        
+        # 本地候选文件的IP最后作为一组流式提交，不生成完整的字符串列表
+        if local_ips:
+            controller.rebaseline()
+            run_probes(local_pending(), quick_filter_ip, accept_probed, controller)
+        concurrency = controller.mean_concurrency()
+    
+        # 边缘重试：自适应超时内未连通的边缘IP按固定超时再测一次
+        def accept_retry(ip, result):
+            checkpoint.put(ip, result)
+            if result[0]:
+                accept(ip, result, "，边缘重试")
+        
+        # 重试的并发从配置的初始值重新开始，不继承主阶段的上限
+        retried, recovered, retry_seconds = retry_borderline(quick_filter_ip, accept_retry)
+        adaptive_connect().end("快速筛选", concurrency, retried, recovered, retry_seconds)
+        controller.report("快速筛选")
+    
+        logger.info(f"🔍 快速筛选完成，保留 {len(table)} 个IP")
+        # 结果文件保持按IP数值排序
+        table.sort_by_ip()
+        filtered_ips = table.ip_list()
+    
+        if not filtered_ips:
+            logger.warning("⚠️ 快速筛选后无可用IP，程序结束")
+            return
+
+    # 5. 立即保存基础文件（快速筛选完成后）
+    # 保存基础版IP列表，供用户快速使用
+    with profile_stage("save_basic"):
+        logger.info("📄 ===== 保存基础文件 =====")
+        write_ip_lists(table, range(len(table)), 'IPlist.txt')
+    
+    # 6. 立即进行地区识别与结果格式化（提前保存Senflare.txt）
+    # 对快速筛选的IP进行地区识别，生成格式化结果
+    with profile_stage("region"):
+        logger.info("🌍 ===== 并发地区识别与结果格式化 =====")
+        # 使用快速筛选的IP进行地区识别，结果写入结果表
+        all_rows = range(len(table))
+        get_regions_concurrently(table, all_rows)
+    
+        # 按地区分组并立即保存基础文件
+        write_region_lists(table, all_rows, 'Senflare.txt')
+        # 地区识别结果保存在缓存中，作为该阶段的断点
+        save_region_cache()
+
+    # 7. 延迟排名前30%筛选（基于快速筛选结果）
+    # 根据延迟性能筛选出前30%的IP，用于后续深度测试
+    # app模式下测量应用层延迟分量并按latency_rank_key排名；TCP模式直接使用快速筛选测得的延迟
+    app_mode = CONFIG["latency_mode"] == "app"
+    with profile_stage("latency_filter"), \
+            (StageCheckpoint("latency_filter_app") if app_mode else nullcontext()) as checkpoint:
+        logger.info("🔍 ===== 延迟排名前30%筛选 =====")
+        # 对快速筛选的IP进行延迟排名筛选，排名延迟写入结果表的delay列
+        if app_mode:
+            candidate_rows = array('I')
+            pending = [ip for ip in filtered_ips if checkpoint.get(ip) is None]
+            test_app_latency_concurrently(pending, on_result=checkpoint.put)
+            for row, ip in enumerate(filtered_ips):
+                entry = checkpoint.entries.get(ip)
+                if entry is None:
+                    # 时间预算耗尽未测到的IP复用快速筛选的延迟，按TCP延迟折算到排名分量
+                    delay = table.get("quick_delay", row) * LATENCY_COMPONENT_RTTS[CONFIG["latency_rank_key"]]
+                    table.set(row, delay=delay)
+                    candidate_rows.append(row)
+                elif entry[0]:
+                    components = app_components(entry)
+                    table.set(row, delay=rank_latency(components), **components)
+                    candidate_rows.append(row)
+        else:
+            # 快速筛选已经过自适应并发引擎测量TCP延迟，这里不再逐个重测
+            table.columns["delay"] = array('d', table.columns["quick_delay"])
+            candidate_rows = array('I', range(len(table)))
+    
+        # 前序阶段超时时按剩余时间收缩深度测试的IP比例
+        percentage = CONFIG["latency_filter_percentage"]
+        scale = run_budget().scale(["tcp_ping", "bandwidth"])
+        if scale < 1:
+            percentage = max(1, percentage * scale)
+            logger.warning(f"⏳ 时间预算不足，延迟筛选比例收缩为 {percentage:.1f}%")
+        latency_rows = latency_filter_ips(table, candidate_rows, percentage)
+        logger.info(f"🔍 延迟筛选完成，保留 {len(latency_rows)} 个IP")
+
+    # 8. TCP Ping测试（只测试延迟，不测试带宽）
+    # 对筛选后的IP进行精确的TCP延迟测试，app模式下重新测量应用层延迟分量
+    with profile_stage("tcp_ping"), StageCheckpoint("tcp_ping_app" if app_mode else "tcp_ping") as checkpoint:
+        logger.info("🔍 ===== 应用层延迟测试 =====" if app_mode else "🔍 ===== TCP Ping测试 =====")
+        ping_targets = table.ip_list(latency_rows)
+        pending = [ip for ip in ping_targets if checkpoint.get(ip) is None]
+        if app_mode:
+            test_app_latency_concurrently(pending, on_result=checkpoint.put)
+        else:
+            test_ips_concurrently(pending, on_result=lambda ip, ok, delay: checkpoint.put(ip, (ok, delay)))
+        # 按筛选顺序合并本次检测结果与断点中的结果，稳定性取本次与快速筛选两次TCP连接延迟的一致程度
+        ping_rows = array('I')
+        for row, ip in zip(latency_rows, ping_targets):
+            entry = checkpoint.entries.get(ip)
+            if entry and entry[0]:
+                if app_mode:
+                    components = app_components(entry)
+                    connect = components["connect"]
+                    table.set(row, delay=rank_latency(components), **components)
+                else:
+                    connect = entry[1]
+                    table.set(row, delay=connect)
+                table.set(row, stability=delay_stability(table.get("quick_delay", row), connect))
+                ping_rows.append(row)
+
+    # 9. 带宽测试（只对筛选后的IP进行带宽测试）
+    # 对通过延迟筛选的IP进行HTTP带宽测试，评估网络性能
+    with profile_stage("bandwidth"), StageCheckpoint("bandwidth") as checkpoint:
+        logger.info("🔍 ===== 带宽测试 =====")
+        # 进行带宽测试，通过的行进入评分
+        available_rows = array('I')
+        # 时间预算不足时减少每个IP的测试次数
+        test_count = CONFIG["bandwidth_test_count"]
+        scale = run_budget().scale(["bandwidth"])
+        if scale < 1:
+            test_count = max(1, round(test_count * scale))
+            logger.warning(f"⏳ 时间预算不足，带宽测试次数收缩为 {test_count} 次")
+        downloads = test_count * max(1, len(CONFIG["bandwidth_test_urls"]))
+        skipped = 0
+        # 按延迟排名顺序逐个测试，预算耗尽时舍弃的是排名靠后的IP，而不是把时间平摊到所有IP上
+        for i, row in enumerate(ping_rows, 1):
+            ip = table.ip(row)
+            result = checkpoint.get(ip)
+            if result is None:
+                remaining = run_budget().stage_remaining()
+                if remaining < 1:
+                    # 阶段预算已用完，剩余IP不再测试，仅按延迟参与评分
+                    skipped += 1
+                    result = (True, 0, table.get("delay", row))
+                else:
+                    # 每个IP最多下载 downloads 次，单次最长10秒，总时长不超过阶段剩余时间
+                    time_limit = min(10, remaining / downloads)
+                    result = test_ip_bandwidth_only(ip, i, len(ping_rows), test_count, time_limit)
+                    checkpoint.put(ip, result)
+            is_fast, bandwidth, latency = result
+            if is_fast:
+                # 使用TCP Ping测试的延迟数据，评分在全部结果就绪后统一计算
+                table.set(row, bandwidth=bandwidth, latency=latency)
+                available_rows.append(row)
+        if skipped:
+            logger.warning(f"⏳ 带宽测试时间预算耗尽，排名最后的 {skipped} 个IP未测试，仅按延迟参与评分")
+
+    # 10. 上传测试（可选，只对通过带宽测试的IP进行）
+    # 连接固定到候选IP测量上传带宽，按权重计入综合评分
+    if CONFIG["upload_test_enabled"] and available_rows:
+        with profile_stage("upload"), StageCheckpoint("upload") as checkpoint:
+            logger.info("📤 ===== 上传测试 =====")
+            skipped = 0
+            # 与带宽测试相同，按排名顺序测试，每个IP的时长取配置上限与阶段剩余时间中的较小值
+            for i, row in enumerate(available_rows, 1):
+                ip = table.ip(row)
+                result = checkpoint.get(ip)
+                if result is None:
+                    remaining = run_budget().stage_remaining()
+                    if remaining < CONFIG["upload_min_seconds"]:
+                        # 太短的上传还在慢启动阶段，测得的速度没有意义
+                        skipped += 1
+                        continue
+                    result = test_ip_upload(ip, i, len(available_rows), min(CONFIG["upload_test_timeout"], remaining))
+                    checkpoint.put(ip, result)
+                ok, mbps = result
+                if ok:
+                    table.set(row, upload=mbps)
+            if skipped:
+                logger.warning(f"⏳ 上传测试时间预算耗尽，排名最后的 {skipped} 个IP未测试")
+
+    # 8. 保存高级文件（按评分排序）
+    # 生成高级版IP列表和详细排名信息
+    with profile_stage("advanced_output"):
+        if available_rows:
+            # 按列一次计算全部IP的综合评分，设置output_top_n时只选取头部IP
+            available_rows = table.score(available_rows, upload=CONFIG["upload_test_enabled"])
+            logger.info(f"📊 按综合评分排序完成（评分方案 {CONFIG['score_profile']}）")
+            write_advanced_outputs(table, available_rows)
+        else:
+            logger.warning("⚠️ 高级版无有效记录可保存")
+
+    # 9. 保存缓存并显示统计信息
+    # 保存地区缓存和源统计，显示运行统计信息
+    save_region_cache()
+    tracker.record_run(probed_ips, set(filtered_ips), set(table.ip_list(available_rows)))
+    tracker.save()
+    tracker.report(CONFIG["ip_sources"])
+    report_breakers()
+    clear_checkpoints()
+    
+    # 显示总耗时
+    run_time = round(time.time() - start_time, 2)
+    logger.info(f"⏱️ 总耗时: {run_time}秒")
+    logger.info(f"📊 缓存统计: 总计 {len(get_region_cache())} 个")
+    report_stage_stats()
+    logger.info("🏁 ===== 程序完成 =====")
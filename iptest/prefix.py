@@ -0,0 +1,156 @@
+"""IP地址工具与Cloudflare前缀预过滤"""
+
+import socket
+import ipaddress
+from array import array
+from bisect import bisect_right
+from functools import lru_cache
+
+# NumPy为可选依赖，存在时用于批量向量化计算
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .runtime import CONFIG
+
+# ===== IP前缀过滤模块 =====
+# 将CIDR网段合并为有序整数区间，二分查找（或NumPy向量化）批量判断IP归属
+
+# IPv4映射前缀（::ffff:0:0/96），IPv4地址放入128位空间后与IPv6统一存储、去重和排序
+IPV4_MAPPED_PREFIX = bytes(10) + b'\xff\xff'
+
+def ip_family(ip):
+    """返回IP地址的套接字地址族（AF_INET / AF_INET6），地址无效时返回None"""
+    family = socket.AF_INET6 if ':' in ip else socket.AF_INET
+    try:
+        socket.inet_pton(family, ip)
+    except (OSError, TypeError):
+        return None
+    return family
+
+def ip_to_int(ip):
+    """IP地址转整数：IPv4为32位，IPv6为128位"""
+    if ':' in ip:
+        return int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    return int.from_bytes(socket.inet_aton(ip), 'big')
+
+def ip_key(ip):
+    """
+    IP地址转16字节紧凑表示
+
+    IPv4映射到::ffff:0:0/96，字节序与数值序一致，可直接用于去重和排序（IPv4排在IPv6之前）。
+    """
+    if ':' in ip:
+        return socket.inet_pton(socket.AF_INET6, ip)
+    return IPV4_MAPPED_PREFIX + socket.inet_aton(ip)
+
+def key_to_ip(key):
+    """16字节紧凑表示转回IP地址字符串（IPv6为压缩格式）"""
+    if key[:12] == IPV4_MAPPED_PREFIX:
+        return socket.inet_ntoa(key[12:])
+    return socket.inet_ntop(socket.AF_INET6, key)
+
+class PrefixSet:
+    """
+    CIDR前缀集合
+
+    网段按起始地址排序并合并重叠部分，存为两个并行的整数数组（起点、终点），
+    单个查询使用bisect二分查找，批量查询在NumPy可用时使用searchsorted向量化处理。
+    每个集合只包含一个地址族：IPv4按完整32位地址存储；IPv6按/48粒度存储前48位，
+    仍可放入定长整数数组批量查询（长于/48的网段扩展为所在的/48）。
+    """
+
+    # 地址族 -> (数组类型码, 右移位数, NumPy类型)
+    FAMILIES = {4: ('I', 0, 'uint32'), 6: ('Q', 80, 'uint64')}
+
+    def __init__(self, cidrs, version=4):
+        typecode, self.shift, self.dtype = self.FAMILIES[version]
+        intervals = []
+        for cidr in cidrs:
+            network = ipaddress.ip_network(cidr, strict=False)
+            if network.version != version:
+                continue
+            intervals.append((int(network.network_address) >> self.shift,
+                              int(network.broadcast_address) >> self.shift))
+        intervals.sort()
+
+        merged = []
+        for start, end in intervals:
+            if merged and start <= merged[-1][1] + 1:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = array(typecode, [start for start, _ in merged])
+        self.ends = array(typecode, [end for _, end in merged])
+
+    def __len__(self):
+        return len(self.starts)
+
+    def __contains__(self, value):
+        index = bisect_right(self.starts, value) - 1
+        return index >= 0 and value <= self.ends[index]
+
+    def key(self, ip):
+        """IP地址转本集合使用的整数键（IPv6取前48位）"""
+        return ip_to_int(ip) >> self.shift
+
+    def mask(self, values):
+        """
+        批量判断成员关系
+
+        Args:
+            values (list | numpy.ndarray): 整数键列表（见key）
+
+        Returns:
+            list | numpy.ndarray: 与values等长的布尔列表；values为NumPy数组时返回布尔数组
+        """
+        as_array = np is not None and isinstance(values, np.ndarray)
+        if not self.starts:
+            return np.zeros(len(values), dtype=bool) if as_array else [False] * len(values)
+        if as_array or (np is not None and len(values) > 64):
+            array_values = np.asarray(values, dtype=self.dtype)
+            starts = np.frombuffer(self.starts, dtype=self.dtype)
+            ends = np.frombuffer(self.ends, dtype=self.dtype)
+            index = np.searchsorted(starts, array_values, side='right') - 1
+            inside = (index >= 0) & (array_values <= ends[np.maximum(index, 0)])
+            return inside if as_array else inside.tolist()
+        return [value in self for value in values]
+
+@lru_cache(maxsize=8)
+def get_prefix_set(cidrs, version=4):
+    """按网段元组和地址族缓存PrefixSet，配置不变时只构建一次"""
+    return PrefixSet(cidrs, version)
+
+def prefilter_sets(version):
+    """返回地址族对应的 (放行网段集合, 剔除网段集合)"""
+    ranges = CONFIG["cf_ipv4_ranges"] if version == 4 else CONFIG["cf_ipv6_ranges"]
+    allow = get_prefix_set(tuple(ranges) + tuple(CONFIG["prefilter_allow_cidrs"]), version)
+    return allow, get_prefix_set(tuple(CONFIG["prefilter_deny_cidrs"]), version)
+
+def prefilter_ips(ips):
+    """
+    Cloudflare网段预过滤
+
+    保留属于Cloudflare网段或额外放行网段、且不在剔除网段中的地址，
+    在任何网络探测之前批量剔除无关IP。IPv4和IPv6分别按各自的网段集合批量判断。
+
+    Args:
+        ips (list): IP地址列表
+
+    Returns:
+        tuple: (保留的IP列表, 剔除数量)
+    """
+    if not CONFIG["cf_prefilter_enabled"] or not ips:
+        return ips, 0
+    keep = [False] * len(ips)
+    for version in (4, 6):
+        indexes = [i for i, ip in enumerate(ips) if (':' in ip) == (version == 6)]
+        if not indexes:
+            continue
+        allow, deny = prefilter_sets(version)
+        values = [allow.key(ips[i]) for i in indexes]
+        for i, ok, bad in zip(indexes, allow.mask(values), deny.mask(values)):
+            keep[i] = ok and not bad
+    kept = [ip for ip, ok in zip(ips, keep) if ok]
+    return kept, len(ips) - len(kept)
@@ -0,0 +1,141 @@
+"""按阶段的性能分析"""
+
+import logging
+import os
+import time
+import json
+import cProfile
+import sys
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from collections import Counter
+
+from .budget import run_budget
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== 性能分析模块 =====
+# 按流水线阶段记录耗时，可选cProfile、采样分析和tracemalloc内存分析
+
+def stage_stats():
+    """当前运行时的各阶段耗时与内存峰值记录，格式为 {阶段名: {"seconds": 秒, "peak_kb": KB}}"""
+    return runtime().stage_stats
+
+class StackSampler:
+    """
+    轻量级采样分析器
+
+    后台线程按固定间隔读取所有线程的调用栈（sys._current_frames），
+    统计折叠调用栈（collapsed stack）出现次数，可直接用于生成火焰图。
+    与cProfile不同，它能覆盖线程池中的工作线程。
+    """
+
+    def __init__(self, interval=0.005):
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def _run(self):
+        own_id = threading.get_ident()
+        while not self._stop_event.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                    frame = frame.f_back
+                stack.append(names.get(thread_id, str(thread_id)))
+                self.stacks[';'.join(reversed(stack))] += 1
+
+    def start(self):
+        self._thread = threading.Thread(target=self._run, name='StackSampler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def write_collapsed(self, file_path):
+        """按 "帧1;帧2;... 次数" 格式写出折叠调用栈，兼容 flamegraph.pl / speedscope"""
+        with open(file_path, 'w', encoding='utf-8') as f:
+            for stack, count in self.stacks.most_common():
+                f.write(f"{stack} {count}\n")
+
+@contextmanager
+def profile_stage(name):
+    """
+    流水线阶段分析上下文
+
+    始终记录阶段耗时并通知运行时间预算进入该阶段；根据CONFIG["profile_mode"]额外执行：
+    - cprofile：cProfile分析主线程 + 采样分析全部线程，输出 .pstats 与 .folded
+    - sample：仅采样分析，开销更低，输出 .folded
+    - tracemalloc：记录阶段内存峰值
+
+    Args:
+        name (str): 阶段名称，用于文件命名和统计
+    """
+    mode = CONFIG["profile_mode"]
+    prefix = os.path.join(CONFIG["profile_dir"], f"{len(stage_stats()) + 1:02d}_{name}")
+    profiler = None
+    sampler = None
+
+    if mode:
+        os.makedirs(CONFIG["profile_dir"], exist_ok=True)
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+    if mode in ('cprofile', 'sample'):
+        sampler = StackSampler(CONFIG["profile_sample_interval"])
+        sampler.start()
+    if mode == 'tracemalloc':
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+        tracemalloc.reset_peak()
+
+    run_budget().begin_stage(name)
+    start_time = time.time()
+    if profiler:
+        profiler.enable()
+    try:
+        yield
+    finally:
+        if profiler:
+            profiler.disable()
+        stats = {"seconds": round(time.time() - start_time, 3)}
+        if sampler:
+            sampler.stop()
+            sampler.write_collapsed(f"{prefix}.folded")
+        if profiler:
+            profiler.dump_stats(f"{prefix}.pstats")
+        if mode == 'tracemalloc':
+            stats["peak_kb"] = round(tracemalloc.get_traced_memory()[1] / 1024, 1)
+        stage_stats()[name] = stats
+        logger.debug(f"🔬 阶段 {name} 完成: {stats}")
+
+def report_stage_stats():
+    """
+    输出各阶段耗时（及内存峰值）统计
+
+    开启性能分析时同时写出 summary.json，便于不同运行之间对比。
+
+    Returns:
+        None: 仅输出日志和统计文件
+    """
+    if not stage_stats():
+        return
+    logger.info("🔬 ===== 阶段耗时统计 =====")
+    for name, stats in stage_stats().items():
+        peak = f"，内存峰值 {stats['peak_kb']:.1f}KB" if 'peak_kb' in stats else ""
+        logger.info(f"🔬 {name}: {stats['seconds']:.2f}秒{peak}")
+
+    if CONFIG["profile_mode"]:
+        summary_path = os.path.join(CONFIG["profile_dir"], 'summary.json')
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({"mode": CONFIG["profile_mode"], "stages": stage_stats()}, f, ensure_ascii=False, indent=2)
+        logger.info(f"🔬 性能分析结果已保存到 {CONFIG['profile_dir']}/")
@@ -0,0 +1,172 @@
+"""运行时状态：每个实例独立的配置、HTTP会话和各模块的可变状态"""
+
+import os
+import logging
+import threading
+import copy
+import contextvars
+from contextlib import contextmanager
+from collections.abc import MutableMapping
+
+from .config import DEFAULT_CONFIG
+
+# ===== 运行时状态模块 =====
+# 配置和可变状态（HTTP会话、地区缓存、熔断器、TLS会话、时间预算等）归属于运行时实例，均在首次使用时才创建
+
+# IP源和地区API请求使用的浏览器请求头
+SESSION_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/131.0.0.0 Safari/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+    'Accept-Language': 'zh-CN,zh;q=0.9,en;q=0.8',
+    'Connection': 'keep-alive',
+    'Upgrade-Insecure-Requests': '1',
+    'Sec-Fetch-Dest': 'document',
+    'Sec-Fetch-Mode': 'navigate',
+    'Sec-Fetch-Site': 'none',
+    'Cache-Control': 'max-age=0'
+}
+
+class Runtime:
+    """
+    运行时状态
+
+    每个实例持有一份独立的配置和各模块的可变状态。未显式激活时使用进程内的默认实例；
+    activate() 让当前上下文（以及经 submit 提交的线程池任务）改用该实例，
+    同一进程中的多个实例互不影响。
+
+    Args:
+        **overrides: 覆盖默认值的配置项
+    """
+
+    def __init__(self, **overrides):
+        self.config = copy.deepcopy(DEFAULT_CONFIG)
+        self.config.update(overrides)
+        self.lock = threading.Lock()
+        self.stage_stats = {}           # 各阶段耗时与内存峰值（见 profile_stage）
+        self.breakers = {}              # 端点名称 -> 熔断器（见 get_breaker）
+        self.tls_context = None         # 应用层探测的TLS上下文（见 get_app_tls_context）
+        self.tls_sessions = {}          # (IP, SNI) -> 可恢复的TLS会话
+        self.budget = None              # 当前运行的时间预算（见 run_budget）
+        self.adaptive_connect = None    # 自适应连接超时（见 adaptive_connect）
+        self.region_cache = None        # 地区信息缓存（见 get_region_cache）
+        self._sessions = None
+
+    @contextmanager
+    def activate(self):
+        """在with块内把该实例设为当前运行时"""
+        token = current_runtime.set(self)
+        try:
+            yield self
+        finally:
+            current_runtime.reset(token)
+
+    def http_sessions(self):
+        """
+        返回 (通用会话, 地区API会话)，首次调用时创建
+
+        Returns:
+            tuple: 两个 requests.Session
+        """
+        with self.lock:
+            if self._sessions is None:
+                import requests
+                from urllib3.exceptions import InsecureRequestWarning
+
+                # 禁用SSL证书警告，避免HTTPS请求时的警告信息
+                requests.packages.urllib3.disable_warnings(category=InsecureRequestWarning)
+                session = requests.Session()
+                session.headers.update(SESSION_HEADERS)
+                # 配置连接池 - 优化网络连接性能
+                adapter = requests.adapters.HTTPAdapter(
+                    pool_connections=10,    # 连接池大小
+                    pool_maxsize=20,        # 最大连接数
+                    max_retries=3           # 最大重试次数
+                )
+                session.mount('http://', adapter)
+                session.mount('https://', adapter)
+
+                # 地区API专用会话：不在连接池层重试，失败由熔断器统一处理，避免单个IP重试叠加超时
+                api_session = requests.Session()
+                api_session.headers.update(SESSION_HEADERS)
+                api_adapter = requests.adapters.HTTPAdapter(pool_connections=10, pool_maxsize=20, max_retries=0)
+                api_session.mount('http://', api_adapter)
+                api_session.mount('https://', api_adapter)
+                self._sessions = (session, api_session)
+            return self._sessions
+
+    @property
+    def session(self):
+        return self.http_sessions()[0]
+
+    @property
+    def api_session(self):
+        return self.http_sessions()[1]
+
+    def forget_sessions(self):
+        """丢弃已创建的HTTP会话（fork出的子进程不能复用父进程的连接）"""
+        self._sessions = None
+
+current_runtime = contextvars.ContextVar('iptest_runtime', default=None)
+default_runtime = None
+default_runtime_lock = threading.Lock()
+
+def runtime():
+    """返回当前运行时：activate() 激活的实例，否则为进程内的默认实例"""
+    global default_runtime
+    active = current_runtime.get()
+    if active is not None:
+        return active
+    if default_runtime is None:
+        with default_runtime_lock:
+            if default_runtime is None:
+                default_runtime = Runtime()
+    return default_runtime
+
+def forget_default_sessions():
+    if default_runtime is not None:
+        default_runtime.forget_sessions()
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=forget_default_sessions)
+
+class ConfigView(MutableMapping):
+    """当前运行时配置的字典视图，各模块通过CONFIG读写的总是当前运行时的配置"""
+
+    def __getitem__(self, key):
+        return runtime().config[key]
+
+    def __setitem__(self, key, value):
+        runtime().config[key] = value
+
+    def __delitem__(self, key):
+        del runtime().config[key]
+
+    def __iter__(self):
+        return iter(runtime().config)
+
+    def __len__(self):
+        return len(runtime().config)
+
+CONFIG = ConfigView()
+
+def submit(executor, fn, *args):
+    """向线程池提交任务，任务沿用提交者的当前运行时"""
+    return executor.submit(contextvars.copy_context().run, fn, *args)
+
+def setup_logging(log_file='IPtest.log'):
+    """
+    配置日志系统 - 同时输出到文件和控制台
+
+    只由命令行入口调用，作为库导入时不改动宿主程序的日志配置。
+
+    Args:
+        log_file (str): 日志文件路径，为None时只输出到控制台
+    """
+    handlers = [logging.StreamHandler()]  # 控制台日志
+    if log_file:
+        handlers.insert(0, logging.FileHandler(log_file, encoding='utf-8'))  # 文件日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(levelname)s - %(message)s',
+        handlers=handlers
+    )
@@ -0,0 +1,114 @@
+"""综合评分引擎"""
+
+import heapq
+from bisect import bisect_left, bisect_right
+
+# NumPy为可选依赖，存在时用于批量向量化计算
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+from .runtime import CONFIG
+
+# ===== 评分引擎模块 =====
+# 按列批量计算综合评分：各指标换算为本次结果中的百分位，再按评分方案加权
+
+def percentile_scores(values, higher_is_better=True):
+    """
+    百分位归一化
+
+    把一列指标换算为它在本列中的百分位（0-1，1为最好），相同的值取平均名次，
+    因此评分只取决于IP之间的相对位置，不受指标量纲和分档阈值影响。
+
+    Args:
+        values (sequence): 指标列
+        higher_is_better (bool): 值越大越好时为True（带宽、稳定性），延迟为False
+
+    Returns:
+        numpy.ndarray | list: 与values等长的百分位
+    """
+    n = len(values)
+    if np is not None:
+        column = np.asarray(values, dtype=np.float64)
+        if n < 2:
+            return np.ones(n)
+        if not higher_is_better:
+            column = -column
+        ordered = np.sort(column)
+        ranks = np.searchsorted(ordered, column, 'left') + np.searchsorted(ordered, column, 'right') - 1
+        return ranks / (2 * (n - 1))
+    if n < 2:
+        return [1.0] * n
+    column = [value if higher_is_better else -value for value in values]
+    ordered = sorted(column)
+    return [(bisect_left(ordered, value) + bisect_right(ordered, value) - 1) / (2 * (n - 1)) for value in column]
+
+def score_results(latency, bandwidth, stability, upload=None, profile=None):
+    """
+    向量化综合评分 - 一次计算全部IP
+
+    Args:
+        latency (sequence): 延迟列（毫秒），越低越好
+        bandwidth (sequence): 下载带宽列（Mbps）
+        stability (sequence): 稳定性列（0-100）
+        upload (sequence): 上传带宽列（Mbps，未测出的IP为0），提供时按upload_score_weight分走部分带宽权重
+        profile (str): 评分方案名称，默认使用score_profile
+
+    Returns:
+        numpy.ndarray | list: 与输入顺序一致的综合评分（0-100分）
+    """
+    weights = CONFIG["score_profiles"][profile or CONFIG["score_profile"]]
+    bandwidth_weight = weights["bandwidth"]
+    columns = [
+        (percentile_scores(latency, higher_is_better=False), weights["latency"]),
+        (percentile_scores(stability), weights["stability"]),
+    ]
+    if upload is not None and CONFIG["upload_score_weight"] > 0:
+        upload_weight = bandwidth_weight * CONFIG["upload_score_weight"]
+        bandwidth_weight -= upload_weight
+        columns.append((percentile_scores(upload), upload_weight))
+    columns.append((percentile_scores(bandwidth), bandwidth_weight))
+    scale = 100 / (sum(weight for _, weight in columns) or 1)
+
+    if np is not None:
+        return np.round(sum(column * weight for column, weight in columns) * scale, 1)
+    return [round(sum(column[i] * weight for column, weight in columns) * scale, 1) for i in range(len(latency))]
+
+def delay_stability(first, second):
+    """
+    由同一IP两次独立测得的TCP连接延迟估计稳定性
+
+    取两次延迟之比（各加1ms，避免亚毫秒延迟的噪声被放大），两次一致时为100，抖动越大越低。
+
+    Args:
+        first (float): 第一次测得的延迟（毫秒）
+        second (float): 第二次测得的延迟（毫秒）
+
+    Returns:
+        float: 稳定性（0-100）
+    """
+    return round(100 * (min(first, second) + 1) / (max(first, second) + 1), 1)
+
+def top_k(scores, k=None):
+    """
+    按评分从高到低取前k个结果的下标
+
+    NumPy可用时先用argpartition在线性时间内选出前k个，只对这k个排序；
+    k为None时返回全部下标的降序排列。
+
+    Args:
+        scores (sequence): 评分列
+        k (int): 需要的数量
+
+    Returns:
+        list: 下标列表，评分相同时保持原顺序
+    """
+    n = len(scores)
+    k = n if k is None else max(0, min(k, n))
+    if np is not None:
+        column = -np.asarray(scores, dtype=np.float64)
+        selected = np.argpartition(column, k - 1)[:k] if 0 < k < n else np.arange(k)
+        selected.sort()
+        return selected[np.argsort(column[selected], kind='stable')].tolist()
+    return heapq.nsmallest(k, range(n), key=lambda i: -scores[i])
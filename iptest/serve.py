@@ -0,0 +1,305 @@
+"""排名结果查询服务"""
+
+import logging
+import re
+import os
+import math
+import json
+import threading
+import signal
+import hashlib
+import contextvars
+from array import array
+from datetime import datetime
+from collections import defaultdict
+from urllib.parse import urlparse, parse_qs
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+from .output import versioned_name
+from .prefix import ip_family, ip_key
+from .runtime import CONFIG
+from .table import ResultTable
+
+logger = logging.getLogger(__name__)
+
+# ===== 查询服务模块 =====
+# 把最新的排名结果加载为内存索引，通过HTTP按地区、评分和延迟查询，输出文件更新时整体替换索引
+
+# Ranking.txt 每行的格式见 write_advanced_outputs
+RANKING_LINE_PATTERN = re.compile(
+    r'\] ([^\s（]+)（延迟 ([\d.]+)ms.*?，带宽 ([\d.]+)Mbps(?:，上传 ([\d.]+)Mbps)?，评分 ([\d.]+)）')
+
+# 查询服务读取的输出文件（各地址族分别一个文件）
+SERVE_FILES = ('Ranking.txt', 'Senflare-Pro.txt')
+
+class ResultIndex:
+    """
+    排名结果的只读内存索引
+
+    全部行按评分降序和延迟升序各排一次，每个地区再各保留一份同样顺序的行号，
+    查询时只需沿对应的有序行号扫描，满足条件的结果够数即停止。
+    """
+
+    ORDERS = ("score", "latency")
+
+    def __init__(self, table, rows, etag):
+        self.table = table
+        self.etag = etag
+        self.loaded_at = datetime.now().isoformat(timespec='seconds')
+        by_score = array('I', sorted(rows, key=lambda row: -table.get("score", row)))
+        by_latency = array('I', sorted(rows, key=lambda row: table.get("delay", row)))
+        self.orders = {"score": by_score, "latency": by_latency}
+        self.by_region = defaultdict(lambda: {order: array('I') for order in self.ORDERS})
+        for order, ordered in self.orders.items():
+            for row in ordered:
+                self.by_region[table.region(row)][order].append(row)
+        self.by_region = dict(self.by_region)
+
+    def __len__(self):
+        return len(self.orders["score"])
+
+    def regions(self):
+        return {code: len(groups["score"]) for code, groups in sorted(self.by_region.items())}
+
+    def query(self, region=None, order="score", limit=10, min_bandwidth=0.0, max_latency=None, version=None):
+        """
+        按条件查询排名结果
+
+        Args:
+            region (str): 地区代码（如HK），None表示不限
+            order (str): 排序方式，score（评分降序）或 latency（延迟升序）
+            limit (int): 最多返回的数量
+            min_bandwidth (float): 最低下载带宽（Mbps）
+            max_latency (float): 最高延迟（毫秒），None表示不限
+            version (int): 地址族（4或6），None表示不限
+
+        Returns:
+            list: 满足条件的行号，按order排序
+        """
+        if region is None:
+            rows = self.orders[order]
+        else:
+            rows = self.by_region.get(region, {}).get(order, ())
+        delay = self.table.columns["delay"]
+        bandwidth = self.table.columns["bandwidth"]
+        selected = []
+        for row in rows:
+            if max_latency is not None and delay[row] > max_latency:
+                if order == "latency":
+                    break
+                continue
+            if bandwidth[row] < min_bandwidth or (version and self.table.version(row) != version):
+                continue
+            selected.append(row)
+            if len(selected) >= limit:
+                break
+        return selected
+
+    def record(self, row):
+        table = self.table
+        record = {"ip": table.ip(row), "region": table.region(row)}
+        for name in ("delay", "bandwidth", "upload", "score"):
+            record[name] = table.get(name, row) if table.has(name, row) else None
+        return record
+
+def result_signature():
+    """查询服务读取的输出文件的 (路径, 修改时间, 大小)，用于检测新结果"""
+    signature = []
+    for filename in SERVE_FILES:
+        for version in (4, 6):
+            path = versioned_name(filename, version)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+    return tuple(signature)
+
+def load_result_index():
+    """
+    读取 Ranking.txt 和 Senflare-Pro.txt（含 -v6 文件）构建查询索引
+
+    Returns:
+        ResultIndex: 查询索引，ETag为文件内容的摘要，结果不变时重新加载也保持不变
+    """
+    table = ResultTable()
+    rows = array('I')
+    digest = hashlib.sha1()
+    for version in (4, 6):
+        path = versioned_name('Ranking.txt', version)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest.update(content)
+        for line in content.decode('utf-8').splitlines():
+            match = RANKING_LINE_PATTERN.search(line)
+            if not match or not ip_family(match.group(1)):
+                continue
+            ip, delay, bandwidth, upload, score = match.groups()
+            rows.append(table.add(ip, delay=float(delay), bandwidth=float(bandwidth), score=float(score),
+                                  upload=float(upload) if upload else math.nan))
+    for version in (4, 6):
+        path = versioned_name('Senflare-Pro.txt', version)
+        if not os.path.exists(path):
+            continue
+        with open(path, 'rb') as f:
+            content = f.read()
+        digest.update(content)
+        for line in content.decode('utf-8').splitlines():
+            address, _, rest = line.partition('#')
+            key = ip_key(address.strip('[] ')) if ip_family(address.strip('[] ')) else None
+            row = table.rows.get(key)
+            if row is not None and rest:
+                table.set_region(row, rest.split(' ', 1)[0])
+    for row in rows:
+        if table.region(row) is None:
+            table.set_region(row, 'Unknown')
+    return ResultIndex(table, rows, digest.hexdigest()[:16])
+
+class ResultService:
+    """
+    查询服务状态
+
+    持有当前的查询索引，后台线程定期检测输出文件变化。文件变化后再等待一个检测周期
+    确认写入已完成（高级版输出的多个文件先后写出），再构建新索引并整体替换引用，
+    正在处理的请求继续使用旧索引，不会读到一半新一半旧的结果。
+    """
+
+    def __init__(self):
+        self.index = None
+        self.signature = None
+        self.pending = None
+
+    def reload(self, force=False):
+        """输出文件变化且已稳定时重新加载，返回是否更新了索引"""
+        signature = result_signature()
+        if signature == self.signature or not signature:
+            return False
+        if not force and signature != self.pending:
+            self.pending = signature
+            return False
+        index = load_result_index()
+        self.index, self.signature = index, signature
+        logger.info(f"🛰️ 已加载排名结果：{len(index)} 个IP，{len(index.by_region)} 个地区（ETag {index.etag}）")
+        return True
+
+    def watch(self, stop):
+        while not stop.wait(CONFIG["serve_reload_seconds"]):
+            try:
+                self.reload()
+            except Exception as e:
+                logger.error(f"❌ 重新加载排名结果失败: {str(e)[:50]}")
+
+def make_result_server(service, host, port):
+    """
+    创建查询服务的HTTP服务器
+
+    接口：
+        GET /ips?region=HK&limit=10&min_bandwidth=20&max_latency=100&order=score&version=4&format=json
+            format=text 时每行一个IP，可直接替代 IPlist-Pro.txt
+        GET /regions  各地区的IP数量
+        GET /status   当前索引的加载时间、IP数量和ETag
+
+    成功的响应带ETag（结果文件内容的摘要），请求有效且If-None-Match一致时返回304。
+
+    Args:
+        service (ResultService): 查询服务状态
+        host (str): 监听地址
+        port (int): 监听端口
+
+    Returns:
+        ThreadingHTTPServer: 尚未启动的服务器
+    """
+    class ResultHandler(BaseHTTPRequestHandler):
+        def send_body(self, status, body, content_type, etag=None):
+            # 只有路由和参数校验都通过、即将返回结果时才比较ETag，404/400不会被304掩盖
+            if etag and self.headers.get('If-None-Match') == etag:
+                self.send_response(304)
+                self.send_header('ETag', etag)
+                self.end_headers()
+                return
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            if etag:
+                self.send_header('ETag', etag)
+                self.send_header('Cache-Control', 'no-cache')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def send_json(self, status, payload, etag=None):
+            self.send_body(status, json.dumps(payload, ensure_ascii=False), 'application/json', etag)
+
+        def do_GET(self):
+            index = service.index
+            if index is None:
+                self.send_json(503, {"error": "暂无排名结果"})
+                return
+            etag = f'"{index.etag}"'
+            url = urlparse(self.path)
+            params = {key: values[-1] for key, values in parse_qs(url.query).items()}
+            try:
+                if url.path == '/ips':
+                    self.send_ips(index, params, etag)
+                elif url.path == '/regions':
+                    self.send_json(200, index.regions(), etag)
+                elif url.path == '/status':
+                    self.send_json(200, {"ips": len(index), "regions": len(index.by_region),
+                                         "loaded_at": index.loaded_at, "etag": index.etag}, etag)
+                else:
+                    self.send_json(404, {"error": "未知接口"})
+            except ValueError as e:
+                self.send_json(400, {"error": str(e)})
+
+        def send_ips(self, index, params, etag):
+            order = params.get('order', 'score')
+            if order not in ResultIndex.ORDERS:
+                raise ValueError(f"order 只能是 {'/'.join(ResultIndex.ORDERS)}")
+            version = int(params['version']) if 'version' in params else None
+            if version not in (None, 4, 6):
+                raise ValueError("version 只能是 4 或 6")
+            limit = min(max(1, int(params.get('limit', CONFIG["serve_default_limit"]))), CONFIG["serve_max_limit"])
+            rows = index.query(region=params['region'].upper() if params.get('region') else None,
+                               order=order, limit=limit,
+                               min_bandwidth=float(params.get('min_bandwidth', 0)),
+                               max_latency=float(params['max_latency']) if 'max_latency' in params else None,
+                               version=version)
+            if params.get('format') == 'text':
+                ips = index.table.ip_list(rows)
+                self.send_body(200, '\n'.join(ips) + ('\n' if ips else ''), 'text/plain', etag)
+            else:
+                self.send_json(200, [index.record(row) for row in rows], etag)
+
+        def log_message(self, format, *args):
+            logger.debug(f"🛰️ {self.address_string()} {format % args}")
+
+    server = ThreadingHTTPServer((host, port), ResultHandler)
+    server.daemon_threads = True
+    return server
+
+def run_server():
+    """
+    查询服务入口
+
+    加载当前目录中的排名结果并启动HTTP服务，直到收到中断（Ctrl+C）或SIGTERM信号。
+    可与常驻模式或定时运行的主程序配合，输出文件更新后自动重新加载。
+    """
+    def stop(signum, frame):
+        raise KeyboardInterrupt
+
+    signal.signal(signal.SIGTERM, stop)
+    service = ResultService()
+    service.reload(force=True)
+    if service.index is None:
+        logger.warning("⚠️ 当前目录暂无排名结果（Ranking.txt），生成后自动加载")
+    stop_watch = threading.Event()
+    threading.Thread(target=contextvars.copy_context().run, args=(service.watch, stop_watch), daemon=True).start()
+    server = make_result_server(service, CONFIG["serve_host"], CONFIG["serve_port"])
+    logger.info(f"🛰️ ===== 查询服务启动：http://{CONFIG['serve_host']}:{CONFIG['serve_port']} =====")
+    try:
+        server.serve_forever()
+    finally:
+        stop_watch.set()
+        server.server_close()
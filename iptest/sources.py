@@ -0,0 +1,285 @@
+"""IP源采集与产出统计"""
+
+import logging
+import re
+import os
+import time
+import socket
+import json
+from datetime import datetime
+from collections import defaultdict
+
+from .breaker import get_breaker
+from .budget import run_budget
+from .prefix import prefilter_ips
+from .runtime import CONFIG, runtime
+
+logger = logging.getLogger(__name__)
+
+# ===== IP源统计模块 =====
+# 持久化记录每个IP源的产出质量，用于采集排序、跳过低价值源和优先探测高产出源的IP
+
+class SourceTracker:
+    """
+    IP源产出统计
+
+    按源记录抓取耗时、失败次数、独有IP数（去重后只有该源提供的IP）、
+    快速筛选通过率和最终入榜数，均以指数滑动平均保存在Sources.json中。
+    """
+
+    def __init__(self):
+        self.stats = {}
+        self.providers = defaultdict(set)
+        path = CONFIG["source_stats_file"]
+        if os.path.exists(path):
+            try:
+                with open(path, 'r', encoding='utf-8') as f:
+                    self.stats = json.load(f)
+            except Exception as e:
+                logger.warning(f"⚠️ 加载源统计文件失败: {str(e)[:50]}")
+
+    def _entry(self, url):
+        return self.stats.setdefault(url, {
+            "runs": 0, "failures": 0, "skipped": 0, "fetch_seconds": 0.0,
+            "unique": 0.0, "pass_rate": 0.0, "ranked": 0.0,
+        })
+
+    def _ewma(self, entry, key, value):
+        alpha = CONFIG["source_stats_alpha"]
+        entry[key] = round(value if entry["runs"] <= 1 else alpha * value + (1 - alpha) * entry[key], 3)
+
+    def value(self, url):
+        """源价值评估，无统计的新源视为最高价值"""
+        entry = self.stats.get(url)
+        if not entry or entry["runs"] < CONFIG["source_min_runs"]:
+            return float('inf')
+        return entry["ranked"] * 10 + entry["unique"] * entry["pass_rate"]
+
+    def ordered_sources(self, urls):
+        """按源价值从高到低排序"""
+        return sorted(urls, key=lambda url: -self.value(url))
+
+    def should_skip(self, url):
+        """低价值源跳过采集，但每隔source_retry_every次运行重新采集一次"""
+        if self.value(url) >= CONFIG["source_min_value"]:
+            return False
+        entry = self._entry(url)
+        if entry["skipped"] + 1 >= CONFIG["source_retry_every"]:
+            return False
+        entry["skipped"] += 1
+        return True
+
+    def throttle_factor(self, url):
+        """常驻模式刷新间隔放大倍数"""
+        return CONFIG["source_throttle_factor"] if self.value(url) < CONFIG["source_min_value"] else 1
+
+    def record_fetch(self, url, ips, seconds):
+        """记录一次抓取结果（ips为None表示失败）"""
+        entry = self._entry(url)
+        entry["runs"] += 1
+        entry["skipped"] = 0
+        self._ewma(entry, "fetch_seconds", seconds)
+        if ips is None:
+            entry["failures"] += 1
+            return
+        for ip in ips:
+            self.providers[ip].add(url)
+
+    def priority(self, ip):
+        """IP探测优先级：取提供该IP的所有源中的最高价值"""
+        return max((self.value(url) for url in self.providers.get(ip, ())), default=0)
+
+    def record_run(self, probed, passed, ranked):
+        """
+        按本次运行结果更新各源的独有IP数、通过率和入榜数
+
+        Args:
+            probed (set): 实际完成快速筛选的IP
+            passed (set): 通过快速筛选的IP
+            ranked (set): 进入最终排名的IP
+        """
+        per_source = defaultdict(lambda: [0, 0, 0, 0])  # 独有、已探测、通过、入榜
+        for ip, urls in self.providers.items():
+            for url in urls:
+                counts = per_source[url]
+                counts[0] += len(urls) == 1
+                counts[1] += ip in probed
+                counts[2] += ip in passed
+                counts[3] += ip in ranked
+        for url, (unique, probed_count, passed_count, ranked_count) in per_source.items():
+            entry = self._entry(url)
+            self._ewma(entry, "unique", unique)
+            if probed_count:
+                self._ewma(entry, "pass_rate", passed_count / probed_count)
+            self._ewma(entry, "ranked", ranked_count)
+            entry["updated"] = datetime.now().isoformat()
+
+    def report(self, urls):
+        for url in self.ordered_sources(url for url in urls if url in self.stats):
+            entry = self.stats[url]
+            logger.info(f"📈 {url}：独有 {entry['unique']:.1f}，通过率 {entry['pass_rate']:.0%}，"
+                        f"入榜 {entry['ranked']:.1f}，抓取 {entry['fetch_seconds']:.2f}秒，失败 {entry['failures']}/{entry['runs']}")
+
+    def save(self):
+        try:
+            with open(CONFIG["source_stats_file"], 'w', encoding='utf-8') as f:
+                json.dump(self.stats, f, ensure_ascii=False, indent=1)
+        except Exception as e:
+            logger.error(f"❌ 保存源统计文件失败: {str(e)[:50]}")
+
+# ===== IP采集模块 =====
+# 从配置的IP源采集候选IP地址
+
+# IPv6字面量候选：2到7个冒号分隔的十六进制段，前后不紧邻地址字符（排除IPv4映射写法和时间等）
+IPV6_CANDIDATE = re.compile(r'(?<![\w:.])(?:[0-9A-Fa-f]{0,4}:){2,7}[0-9A-Fa-f]{0,4}(?![\w:.])')
+
+def extract_ipv6(text):
+    """提取有效的IPv6地址，统一为压缩格式以便去重"""
+    valid_ips = []
+    for candidate in IPV6_CANDIDATE.findall(text):
+        try:
+            packed = socket.inet_pton(socket.AF_INET6, candidate)
+        except OSError:
+            continue
+        if any(packed):
+            valid_ips.append(socket.inet_ntop(socket.AF_INET6, packed))
+    return valid_ips
+
+def extract_ips(text):
+    """
+    从页面文本中提取有效的IPv4和IPv6地址（未经网段过滤）
+
+    IPv4优先使用正则提取，正则无结果时按行解析纯IP文本；
+    ipv6_enabled时同时提取IPv6字面量。
+
+    Args:
+        text (str): 页面内容
+
+    Returns:
+        list: 有效IP地址列表（未去重）
+    """
+    # 提取并验证IPv4地址
+    ips = re.findall(r'\b(?:[0-9]{1,3}\.){3}[0-9]{1,3}\b', text)
+    valid_ips = [
+        ip for ip in ips 
+        if all(0 <= int(part) <= 255 for part in ip.split('.'))
+    ]
+
+    # 调试信息：记录原始找到的IP数量
+    if len(ips) > 0 and len(valid_ips) == 0:
+        logger.debug(f"找到 {len(ips)} 个IP，但验证后为0个")
+
+    # 如果正则表达式没有找到IP，尝试按行分割查找
+    if len(valid_ips) == 0:
+        lines = text.strip().split('\n')
+        for line in lines:
+            line = line.strip()
+            # 检查是否是纯IP地址行
+            if re.match(r'^(?:[0-9]{1,3}\.){3}[0-9]{1,3}$', line):
+                if all(0 <= int(part) <= 255 for part in line.split('.')):
+                    valid_ips.append(line)
+
+    # 提取IPv6地址（页面中没有冒号时跳过）
+    if CONFIG["ipv6_enabled"] and ':' in text:
+        valid_ips.extend(extract_ipv6(text))
+    return valid_ips
+
+# fetch_source 因源处于熔断状态而未发起请求时的返回值，不计入源的抓取统计
+SOURCE_SKIPPED = object()
+
+def fetch_source(url, timeout):
+    """
+    请求单个IP源并提取IP地址
+
+    提取结果经过Cloudflare网段预过滤，剔除数量按源记录到日志。
+    每个源有独立的熔断器，熔断中的源直接跳过，超时时间根据历史耗时自适应。
+
+    Args:
+        url (str): IP源地址
+        timeout (float): 请求超时时间上限（秒）
+
+    Returns:
+        list: 有效IP地址列表；请求失败时返回None，熔断跳过时返回SOURCE_SKIPPED
+    """
+    breaker = get_breaker(url)
+    if not breaker.allow():
+        logger.info(f"🔌 {url} 处于熔断状态，跳过")
+        return SOURCE_SKIPPED
+    try:
+        timeout = breaker.timeout(timeout)
+        logger.info(f"🔍 从 {url} 采集（超时 {timeout:.1f}秒）...")
+        start_time = time.time()
+        resp = runtime().session.get(url, timeout=timeout)
+        if resp.status_code == 403 or resp.status_code == 429 or resp.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success(time.time() - start_time)
+        if resp.status_code == 200:
+            valid_ips, dropped = prefilter_ips(extract_ips(resp.text))
+            if dropped:
+                logger.info(f"🧹 预过滤剔除 {dropped} 个非Cloudflare网段地址")
+            logger.info(f"✅ 成功采集 {len(valid_ips)} 个有效IP地址")
+            return valid_ips
+        elif resp.status_code == 403:
+            logger.warning(f"⚠️ 被限制访问（状态码 403），跳过此源")
+        else:
+            logger.warning(f"❌ 失败（状态码 {resp.status_code}）")
+    except Exception as e:
+        breaker.failure()
+        error_msg = str(e)[:50]
+        logger.error(f"❌ 出错: {error_msg}")
+    return None
+
+def collect_ips(tracker):
+    """
+    从所有IP源采集候选IP地址
+
+    按源的历史价值从高到低依次请求CONFIG["ip_sources"]，跳过长期低产出的源，
+    受运行时间预算约束。
+
+    Args:
+        tracker (SourceTracker): 源统计，记录每个源的抓取结果
+
+    Returns:
+        dict: 每个源采集到的IP列表，格式为 {url: [ip, ...]}
+    """
+    source_ips = {}
+    successful_sources = 0
+    failed_sources = 0
+    skipped_sources = 0
+
+    # 采集IP源
+    sources = tracker.ordered_sources(CONFIG["ip_sources"])
+    for i, url in enumerate(sources):
+        if run_budget().stage_expired():
+            logger.warning(f"⏳ 采集阶段时间预算耗尽，跳过剩余 {len(sources) - i} 个源")
+            break
+        if tracker.should_skip(url):
+            skipped_sources += 1
+            logger.info(f"📈 {url} 近期产出过低，本次跳过")
+            continue
+        # 添加请求间隔，避免频率限制
+        if i > 0:
+            time.sleep(CONFIG["query_interval"])  # 使用配置的间隔时间
+        # 使用配置的超时时间，但不超过阶段剩余预算
+        timeout = min(CONFIG["timeout"], max(1, run_budget().stage_remaining()))
+        # 用历史平均抓取耗时初始化自适应超时，失败过的源不参与
+        entry = tracker.stats.get(url)
+        if entry and entry["failures"] < entry["runs"]:
+            get_breaker(url).seed(entry["fetch_seconds"])
+        fetch_start = time.time()
+        valid_ips = fetch_source(url, timeout)
+        if valid_ips is SOURCE_SKIPPED:
+            # 熔断中未发起请求，不影响该源的抓取耗时和失败统计
+            skipped_sources += 1
+            continue
+        tracker.record_fetch(url, valid_ips, time.time() - fetch_start)
+        if valid_ips is None:
+            failed_sources += 1
+        else:
+            source_ips[url] = list(dict.fromkeys(valid_ips))
+            successful_sources += 1
+
+    tracker.save()
+    logger.info(f"📊 采集统计: 成功 {successful_sources} 个源，失败 {failed_sources} 个源，跳过 {skipped_sources} 个源")
+    return source_ips
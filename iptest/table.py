@@ -0,0 +1,143 @@
+"""列式结果表"""
+
+import math
+from array import array
+
+from .prefix import IPV4_MAPPED_PREFIX, ip_key, key_to_ip
+from .runtime import CONFIG
+from .scoring import score_results, top_k
+
+# ===== 结果表模块 =====
+# 列式保存各阶段的测量结果，阶段之间只传递行号
+
+class ResultTable:
+    """
+    列式结果表
+
+    每个IP占一行，IP存为16字节紧凑表示（IPv4为映射地址，见ip_key），各阶段的测量值存于按列分配的定长数组中并原地写入，
+    未测量的值为NaN；地区代码按下标存储。阶段之间只传递行号数组，
+    评分和输出直接读取列，不再为每个阶段重建元组和以字符串IP为键的字典。
+    """
+
+    # 浮点列：快速筛选延迟、排名延迟（TCP延迟或应用层排名分量）、应用层延迟分量、
+    # 下载带宽、带宽测试延迟、上传带宽、稳定性、综合评分
+    COLUMNS = ("quick_delay", "delay", "connect", "tls", "ttfb",
+               "bandwidth", "latency", "upload", "stability", "score")
+
+    KEY_SIZE = 16
+
+    def __init__(self):
+        self.ips = bytearray()
+        self.rows = {}
+        self.columns = {name: array('d') for name in self.COLUMNS}
+        self.regions = array('H')
+        self.region_codes = [None]
+        self.region_index = {}
+
+    def __len__(self):
+        return len(self.ips) // self.KEY_SIZE
+
+    def add(self, ip, **values):
+        """追加一行，返回行号；已存在的IP只更新给定的列"""
+        key = ip_key(ip)
+        row = self.rows.get(key)
+        if row is None:
+            row = len(self)
+            self.rows[key] = row
+            self.ips += key
+            for column in self.columns.values():
+                column.append(math.nan)
+            self.regions.append(0)
+        self.set(row, **values)
+        return row
+
+    def key(self, row):
+        return bytes(self.ips[row * self.KEY_SIZE:(row + 1) * self.KEY_SIZE])
+
+    def row(self, ip):
+        return self.rows[ip_key(ip)]
+
+    def ip(self, row):
+        return key_to_ip(self.key(row))
+
+    def ip_list(self, rows=None):
+        return [self.ip(row) for row in (range(len(self)) if rows is None else rows)]
+
+    def version(self, row):
+        start = row * self.KEY_SIZE
+        return 4 if self.ips[start:start + 12] == IPV4_MAPPED_PREFIX else 6
+
+    def split_versions(self, rows):
+        """按地址族拆分行号（保持原顺序），返回 {4: 行号, 6: 行号}"""
+        groups = {4: array('I'), 6: array('I')}
+        for row in rows:
+            groups[self.version(row)].append(row)
+        return groups
+
+    def set(self, row, **values):
+        for name, value in values.items():
+            self.columns[name][row] = value
+
+    def get(self, name, row):
+        return self.columns[name][row]
+
+    def has(self, name, row):
+        return not math.isnan(self.columns[name][row])
+
+    def column(self, name, rows, default=None):
+        """按行号取一列的值，default不为None时用它替换未测量的值"""
+        column = self.columns[name]
+        if default is None:
+            return [column[row] for row in rows]
+        return [default if math.isnan(column[row]) else column[row] for row in rows]
+
+    def set_components(self, row, components):
+        self.set(row, **components)
+
+    def components(self, row):
+        """应用层延迟分量字典，未测量时返回None"""
+        if not self.has("connect", row):
+            return None
+        return {key: self.columns[key][row] for key in ("connect", "tls", "ttfb")}
+
+    def set_region(self, row, code):
+        index = self.region_index.get(code)
+        if index is None:
+            index = self.region_index[code] = len(self.region_codes)
+            self.region_codes.append(code)
+        self.regions[row] = index
+
+    def region(self, row):
+        return self.region_codes[self.regions[row]]
+
+    def sort_by_ip(self):
+        """按IP数值原地重排全部行（IPv4在前）"""
+        order = sorted(range(len(self)), key=self.key)
+        self.ips = bytearray(b''.join(self.key(row) for row in order))
+        self.rows = {self.key(row): row for row in range(len(self))}
+        for name, column in self.columns.items():
+            self.columns[name] = array('d', (column[row] for row in order))
+        self.regions = array('H', (self.regions[row] for row in order))
+
+    def score(self, rows, upload=False, k=None):
+        """
+        对给定行一次计算综合评分并写回score列
+
+        Args:
+            rows (sequence): 参与评分的行号，评分相同时保持这里的顺序
+            upload (bool): 是否把上传带宽计入评分（未测出的IP按0计）
+            k (int): 返回的头部行数，默认取CONFIG["output_top_n"]（0为全部）
+
+        Returns:
+            array: 按评分降序排列的前k个行号
+        """
+        rows = array('I', rows)
+        scores = score_results(self.column("delay", rows), self.column("bandwidth", rows, 0),
+                               self.column("stability", rows, 100),
+                               self.column("upload", rows, 0) if upload else None)
+        column = self.columns["score"]
+        for row, score in zip(rows, scores):
+            column[row] = score
+        if k is None:
+            k = CONFIG["output_top_n"] or len(rows)
+        return array('I', (rows[i] for i in top_k(scores, k)))